@@ -1,5 +1,15 @@
-from django.contrib import admin
-from .models import BlogSource, Post, Category, MyPost
+from django import forms
+from django.contrib import admin, messages
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils import timezone
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import BlogSource, Post, Category, MyPost, CrawlRun, SourceFetchLog, FetchJob, WebSubSubscription
+from .changelists import AutocompleteFilter, EstimatedCountPaginator, autocomplete_media
+from .classification import reclassify
+from . import crawlstats, directory, feeds, fragments, jobs, opml, suggest, websub
 
 
 @admin.register(Category)
@@ -18,6 +28,10 @@ class CategoryAdmin(admin.ModelAdmin):
         ('Hiển thị', {
             'fields': ('color', 'icon', 'is_active')
         }),
+        ('Phân loại tự động', {
+            'fields': ('keywords',),
+            'description': 'Bài viết mới chứa các từ khóa này (không phân biệt dấu) sẽ được gán vào danh mục'
+        }),
         ('Thông tin hệ thống', {
             'fields': ('created_at', 'posts_count'),
             'classes': ('collapse',)
@@ -25,20 +39,27 @@ class CategoryAdmin(admin.ModelAdmin):
     )
 
 
+class OPMLImportForm(forms.Form):
+    opml_file = forms.FileField(label="Tệp OPML")
+    is_active = forms.BooleanField(label="Kích hoạt ngay", required=False, initial=True)
+
+
 @admin.register(BlogSource)
 class BlogSourceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'author', 'language', 'rss_url', 'is_active', 'posts_count', 'last_fetched']
+    list_display = ['name', 'author', 'language', 'rss_url', 'is_active', 'posts_total', 'last_fetched']
     list_filter = ['is_active', 'language', 'created_at', 'last_fetched']
-    search_fields = ['name', 'description', 'author']
+    search_fields = ['name', 'description', 'author', 'rss_url']
     readonly_fields = ['created_at', 'updated_at', 'last_fetched', 'posts_count']
     list_editable = ['is_active']
+    change_list_template = 'admin/aggregator/blogsource/change_list.html'
+    actions = ['export_opml', 'activate', 'deactivate', 'refetch', 'recategorize']
     
     fieldsets = (
         ('Thông tin cơ bản', {
             'fields': ('name', 'author', 'description', 'homepage_url', 'logo_url')
         }),
         ('RSS Settings', {
-            'fields': ('rss_url', 'is_active', 'language')
+            'fields': ('rss_url', 'is_active', 'language', 'retention_months')
         }),
         ('Tags và phân loại', {
             'fields': ('tags',),
@@ -50,21 +71,104 @@ class BlogSourceAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        # Correlated count, evaluated for the rows of the current page only
+        posts = Post.objects.filter(blog_source=OuterRef('pk')).order_by().values('blog_source').annotate(
+            total=Count('id')
+        ).values('total')
+        return super().get_queryset(request).annotate(
+            posts_total=Coalesce(Subquery(posts, output_field=IntegerField()), 0)
+        )
+
+    @admin.display(description='Số bài', ordering='posts_total')
+    def posts_total(self, obj):
+        return obj.posts_total
+
+    def get_urls(self):
+        return [
+            path('import-opml/', self.admin_site.admin_view(self.import_opml_view), name='aggregator_blogsource_import_opml'),
+        ] + super().get_urls()
+
+    def import_opml_view(self, request):
+        """Nhập hàng loạt nguồn từ tệp OPML; nguồn mới được crawl_worker crawl ngay"""
+        if not self.has_add_permission(request):
+            return HttpResponseRedirect(reverse('admin:aggregator_blogsource_changelist'))
+        form = OPMLImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                outlines = opml.parse_opml(form.cleaned_data['opml_file'].read())
+            except opml.OPMLError as e:
+                form.add_error('opml_file', str(e))
+            else:
+                result = opml.import_outlines(outlines, is_active=form.cleaned_data['is_active'])
+                self.message_user(
+                    request,
+                    f"Đã thêm {len(result.created)} nguồn; bỏ qua {len(result.duplicates)} nguồn đã có "
+                    f"và {len(result.invalid)} URL không hợp lệ",
+                    messages.WARNING if result.invalid else messages.SUCCESS,
+                )
+                return HttpResponseRedirect(reverse('admin:aggregator_blogsource_changelist'))
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Nhập nguồn từ OPML',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/aggregator/blogsource/import_opml.html', context)
+
+    @admin.action(description='Xuất OPML')
+    def export_opml(self, request, queryset):
+        response = HttpResponse(opml.export_opml(queryset.order_by('name')), content_type='text/x-opml; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="bloghub-sources.opml"'
+        return response
+
+    def set_active(self, request, queryset, is_active):
+        updated = queryset.exclude(is_active=is_active).update(is_active=is_active, updated_at=timezone.now())
+        # update() skips the BlogSource signals
+        directory.invalidate()
+        feeds.invalidate()
+        fragments.bump_generation()
+        suggest.invalidate()
+        jobs.sync_jobs()
+        return updated
+
+    @admin.action(description='Kích hoạt')
+    def activate(self, request, queryset):
+        self.message_user(request, f"Đã kích hoạt {self.set_active(request, queryset, True)} nguồn")
+
+    @admin.action(description='Tạm dừng')
+    def deactivate(self, request, queryset):
+        self.message_user(request, f"Đã tạm dừng {self.set_active(request, queryset, False)} nguồn")
+
+    @admin.action(description='Crawl lại ngay')
+    def refetch(self, request, queryset):
+        queued = jobs.run_now(queryset.values('id'))
+        self.message_user(request, f"Đã đưa {queued} nguồn vào hàng đợi crawl ngay")
+
+    @admin.action(description='Phân loại lại bài viết')
+    def recategorize(self, request, queryset):
+        seen, changed = reclassify(Post.objects.filter(blog_source__in=queryset.values('id')))
+        self.message_user(request, f"Đã phân loại lại {changed}/{seen} bài viết (giữ nguyên danh mục do biên tập viên chọn)")
+
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'blog_source', 'category', 'published_date', 'created_at']
-    list_filter = ['blog_source', 'category', 'published_date', 'created_at']
+    list_display = ['title', 'blog_source', 'category', 'category_is_auto', 'published_date', 'created_at']
+    list_filter = [('blog_source', AutocompleteFilter), 'category', 'category_is_auto', 'published_date', 'created_at']
     search_fields = ['title', 'excerpt']
     readonly_fields = ['created_at']
-    date_hierarchy = 'published_date'
+    autocomplete_fields = ['blog_source']
+    # No date_hierarchy: it scans the whole table for the years on every load
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['recategorize', 'refetch_sources']
     
     fieldsets = (
         ('Thông tin bài viết', {
             'fields': ('title', 'link', 'excerpt', 'thumbnail_url')
         }),
         ('Phân loại', {
-            'fields': ('category',)
+            'fields': ('category', 'category_is_auto')
         }),
         ('Metadata', {
             'fields': ('blog_source', 'published_date', 'created_at'),
@@ -74,6 +178,27 @@ class PostAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('blog_source', 'category')
 
+    @property
+    def media(self):
+        return super().media + autocomplete_media(Post._meta.get_field('blog_source'), self.admin_site)
+
+    @admin.action(description='Phân loại lại')
+    def recategorize(self, request, queryset):
+        seen, changed = reclassify(queryset)
+        self.message_user(request, f"Đã phân loại lại {changed}/{seen} bài viết (giữ nguyên danh mục do biên tập viên chọn)")
+
+    @admin.action(description='Crawl lại nguồn của bài viết')
+    def refetch_sources(self, request, queryset):
+        queued = jobs.run_now(queryset.values('blog_source_id'))
+        self.message_user(request, f"Đã đưa {queued} nguồn vào hàng đợi crawl ngay")
+
+    def save_model(self, request, obj, form, change):
+        if 'thumbnail_url' in form.changed_data:
+            obj.thumbnail_hash = ''  # Rebuilt by build_thumbnails
+        if 'category' in form.changed_data:
+            obj.category_is_auto = False  # Editor's choice, also used for training
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(MyPost)
 class MyPostAdmin(admin.ModelAdmin):
@@ -108,4 +233,117 @@ class MyPostAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not change:  # New object
             obj.author = request.user
+        if 'thumbnail_url' in form.changed_data:
+            obj.thumbnail_hash = ''  # Rebuilt by build_thumbnails
         super().save_model(request, obj, form, change)
+
+
+class SourceFetchLogInline(admin.TabularInline):
+    model = SourceFetchLog
+    fields = ['blog_source', 'http_status', 'bytes', 'fetch_ms', 'parse_ms', 'write_ms', 'entries_seen', 'new_posts', 'error']
+    readonly_fields = fields
+    ordering = ['-duration_ms']
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CrawlRun)
+class CrawlRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'duration_ms', 'sources_count', 'entries_seen', 'new_posts', 'errors']
+    readonly_fields = ['started_at', 'finished_at', 'duration_ms', 'sources_count', 'entries_seen', 'new_posts', 'errors']
+    date_hierarchy = 'started_at'
+    inlines = [SourceFetchLogInline]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SourceFetchLog)
+class SourceFetchLogAdmin(admin.ModelAdmin):
+    list_display = ['blog_source', 'started_at', 'http_status', 'duration_ms', 'fetch_ms', 'parse_ms', 'write_ms', 'new_posts', 'is_error']
+    list_filter = ['http_status', 'started_at']
+    search_fields = ['blog_source__name', 'error']
+    list_select_related = ['blog_source']
+    date_hierarchy = 'started_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [field.name for field in SourceFetchLog._meta.fields]
+    change_list_template = 'admin/aggregator/sourcefetchlog/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(boolean=True, description='Lỗi')
+    def is_error(self, obj):
+        return obj.is_error
+
+    def get_urls(self):
+        return [
+            path('health/', self.admin_site.admin_view(self.health_view), name='aggregator_sourcefetchlog_health'),
+        ] + super().get_urls()
+
+    def health_view(self, request):
+        """Tình trạng từng nguồn: nguồn chậm nhất và hay lỗi nhất lên đầu"""
+        try:
+            days = min(max(int(request.GET.get('days', 7)), 1), 90)
+        except ValueError:
+            days = 7
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Tình trạng nguồn crawl',
+            'days': days,
+            'rows': crawlstats.source_health(days),
+            'runs': CrawlRun.objects.all()[:10],
+        }
+        return TemplateResponse(request, 'admin/aggregator/sourcefetchlog/health.html', context)
+
+
+@admin.register(FetchJob)
+class FetchJobAdmin(admin.ModelAdmin):
+    list_display = ['blog_source', 'status', 'run_after', 'leased_by', 'lease_expires', 'attempts', 'last_finished']
+    list_filter = ['status']
+    search_fields = ['blog_source__name', 'leased_by', 'last_error']
+    list_select_related = ['blog_source']
+    readonly_fields = ['blog_source', 'status', 'leased_by', 'lease_expires', 'attempts', 'last_error', 'last_finished']
+    actions = ['run_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Crawl ngay')
+    def run_now(self, request, queryset):
+        updated = queryset.filter(status=FetchJob.QUEUED).update(run_after=timezone.now())
+        self.message_user(request, f"Đã đưa {updated} nguồn vào hàng đợi crawl ngay")
+
+
+@admin.register(WebSubSubscription)
+class WebSubSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['blog_source', 'hub_url', 'state', 'lease_expires', 'last_delivery', 'deliveries']
+    list_filter = ['state']
+    search_fields = ['blog_source__name', 'hub_url', 'topic_url']
+    list_select_related = ['blog_source']
+    readonly_fields = ['blog_source', 'hub_url', 'topic_url', 'state', 'lease_expires',
+                       'last_delivery', 'deliveries', 'last_error', 'created_at', 'updated_at']
+    actions = ['resubscribe', 'unsubscribe']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Gửi lại yêu cầu đăng ký')
+    def resubscribe(self, request, queryset):
+        sent = 0
+        for subscription in queryset.select_related('blog_source'):
+            if subscription.state != WebSubSubscription.ACTIVE:
+                subscription.state = WebSubSubscription.PENDING
+                subscription.save(update_fields=['state', 'updated_at'])
+            sent += websub.subscribe(subscription)
+        self.message_user(request, f"Đã gửi {sent}/{len(queryset)} yêu cầu đăng ký tới hub")
+
+    @admin.action(description='Hủy đăng ký (quay lại crawl định kỳ)')
+    def unsubscribe(self, request, queryset):
+        sent = sum(websub.unsubscribe(subscription) for subscription in queryset.select_related('blog_source'))
+        self.message_user(request, f"Đã gửi {sent}/{len(queryset)} yêu cầu hủy đăng ký tới hub")
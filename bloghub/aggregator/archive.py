@@ -0,0 +1,107 @@
+"""
+Retention for crawled posts.
+
+Posts older than their source's retention (BlogSource.retention_months, or
+ARCHIVE_AFTER_MONTHS) are moved in batches from Post into ArchivedPost, so
+listings, counts and searches only walk the hot table. fetch_feeds still
+recognizes archived links through the indexed 63-bit link_hash column.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedPost, Post
+from .normalization import canonicalize_url
+from . import feeds
+
+
+def link_hash(link):
+    """63-bit hash of the canonical link (fits a signed BigIntegerField)"""
+    digest = hashlib.sha1(canonicalize_url(link).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') >> 1
+
+
+def archived_hashes(links):
+    """Hashes among links that belong to archived posts, in one query"""
+    hashes = {link_hash(link) for link in links if link}
+    if not hashes:
+        return set()
+    return set(ArchivedPost.objects.filter(link_hash__in=hashes).values_list('link_hash', flat=True))
+
+
+def retention_cutoff(source, now=None):
+    """Publication date before which posts of source are archived, None to keep all"""
+    months = source.retention_months
+    if months is None:
+        months = settings.ARCHIVE_AFTER_MONTHS
+    if not months:
+        return None
+    return (now or timezone.now()) - timedelta(days=30 * months)
+
+
+def to_archived(post):
+    return ArchivedPost(
+        id=post.id,
+        title=post.title,
+        link=post.link,
+        link_hash=link_hash(post.link),
+        excerpt=post.excerpt,
+        thumbnail_url=post.thumbnail_url,
+        thumbnail_hash=post.thumbnail_hash,
+        published_date=post.published_date,
+        blog_source_id=post.blog_source_id,
+        category_id=post.category_id,
+        title_folded=post.title_folded,
+        excerpt_folded=post.excerpt_folded,
+        created_at=post.created_at,
+    )
+
+
+def promote_copies(post_ids):
+    """Make the oldest remaining copy the head of each cluster headed by post_ids"""
+    copies = Post.objects.filter(duplicate_of_id__in=post_ids).exclude(id__in=post_ids)
+    clusters = {}
+    for post_id, head_id in copies.order_by('id').values_list('id', 'duplicate_of_id'):
+        clusters.setdefault(head_id, []).append(post_id)
+    for new_head, *others in clusters.values():
+        Post.objects.filter(id=new_head).update(duplicate_of=None)
+        Post.objects.filter(id__in=others).update(duplicate_of=new_head)
+
+
+def archive_source(source, cutoff, batch_size=500, dry_run=False):
+    """Move the posts of source published before cutoff; returns how many"""
+    posts = Post.objects.filter(blog_source=source, published_date__lt=cutoff).order_by('id')
+    if dry_run:
+        return posts.count()
+
+    moved = 0
+    last_id = 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        batch_ids = [post.id for post in batch]
+        with transaction.atomic():
+            ArchivedPost.objects.bulk_create([to_archived(post) for post in batch], ignore_conflicts=True)
+            # The delete would otherwise null duplicate_of of the copies left behind
+            promote_copies(batch_ids)
+            Post.objects.filter(id__in=batch_ids).delete()
+        moved += len(batch)
+    if moved:
+        feeds.invalidate()  # Older feed pages lose posts
+    return moved
+
+
+def compact(vacuum=False):
+    """Refresh planner statistics and optionally reclaim the space of moved rows"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            if vacuum:
+                cursor.execute('VACUUM')
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('VACUUM ANALYZE' if vacuum else 'ANALYZE')
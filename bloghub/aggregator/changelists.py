@@ -0,0 +1,84 @@
+"""
+Admin changelist helpers for large tables.
+
+EstimatedCountPaginator replaces the COUNT(*) of an unfiltered changelist
+with the planner's row estimate (pg_class.reltuples on PostgreSQL,
+sqlite_stat1 on SQLite, both refreshed by ANALYZE, e.g. archive_posts) once
+the table is larger than ADMIN_ESTIMATED_COUNT_MIN; filtered lists are still
+counted exactly. AutocompleteFilter filters on a foreign key through the
+admin's autocomplete endpoint instead of rendering every related row.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
+
+
+def estimated_count(model):
+    """Row estimate of model's table from the planner statistics, None when unknown"""
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'sqlite':
+                # The first number of each index's stat is the table's row count
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists after the first ANALYZE
+        return None
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator trusting the row estimate for unfiltered lists of large tables"""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Foreign key filter with a search box (the related admin needs search_fields)"""
+    template = 'admin/aggregator/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.admin_site = model_admin.admin_site
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        widget = AutocompleteSelect(self.field, self.admin_site)
+        form_field = self.field.formfield(widget=widget, required=False)
+        # Only the selected row is queried to render its label
+        yield {
+            'widget': form_field.widget.render(
+                self.lookup_kwarg, self.lookup_val,
+                attrs={'id': f'filter-{self.field_path}', 'class': 'autocomplete-filter', 'style': 'width: 100%'},
+            ),
+            'id': f'filter-{self.field_path}',
+            'url_template': changelist.get_query_string({self.lookup_kwarg: '__value__'}),
+            'clear_url': changelist.get_query_string(remove=[self.lookup_kwarg]),
+        }
+
+
+def autocomplete_media(field, admin_site):
+    """Scripts and styles the AutocompleteFilter of field needs on the changelist"""
+    return AutocompleteSelect(field, admin_site).media
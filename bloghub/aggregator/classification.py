@@ -0,0 +1,247 @@
+"""
+Automatic post categorization used by fetch_feeds, reclassify and the admin.
+
+Three signals, strongest first:
+1. Category.keywords rules matched against the folded title/excerpt
+2. BlogSource.tags that name exactly one category
+3. A small multinomial Naive Bayes model trained on editor-labelled posts
+
+Posts are classified in batches: rules and the model are loaded once per
+crawl, and results are written with a single bulk_update. The model is only
+trained by `reclassify --train` (run it on a schedule); until it has been,
+posts are classified by the rules and source tags alone.
+"""
+import json
+import logging
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Category, Post, MyPost
+from .normalization import plain_text
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2
+
+
+def tokenize(text):
+    """Folded unigrams + bigrams (Vietnamese words are usually two syllables)"""
+    words = [word for word in plain_text(text).split() if len(word) > 1 and not word.isdigit()]
+    return words + [f'{a}_{b}' for a, b in zip(words, words[1:])]
+
+
+def split_terms(value):
+    terms = (plain_text(term) for term in value.split(','))
+    return [term for term in terms if term]
+
+
+class NaiveBayesModel:
+    """Multinomial Naive Bayes over token counts, stored as JSON"""
+
+    def __init__(self, class_docs=None, token_counts=None):
+        self.class_docs = class_docs or {}
+        self.token_counts = token_counts or {}
+        self._prepare()
+
+    def _prepare(self):
+        self.totals = {label: sum(counts.values()) for label, counts in self.token_counts.items()}
+        vocab = set()
+        for counts in self.token_counts.values():
+            vocab.update(counts)
+        self.vocab_size = len(vocab) or 1
+        total_docs = sum(self.class_docs.values()) or 1
+        self.log_priors = {
+            label: math.log(docs / total_docs) for label, docs in self.class_docs.items()
+        }
+
+    @classmethod
+    def train(cls, documents, max_tokens_per_class=None):
+        """documents: iterable of (tokens, label)"""
+        class_docs = Counter()
+        token_counts = defaultdict(Counter)
+        for tokens, label in documents:
+            label = str(label)
+            class_docs[label] += 1
+            token_counts[label].update(tokens)
+
+        max_tokens = max_tokens_per_class or settings.CLASSIFIER_MAX_TOKENS_PER_CLASS
+        token_counts = {
+            label: dict(counts.most_common(max_tokens)) for label, counts in token_counts.items()
+        }
+        return cls(dict(class_docs), token_counts)
+
+    def predict(self, tokens):
+        """Return (label, probability) or (None, 0) when the model is empty"""
+        if not self.class_docs or not tokens:
+            return None, 0.0
+
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            counts = self.token_counts.get(label, {})
+            denominator = math.log(self.totals.get(label, 0) + self.vocab_size)
+            score = log_prior
+            for token in tokens:
+                score += math.log(counts.get(token, 0) + 1) - denominator
+            scores[label] = score
+
+        best = max(scores, key=scores.get)
+        # Softmax of the best class
+        top = scores[best]
+        probability = 1.0 / sum(math.exp(score - top) for score in scores.values())
+        return best, probability
+
+    def to_dict(self):
+        return {'class_docs': self.class_docs, 'token_counts': self.token_counts}
+
+    def save(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.to_dict()), encoding='utf-8')
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(path.read_text(encoding='utf-8'))
+        return cls(data['class_docs'], data['token_counts'])
+
+
+def training_documents(limit=None):
+    """Editor-labelled posts: Post with a manual category and categorized MyPost"""
+    limit = limit or settings.CLASSIFIER_TRAINING_LIMIT
+    posts = Post.objects.filter(
+        category__isnull=False, category_is_auto=False, category__is_active=True
+    ).order_by('-id').values_list('title', 'excerpt', 'category_id')[:limit]
+    my_posts = MyPost.objects.filter(
+        category__isnull=False, category__is_active=True
+    ).order_by('-id').values_list('title', 'excerpt', 'category_id')[:limit]
+
+    for queryset in (posts, my_posts):
+        for title, excerpt, category_id in queryset.iterator(chunk_size=2000):
+            yield tokenize(title) * TITLE_WEIGHT + tokenize(excerpt), category_id
+
+
+def train_model():
+    model = NaiveBayesModel.train(training_documents())
+    model.save(settings.CLASSIFIER_MODEL_PATH)
+    return model
+
+
+class PostClassifier:
+    """Holds rules, source tag mapping and the model for one crawl/backfill run"""
+
+    def __init__(self, model=None):
+        categories = list(Category.objects.filter(is_active=True).only('id', 'name', 'slug', 'keywords'))
+        self.category_ids = {category.id for category in categories}
+
+        # Folded keyword -> category ids
+        self.keyword_rules = defaultdict(set)
+        # Folded name/slug/keyword -> category ids, for matching source tags
+        self.tag_lookup = defaultdict(set)
+        for category in categories:
+            for keyword in split_terms(category.keywords):
+                self.keyword_rules[keyword].add(category.id)
+                self.tag_lookup[keyword].add(category.id)
+            self.tag_lookup[plain_text(category.name)].add(category.id)
+            self.tag_lookup[category.slug.replace('-', ' ')].add(category.id)
+
+        self.model = model if model is not None else self.load_model()
+        self._source_cache = {}
+
+    @staticmethod
+    def load_model():
+        """Saved model, or an empty one (rules and source tags only) when there is none"""
+        path = settings.CLASSIFIER_MODEL_PATH
+        if not path.exists():
+            logger.info(f"No classifier model at {path}; run reclassify --train")
+            return NaiveBayesModel()
+        try:
+            return NaiveBayesModel.load(path)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Could not load classifier model {path}: {e}")
+            return NaiveBayesModel()
+
+    def source_category(self, source):
+        if source.pk not in self._source_cache:
+            matches = set()
+            for tag in split_terms(source.tags):
+                matches |= self.tag_lookup.get(tag, set())
+            self._source_cache[source.pk] = matches.pop() if len(matches) == 1 else None
+        return self._source_cache[source.pk]
+
+    def keyword_category(self, text):
+        padded = f' {text} '
+        scores = Counter()
+        for keyword, category_ids in self.keyword_rules.items():
+            hits = padded.count(f' {keyword} ')
+            if hits:
+                for category_id in category_ids:
+                    scores[category_id] += hits
+        top = scores.most_common(2)
+        if not top or (len(top) > 1 and top[0][1] == top[1][1]):
+            # Ties are left to the next signal
+            return None
+        return top[0][0]
+
+    def classify(self, post):
+        """Return a category id or None"""
+        title = plain_text(post.title)
+        category_id = self.keyword_category(f'{title} ' * TITLE_WEIGHT + plain_text(post.excerpt))
+        if category_id:
+            return category_id
+
+        category_id = self.source_category(post.blog_source)
+        if category_id:
+            return category_id
+
+        label, probability = self.model.predict(tokenize(post.title) * TITLE_WEIGHT + tokenize(post.excerpt))
+        if label is not None and probability >= settings.CLASSIFIER_MIN_PROBABILITY:
+            category_id = int(label)
+            if category_id in self.category_ids:
+                return category_id
+        return None
+
+    def classify_batch(self, posts, save=True):
+        """Assign categories to posts in memory, then write them in one bulk_update"""
+        changed = []
+        now = timezone.now()
+        for post in posts:
+            category_id = self.classify(post)
+            if category_id and category_id != post.category_id:
+                post.category_id = category_id
+                post.category_is_auto = True
+                post.updated_at = now  # bulk_update skips auto_now
+                changed.append(post)
+
+        if save and changed:
+            Post.objects.bulk_update(changed, ['category', 'category_is_auto', 'updated_at'], batch_size=500)
+        return changed
+
+
+def reclassify(posts, classifier=None, include_auto=True, batch_size=1000, save=True, progress=None):
+    """Categorize posts in keyset batches, skipping editor choices; returns (seen, changed)"""
+    classifier = classifier or PostClassifier()
+    condition = Q(category__isnull=True)
+    if include_auto:
+        condition |= Q(category_is_auto=True)
+    queryset = posts.filter(condition).select_related('blog_source').only(
+        'id', 'title', 'excerpt', 'category_id', 'category_is_auto',
+        'blog_source__id', 'blog_source__tags',
+    ).order_by('id')
+
+    # Keyset batches: rows are updated while we walk the table
+    seen = changed = 0
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed += len(classifier.classify_batch(batch, save=save))
+        seen += len(batch)
+        if progress:
+            progress(seen, changed)
+    return seen, changed
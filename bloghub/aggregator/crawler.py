@@ -0,0 +1,404 @@
+"""
+Feed crawling shared by fetch_feeds, crawl_worker, OPML imports and WebSub.
+
+download_feed() fetches a feed document with size caps; FeedCrawler parses it
+and stores the new entries: known links are skipped through the link filter
+and one query, syndicated copies join their story's cluster and new posts
+are categorized in one batch. Progress goes to the stdout it is given.
+"""
+import logging
+import os
+import urllib.error
+import urllib.request
+import zlib
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import feedparser
+from django.conf import settings
+from django.core.management.base import OutputWrapper
+from django.core.management.color import no_style
+from django.utils import timezone
+
+from .classification import PostClassifier
+from .models import Post, SourceFetchLog
+from .normalization import canonicalize_url
+from . import archive, crawlstats, dates, dedup, linkfilter, thumbnails, websub
+
+logger = logging.getLogger(__name__)
+
+# Attributes used by lazy-loading scripts, checked before the plain src
+LAZY_SRC_ATTRS = ('data-src', 'data-lazy-src', 'data-original', 'data-orig-file')
+IMAGE_HINT_PROPERTIES = ('og:image', 'og:image:url', 'twitter:image')
+USER_AGENT = 'BlogHub feed crawler (+https://bloghub.local)'
+
+
+class FeedFetchError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_size(data):
+    if len(data) > settings.FEED_MAX_BYTES:
+        raise FeedFetchError(f"Feed larger than {settings.FEED_MAX_BYTES} bytes")
+    return data
+
+
+def download_feed(url, allow_local=False):
+    """Return (body, HTTP status, wire bytes, response headers for feedparser)
+
+    Only http(s) URLs are fetched; allow_local lets command line tools read
+    a local file instead. Bodies are capped at FEED_MAX_BYTES, compressed and
+    decompressed.
+    """
+    if urlsplit(url).scheme not in ('http', 'https'):
+        if not allow_local:
+            raise FeedFetchError(f"Unsupported feed URL: {url}")
+        with open(url, 'rb') as f:
+            data = _check_size(f.read(settings.FEED_MAX_BYTES + 1))
+        return data, None, len(data), {'content-location': url}
+
+    request = urllib.request.Request(url, headers={
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': 'gzip',
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=settings.FEED_FETCH_TIMEOUT) as response:
+            data = _check_size(response.read(settings.FEED_MAX_BYTES + 1))
+            status = response.status
+            headers = {name.lower(): value for name, value in response.headers.items()}
+    except urllib.error.HTTPError as e:
+        raise FeedFetchError(f"HTTP {e.code}", status=e.code)
+    except (urllib.error.URLError, OSError) as e:
+        raise FeedFetchError(str(getattr(e, 'reason', e)))
+
+    size = len(data)
+    if headers.pop('content-encoding', '') == 'gzip':
+        try:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = _check_size(decompressor.decompress(data, settings.FEED_MAX_BYTES + 1))
+        except zlib.error as e:
+            raise FeedFetchError(f"Bad gzip body: {e}")
+    headers.pop('content-length', None)
+    headers.setdefault('content-location', url)
+    return data, status, size, headers
+
+
+class EntryHTMLParser(HTMLParser):
+    """Single pass over entry HTML: collects plain text and the first usable image"""
+
+    def __init__(self, collect_text=True):
+        super().__init__(convert_charrefs=True)
+        self.collect_text = collect_text
+        self.text_parts = []
+        self.image_url = ''
+        self.hint_url = ''
+        self.skip_depth = 0
+
+    def handle_data(self, data):
+        if self.collect_text and not self.skip_depth:
+            self.text_parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip_depth += 1
+        elif tag == 'img' and not self.image_url:
+            self.image_url = self.image_from_attrs(dict(attrs))
+        elif tag == 'meta' and not self.hint_url:
+            attrs = dict(attrs)
+            if (attrs.get('property') or attrs.get('name')) in IMAGE_HINT_PROPERTIES:
+                self.hint_url = attrs.get('content') or ''
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in ('script', 'style'):
+            self.handle_starttag(tag, attrs)
+
+    @staticmethod
+    def image_from_attrs(attrs):
+        # Skip tracking pixels
+        if attrs.get('width') == '1' or attrs.get('height') == '1':
+            return ''
+
+        for name in LAZY_SRC_ATTRS:
+            if attrs.get(name):
+                return attrs[name]
+
+        src = attrs.get('src') or ''
+        if src and not src.startswith('data:'):
+            return src
+
+        # Placeholder src: use the first srcset candidate
+        srcset = attrs.get('data-srcset') or attrs.get('srcset') or ''
+        return srcset.split(',')[0].split(' ')[0].strip()
+
+    @property
+    def text(self):
+        return ' '.join(''.join(self.text_parts).split())
+
+    @property
+    def best_image(self):
+        return self.hint_url or self.image_url
+
+
+class FeedCrawler:
+    """Crawls sources and ingests parsed feeds; one per process (or per command run)"""
+
+    def __init__(self, stdout=None, style=None, with_thumbnails=False, classify=True, load_link_filter=True):
+        if not isinstance(stdout, OutputWrapper):
+            stdout = OutputWrapper(stdout or open(os.devnull, 'w'))
+        self.stdout = stdout
+        self.style = style or no_style()
+        self.with_thumbnails = with_thumbnails
+        self.classifier = PostClassifier() if classify else None
+        self.entry_dates = dates.EntryDateParser()
+        if load_link_filter:
+            self.link_filter = linkfilter.load_filter()
+        else:
+            # A filter filled by a long-lived process would saturate and start skipping new links
+            self.link_filter = linkfilter.NoFilter()
+        self.known_by_filter = self.checked_in_db = 0
+
+    def reload_classifier(self):
+        """Load the categories and the saved model again (long-lived processes)"""
+        if self.classifier:
+            self.classifier = PostClassifier()
+
+    def crawl_source(self, source, limit, recorder, log=None, prefetched=None):
+        """Crawl one source and record its fetch log; returns (new posts, error or None)"""
+        self.stdout.write(f"\nProcessing: {source.name}")
+        self.stdout.write(f"RSS URL: {source.rss_url}")
+        log = log or recorder.start_source(source)
+        
+        try:
+            new_posts = self.fetch_source_feed(source, limit, log, prefetched)
+            
+            # Update last fetched time
+            source.last_fetched = timezone.now()
+            source.save(update_fields=['last_fetched'])
+            
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Added {new_posts} new posts from {source.name}")
+            )
+            return new_posts, None
+            
+        except Exception as e:
+            log.error = str(e)[:2000]
+            self.stdout.write(
+                self.style.ERROR(f"✗ Error processing {source.name}: {str(e)}")
+            )
+            logger.error(f"Error fetching {source.name}: {str(e)}")
+            return 0, log.error
+        finally:
+            recorder.record(log)
+
+    def fetch_source_feed(self, source, limit, log=None, prefetched=None):
+        """Fetch and parse RSS feed for a specific source, filling the fetch log
+
+        prefetched is a future of load_feed() already run in a worker thread.
+        """
+        log = log or SourceFetchLog()
+        try:
+            feed = prefetched.result() if prefetched else self.load_feed(source, log)
+
+            # Hubs announced by the feed replace most polling
+            if settings.WEBSUB_ENABLED:
+                try:
+                    websub.discover(source, feed)
+                except Exception as e:
+                    logger.warning(f"WebSub discovery failed for {source.name}: {e}")
+
+            return self.ingest_feed(source, feed, limit, log)
+
+        except Exception as e:
+            raise Exception(f"Failed to fetch RSS: {str(e)}")
+
+    def load_feed(self, source, log):
+        """Download and parse the feed of source (safe to run in a worker thread)"""
+        with crawlstats.timed(log, 'fetch_ms'):
+            try:
+                data, log.http_status, log.bytes, headers = download_feed(source.rss_url)
+            except FeedFetchError as e:
+                log.http_status = e.status
+                raise
+
+        # Parse RSS feed. HTML is not sanitized here: only tag-stripped
+        # text is stored, and the sanitizer would drop lazy-load attributes.
+        with crawlstats.timed(log, 'parse_ms'):
+            feed = feedparser.parse(data, sanitize_html=False, response_headers=headers)
+
+        if hasattr(feed, 'bozo') and feed.bozo:
+            self.stdout.write(
+                self.style.WARNING(f"⚠ RSS feed may have issues: {source.rss_url}")
+            )
+        return feed
+
+    def ingest_feed(self, source, feed, limit, log=None):
+        """Store the new entries of a parsed feed (polled, or pushed through WebSub)"""
+        log = log or SourceFetchLog()
+        # Duplicate checks, inserts and categorization
+        with crawlstats.timed(log, 'write_ms'):
+            new_posts_count = 0
+            processed = 0
+            new_posts = []
+            entries = feed.entries[:limit]
+
+            # Links in the filter are known; the rest is checked with one
+            # query, raw and canonical
+            links = {getattr(entry, 'link', '') for entry in entries} - {''}
+            unseen = {
+                link for link in links
+                if link not in self.link_filter and canonicalize_url(link) not in self.link_filter
+            }
+            self.known_by_filter += len(links) - len(unseen)
+            self.checked_in_db += len(unseen)
+            candidates = unseen | {canonicalize_url(link) for link in unseen}
+            existing_links = set(
+                Post.objects.filter(link__in=candidates).values_list('link', flat=True)
+            ) if candidates else set()
+            # Archived posts are only checked by link hash
+            archived_hashes = archive.archived_hashes(unseen)
+            for link in existing_links:
+                # Inserted outside this crawler: remember it for next time
+                self.link_filter.add(link)
+        
+            for entry in entries:
+                processed += 1
+            
+                # Skip if post already exists
+                raw_link = getattr(entry, 'link', '')
+                link = canonicalize_url(raw_link)
+                if not link or raw_link not in unseen:
+                    continue
+                if link in existing_links or raw_link in existing_links:
+                    continue
+                if archived_hashes and archive.link_hash(link) in archived_hashes:
+                    self.link_filter.add(link)
+                    continue
+                existing_links.add(link)
+
+                # Extract post data
+                title = getattr(entry, 'title', 'No Title')
+            
+                # Get excerpt and inline image from summary/content in one pass
+                excerpt, inline_image = self.extract_excerpt_and_image(entry)
+
+                # Parse published date
+                published_date = self.parse_published_date(entry, source)
+
+                # Extract thumbnail
+                thumbnail_url = self.extract_thumbnail(entry) or inline_image
+                if thumbnail_url:
+                    thumbnail_url = urljoin(link, thumbnail_url)
+                    if len(thumbnail_url) > 200:  # Post.thumbnail_url max_length
+                        thumbnail_url = ''
+
+                # Create new post
+                try:
+                    post = Post(
+                        title=title[:500],  # Limit title length
+                        link=link,
+                        excerpt=excerpt,
+                        thumbnail_url=thumbnail_url,
+                        published_date=published_date,
+                        blog_source=source
+                    )
+                    # Syndicated copies of a known story join its cluster
+                    dedup.fingerprint_post(post)
+                    post.duplicate_of_id = dedup.find_original(post)
+                    post.save()
+                    self.link_filter.add(link)
+                    if raw_link != link:
+                        self.link_filter.add(raw_link)
+                    new_posts_count += 1
+                    new_posts.append(post)
+
+                    if self.with_thumbnails:
+                        thumbnails.process_thumbnail(post)
+                
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.WARNING(f"  ⚠ Could not save post '{title}': {str(e)}")
+                    )
+
+            # Categorize the whole batch at once
+            if self.classifier and new_posts:
+                categorized = self.classifier.classify_batch(new_posts)
+                self.stdout.write(f"  Categorized {len(categorized)}/{len(new_posts)} new posts")
+
+            self.stdout.write(f"  Processed {processed} entries, {new_posts_count} new posts")
+        log.entries_seen = len(entries)
+        log.new_posts = new_posts_count
+        return new_posts_count
+
+    def parse_published_date(self, entry, source=None):
+        """Parse published date from RSS entry (aggregator.dates, fast formats first)"""
+        return self.entry_dates.parse(entry, source.pk if source else None)
+
+    def extract_thumbnail(self, entry):
+        """Extract thumbnail image from RSS entry metadata (no HTML parsing)"""
+        thumbnail_url = ''
+        
+        # Try to get from media_thumbnail
+        if hasattr(entry, 'media_thumbnail'):
+            if entry.media_thumbnail and len(entry.media_thumbnail) > 0:
+                thumbnail_url = entry.media_thumbnail[0].get('url', '')
+        
+        # Try to get from media_content (images only)
+        if not thumbnail_url and hasattr(entry, 'media_content'):
+            for media in entry.media_content:
+                if media.get('medium') == 'image' or media.get('type', '').startswith('image/'):
+                    thumbnail_url = media.get('url', '')
+                    break
+        
+        # Try to get from enclosures
+        if not thumbnail_url and hasattr(entry, 'enclosures'):
+            for enclosure in entry.enclosures:
+                if enclosure.get('type', '').startswith('image/'):
+                    thumbnail_url = enclosure.get('href', '')
+                    break
+        
+        # Try to get from links
+        if not thumbnail_url and hasattr(entry, 'links'):
+            for link in entry.links:
+                if link.get('type', '').startswith('image/'):
+                    thumbnail_url = link.get('href', '')
+                    break
+        
+        # Entry-level image (itunes:image, <image>)
+        if not thumbnail_url and hasattr(entry, 'image'):
+            thumbnail_url = entry.image.get('href', '') if hasattr(entry.image, 'get') else ''
+        
+        return thumbnail_url
+
+    def extract_excerpt_and_image(self, entry):
+        """Build the excerpt and find the first inline image in a single HTML pass"""
+        summary = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
+
+        parser = EntryHTMLParser()
+        parser.feed(summary or '')
+        parser.close()
+
+        excerpt = parser.text
+        if len(excerpt) > 500:
+            excerpt = excerpt[:500] + '...'
+
+        image_url = parser.best_image
+        if not image_url:
+            # Full content is only scanned for images, not text
+            for content in getattr(entry, 'content', None) or []:
+                value = content.get('value', '')
+                if '<img' not in value and '<meta' not in value:
+                    continue
+                content_parser = EntryHTMLParser(collect_text=False)
+                content_parser.feed(value)
+                content_parser.close()
+                image_url = content_parser.best_image
+                if image_url:
+                    break
+
+        return excerpt, image_url
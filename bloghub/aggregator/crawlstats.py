@@ -0,0 +1,162 @@
+"""
+Crawl run history and per-source health.
+
+fetch_feeds creates one CrawlRun and fills one SourceFetchLog per source
+in memory; CrawlRecorder writes the logs with bulk_create every
+CRAWL_LOG_BATCH_SIZE sources instead of one INSERT each. source_health()
+aggregates the recent logs for the admin dashboard and the Prometheus
+endpoint, slowest sources first. The endpoint also reports the API
+throttle counts of aggregator.throttling.
+"""
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import CrawlRun, Post, SourceFetchLog
+
+
+@contextmanager
+def timed(log, field):
+    """Add the elapsed milliseconds of the block to log.<field>"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(log, field, getattr(log, field) + round((time.perf_counter() - start) * 1000))
+
+
+class CrawlRecorder:
+    """Collects the SourceFetchLog rows of one run and writes them in batches"""
+
+    def __init__(self):
+        self.run = CrawlRun.objects.create()
+        self.pending = []
+        self._start = time.perf_counter()
+
+    def start_source(self, source):
+        return SourceFetchLog(run=self.run, blog_source=source, started_at=timezone.now())
+
+    def record(self, log):
+        log.duration_ms = log.fetch_ms + log.parse_ms + log.write_ms
+        self.run.sources_count += 1
+        self.run.entries_seen += log.entries_seen
+        self.run.new_posts += log.new_posts
+        self.run.errors += bool(log.error)
+        self.pending.append(log)
+        if len(self.pending) >= settings.CRAWL_LOG_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            SourceFetchLog.objects.bulk_create(self.pending)
+            self.pending = []
+
+    def finish(self):
+        self.flush()
+        self.run.finished_at = timezone.now()
+        self.run.duration_ms = round((time.perf_counter() - self._start) * 1000)
+        self.run.save()
+        prune()
+        return self.run
+
+
+def prune():
+    """Drop run history older than CRAWL_LOG_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=settings.CRAWL_LOG_RETENTION_DAYS)
+    CrawlRun.objects.filter(started_at__lt=cutoff).delete()
+
+
+def source_health(days=7):
+    """Per-source aggregates over the last days, most total crawl time first"""
+    since = timezone.now() - timedelta(days=days)
+    rows = SourceFetchLog.objects.filter(started_at__gte=since).values(
+        'blog_source_id', 'blog_source__name'
+    ).annotate(
+        fetches=Count('id'),
+        failures=Count('id', filter=~Q(error='')),
+        total_ms=Sum('duration_ms'),
+        avg_ms=Avg('duration_ms'),
+        max_ms=Max('duration_ms'),
+        avg_fetch_ms=Avg('fetch_ms'),
+        avg_parse_ms=Avg('parse_ms'),
+        avg_write_ms=Avg('write_ms'),
+        total_bytes=Sum('bytes'),
+        new_posts=Sum('new_posts'),
+        last_started=Max('started_at'),
+    ).order_by('-total_ms')
+    rows = list(rows)
+
+    # Status and error of each source's latest fetch, in one query
+    latest = {}
+    if rows:
+        logs = SourceFetchLog.objects.filter(
+            started_at__gte=since
+        ).order_by('blog_source_id', '-started_at').values_list(
+            'blog_source_id', 'http_status', 'error'
+        )
+        for source_id, status, error in logs.iterator(chunk_size=2000):
+            latest.setdefault(source_id, (status, error))
+
+    for row in rows:
+        row['error_rate'] = row['failures'] / row['fetches']
+        row['last_status'], row['last_error'] = latest.get(row['blog_source_id'], (None, ''))
+    return rows
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def render_prometheus():
+    """Metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    run = CrawlRun.objects.filter(finished_at__isnull=False).first()
+    if run:
+        metric('bloghub_crawl_last_run_timestamp_seconds', 'gauge', 'End of the last finished crawl',
+               [({}, f'{run.finished_at.timestamp():.0f}')])
+        metric('bloghub_crawl_last_run_duration_seconds', 'gauge', 'Duration of the last finished crawl',
+               [({}, run.duration_ms / 1000)])
+        metric('bloghub_crawl_last_run_new_posts', 'gauge', 'New posts in the last finished crawl',
+               [({}, run.new_posts)])
+        metric('bloghub_crawl_last_run_errors', 'gauge', 'Failed sources in the last finished crawl',
+               [({}, run.errors)])
+
+    health = source_health(days=1)
+    samples = []
+    for row in health:
+        labels = {'source_id': row['blog_source_id'], 'source': row['blog_source__name']}
+        for phase in ('fetch', 'parse', 'write'):
+            samples.append(({**labels, 'phase': phase}, f"{(row[f'avg_{phase}_ms'] or 0) / 1000:.3f}"))
+    metric('bloghub_source_fetch_seconds', 'gauge', 'Average time per crawl phase over 24h', samples)
+    metric('bloghub_source_fetches', 'gauge', 'Fetches over 24h', [
+        ({'source_id': row['blog_source_id'], 'source': row['blog_source__name']}, row['fetches'])
+        for row in health
+    ])
+    metric('bloghub_source_failures', 'gauge', 'Failed fetches over 24h', [
+        ({'source_id': row['blog_source_id'], 'source': row['blog_source__name']}, row['failures'])
+        for row in health
+    ])
+    metric('bloghub_source_last_http_status', 'gauge', 'HTTP status of the latest fetch', [
+        ({'source_id': row['blog_source_id'], 'source': row['blog_source__name']}, row['last_status'])
+        for row in health if row['last_status']
+    ])
+    metric('bloghub_posts', 'gauge', 'Crawled posts in the hot table', [({}, Post.objects.count())])
+
+    from .throttling import stats as throttle_stats
+    metric('bloghub_api_throttle_requests_total', 'counter', 'API requests checked by each throttle bucket scope', [
+        ({'scope': scope, 'result': result}, count)
+        for scope, counts in throttle_stats().items() for result, count in counts.items()
+    ])
+    return '\n'.join(lines) + '\n'
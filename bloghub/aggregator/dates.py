@@ -0,0 +1,107 @@
+"""
+Publication dates of feed entries.
+
+EntryDateParser tries the cheapest source of a date first: the UTC tuple
+feedparser already parsed (entry.published_parsed, ...), used only when the
+raw string names its zone, since feedparser reads zone-less dates as UTC
+while BlogHub reads them in TIME_ZONE. Then come the RFC 822 and ISO 8601
+parsers of the standard library, and dateutil last. The format that worked
+for a source is remembered and tried first for its next entries, so a
+source with unusual dates does not pay for the failed attempts every time.
+"""
+import calendar
+import email.utils
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from dateutil import parser as date_parser
+from django.utils import timezone
+
+DATE_FIELDS = ('published', 'updated', 'created')
+
+# A time followed by a zone: "10:00:00 GMT", "10:00 +0700", "10:00:00.5Z",
+# "10:00+07:00", but not "3:15 PM"
+ZONE_SUFFIX = re.compile(r':\d{2}(?:\.\d+)?\s*(?:[zZ]|[+-]\d{2}:?\d{2}|(?![AaPp][Mm]\s*$)[A-Za-z]{1,5})\s*$')
+
+
+def from_rfc822(value):
+    # The email parser skips words it does not know ("PM"); RFC 822 dates end in a zone
+    if not ZONE_SUFFIX.search(value):
+        raise ValueError(value)
+    parsed = email.utils.parsedate_to_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def from_iso8601(value):
+    value = value.strip()
+    if value[-1:] in 'zZ':
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+def from_dateutil(value):
+    return date_parser.parse(value)
+
+
+STRING_PARSERS = {
+    'rfc822': from_rfc822,
+    'iso8601': from_iso8601,
+    'dateutil': from_dateutil,
+}
+
+
+def from_struct(parsed):
+    """Aware datetime from one of feedparser's UTC time tuples"""
+    return datetime.fromtimestamp(calendar.timegm(parsed), tz=dt_timezone.utc)
+
+
+class EntryDateParser:
+    """Entry dates with the per-source format remembered between entries"""
+
+    def __init__(self):
+        self.formats = {}  # source key -> name of the last parser that worked
+        self.counts = dict.fromkeys(['struct', *STRING_PARSERS, 'missing'], 0)
+
+    def parsers_for(self, key):
+        preferred = self.formats.get(key)
+        if preferred is None:
+            return STRING_PARSERS.items()
+        return [(preferred, STRING_PARSERS[preferred]),
+                *((name, parser) for name, parser in STRING_PARSERS.items() if name != preferred)]
+
+    def parse_value(self, value, key=None):
+        """Aware datetime from a date string, None when no parser understands it"""
+        for name, parser in self.parsers_for(key):
+            try:
+                parsed = parser(value)
+            except (ValueError, TypeError, OverflowError, IndexError):
+                continue
+            self.formats[key] = name
+            self.counts[name] += 1
+            if parsed.tzinfo is None:
+                parsed = timezone.make_aware(parsed)
+            return parsed
+        return None
+
+    def parse(self, entry, key=None):
+        """Publication date of a feed entry, now when it has none"""
+        for field in DATE_FIELDS:
+            value = entry.get(field)
+            if not value or not isinstance(value, str):
+                continue
+            parsed = entry.get(f'{field}_parsed')
+            if parsed and ZONE_SUFFIX.search(value):
+                try:
+                    result = from_struct(parsed)
+                except (ValueError, OverflowError):
+                    pass
+                else:
+                    self.counts['struct'] += 1
+                    return result
+            result = self.parse_value(value, key)
+            if result is not None:
+                return result
+        self.counts['missing'] += 1
+        return timezone.now()
@@ -0,0 +1,126 @@
+"""
+Near-duplicate detection for syndicated posts.
+
+Each Post stores a 64-bit SimHash of its title + excerpt shingles and the
+four 16-bit bands of it. Two fingerprints within MAX_DISTANCE bits (<= 3)
+must share at least one band exactly, so candidates come from four
+indexed equality lookups and are then checked by Hamming distance.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Post
+from .normalization import plain_text
+
+BAND_BITS = 16
+BAND_FIELDS = ('simhash_b0', 'simhash_b1', 'simhash_b2', 'simhash_b3')
+CANDIDATE_CHUNK_SIZE = 500
+
+# Bit counting without a per-bit Python loop: every hash bit is "spread"
+# into its own 16-bit lane of a big integer, so summing the spread values
+# counts the ones for all 64 bit positions at once.
+LANE_BITS = 16
+MAX_TOKENS = (1 << LANE_BITS) - 1
+SPREAD_TABLES = [
+    [
+        sum(1 << ((position * 8 + bit) * LANE_BITS) for bit in range(8) if byte >> bit & 1)
+        for byte in range(256)
+    ]
+    for position in range(8)
+]
+LANE_MASK = (1 << LANE_BITS) - 1
+
+
+def shingles(text):
+    words = plain_text(text).split()
+    if len(words) < 2:
+        return words
+    return [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def simhash(text):
+    """Unsigned 64-bit SimHash, or None when the text is too short to be reliable"""
+    tokens = shingles(text)[:MAX_TOKENS]
+    if len(tokens) < settings.DUPLICATE_MIN_TOKENS:
+        return None
+
+    t0, t1, t2, t3, t4, t5, t6, t7 = SPREAD_TABLES
+    ones = 0
+    for token in tokens:
+        value = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        ones += (t0[value[7]] + t1[value[6]] + t2[value[5]] + t3[value[4]] +
+                 t4[value[3]] + t5[value[2]] + t6[value[1]] + t7[value[0]])
+
+    # A bit is set when more tokens have it set than not (+1/-1 weights)
+    fingerprint = 0
+    total = len(tokens)
+    for bit in range(64):
+        if 2 * (ones >> (bit * LANE_BITS) & LANE_MASK) > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def to_signed(value):
+    """BigIntegerField is signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (index * BAND_BITS) & mask for index in range(len(BAND_FIELDS))]
+
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def fingerprint_post(post):
+    """Fill simhash fields on an unsaved/in-memory post"""
+    fingerprint = simhash(f'{post.title} {post.excerpt}')
+    post.simhash = to_signed(fingerprint) if fingerprint is not None else None
+    for field, value in zip(BAND_FIELDS, bands(fingerprint) if fingerprint is not None else [None] * 4):
+        setattr(post, field, value)
+    return fingerprint
+
+
+def find_original(post):
+    """Return the cluster head this post duplicates, or None"""
+    if post.simhash is None:
+        return None
+    fingerprint = to_unsigned(post.simhash)
+
+    condition = Q()
+    for field in BAND_FIELDS:
+        condition |= Q(**{field: getattr(post, field)})
+
+    candidates = Post.objects.filter(condition)
+    if post.pk:
+        # Only older posts can be the head, which keeps backfills cycle free
+        candidates = candidates.filter(id__lt=post.pk)
+    # Every band match is checked: a common band value can be shared by many
+    # unrelated posts, and cutting the list first would hide the real copy
+    candidates = candidates.values_list('id', 'simhash', 'duplicate_of_id').order_by('id')
+
+    for candidate_id, candidate_hash, duplicate_of_id in candidates.iterator(chunk_size=CANDIDATE_CHUNK_SIZE):
+        if distance(fingerprint, to_unsigned(candidate_hash)) <= settings.DUPLICATE_MAX_DISTANCE:
+            # Always point at the head so clusters stay one level deep
+            return duplicate_of_id or candidate_id
+    return None
+
+
+def one_per_story(posts):
+    """
+    One post per cluster among posts (a filtered Post queryset): the head
+    when it is in posts, else the oldest copy that is, e.g. when the head's
+    source is inactive or the head is in another category than the page.
+    """
+    earlier = posts.filter(
+        Q(pk=OuterRef('duplicate_of')) | Q(duplicate_of=OuterRef('duplicate_of'), pk__lt=OuterRef('pk'))
+    )
+    return posts.filter(Q(duplicate_of__isnull=True) | ~Exists(earlier.values('pk')))
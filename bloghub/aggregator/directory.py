@@ -0,0 +1,85 @@
+"""
+Cached blog source directory grouped by the stored, accent-folded sort letter.
+
+The cache keys carry a version kept in the shared cache, so a crawl saving
+last_fetched in fetch_feeds or crawl_worker also refreshes the web
+processes' copies.
+"""
+from django.core.cache import cache, caches
+from django.db.models import Count, Q
+
+from .models import BlogSource
+
+VERSION_KEY = 'source_directory:version'
+DIRECTORY_TIMEOUT = 60 * 60
+
+
+def get_version():
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        shared.add(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate():
+    shared = caches['shared']
+    try:
+        shared.incr(VERSION_KEY)
+    except ValueError:
+        shared.set(VERSION_KEY, 2, None)
+
+
+def _query(search='', letter=''):
+    sources = BlogSource.objects.filter(is_active=True)
+    if search:
+        sources = sources.filter(
+            Q(name__icontains=search) |
+            Q(description__icontains=search) |
+            Q(author__icontains=search)
+        )
+    if letter:
+        sources = sources.filter(sort_letter=letter)
+    return sources.annotate(post_count=Count('posts')).order_by('sort_letter', 'name')
+
+
+def _build(search='', letter=''):
+    grouped_sources = {}
+    total_posts = 0
+    for source in _query(search, letter):
+        grouped_sources.setdefault(source.sort_letter, []).append(source)
+        total_posts += source.post_count
+
+    return {
+        'grouped_sources': grouped_sources,
+        'total_sources': sum(len(sources) for sources in grouped_sources.values()),
+        'total_posts': total_posts,
+    }
+
+
+def available_letters():
+    version = get_version()
+    key = f'source_directory:{version}:letters'
+    letters = cache.get(key)
+    if letters is None:
+        letters = list(
+            BlogSource.objects.filter(is_active=True)
+            .order_by('sort_letter').values_list('sort_letter', flat=True).distinct()
+        )
+        cache.set(key, letters, DIRECTORY_TIMEOUT)
+    return letters
+
+
+def get_directory(search='', letter=''):
+    """Directory data for blog_sources_list; searches are not cached"""
+    letter = letter.upper()[:1]
+    if search:
+        return _build(search, letter)
+
+    key = f'source_directory:{get_version()}:{letter or "*"}'
+    directory = cache.get(key)
+    if directory is None:
+        directory = _build(letter=letter)
+        cache.set(key, directory, DIRECTORY_TIMEOUT)
+    return directory
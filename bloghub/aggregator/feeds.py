@@ -0,0 +1,264 @@
+"""
+Outbound RSS 2.0, Atom and JSON Feed for crawled posts: everything, one
+category or one source.
+
+Documents are streamed item by item from a (published_date, id) keyset query.
+A feed's version is the newest post id and the newest updated_at in its
+scope, plus a generation in the shared cache that source and category
+changes bump: it is the ETag for conditional GET and part of the cache key,
+so a feed is regenerated only after its posts changed. Older pages are
+reached through ?before=; the cached documents only embed URLs built from
+the route and that cursor, and are kept per scheme and host.
+"""
+import json
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+
+from .models import BlogSource, Category, Post
+from . import dedup
+
+SITE_TITLE = 'BlogHub'
+SITE_DESCRIPTION = 'Tổng hợp Blog Cá nhân'
+
+CONTENT_TYPES = {
+    'xml': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Not allowed anywhere in an XML 1.0 document, but found in crawled titles and excerpts
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+GENERATION_KEY = 'feeds:generation'
+
+
+def get_generation():
+    shared = caches['shared']
+    generation = shared.get(GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        shared.add(GENERATION_KEY, generation, None)
+    return generation
+
+
+def invalidate():
+    """Regenerate every feed: source or category metadata, or which posts are shown, changed"""
+    shared = caches['shared']
+    try:
+        shared.incr(GENERATION_KEY)
+    except ValueError:
+        shared.set(GENERATION_KEY, 2, None)
+
+
+class FeedScope:
+    """What one feed covers: metadata plus the base queryset of its posts"""
+
+    def __init__(self, key, title, description, home_url, posts, url_name, url_kwargs=None):
+        self.key = key
+        self.title = title
+        self.description = description
+        self.home_url = home_url
+        self.posts = posts
+        self.url_name = url_name
+        self.url_kwargs = url_kwargs or {}
+
+    def feed_url(self, fmt):
+        return reverse(self.url_name, kwargs={**self.url_kwargs, 'fmt': fmt})
+
+    def version(self):
+        """(version string, newest updated_at or None for an empty feed)"""
+        newest_id = self.posts.order_by('-id').values_list('id', flat=True).first() or 0
+        updated = self.posts.order_by('-updated_at').values_list('updated_at', flat=True).first()
+        stamp = (updated - EPOCH) // timedelta(microseconds=1) if updated else 0
+        return f'{get_generation()}.{newest_id}.{stamp}', updated
+
+    def page(self, cursor=None):
+        """(items iterator, cursor of the next page or None)"""
+        posts = dedup.one_per_story(
+            self.posts.filter(blog_source__is_active=True)
+        ).order_by('-published_date', '-id')
+        if cursor:
+            published_date, post_id = cursor
+            posts = posts.filter(
+                Q(published_date__lt=published_date) |
+                Q(published_date=published_date, id__lt=post_id)
+            )
+        size = settings.FEED_ITEMS
+        # Last row of this page, known up front so headers can link the next page
+        last = posts.values_list('published_date', 'id')[size - 1:size].first()
+        next_cursor = encode_cursor(*last) if last else None
+        items = posts.select_related('blog_source', 'category')[:size].iterator(chunk_size=size)
+        return items, next_cursor
+
+
+def get_scope(kind, key=None):
+    if kind == 'all':
+        return FeedScope(
+            'all', SITE_TITLE, SITE_DESCRIPTION, reverse('aggregator:all_posts'), Post.objects.all(),
+            'aggregator:feed',
+        )
+    if kind == 'category':
+        category = get_object_or_404(Category, slug=key, is_active=True)
+        return FeedScope(
+            f'category:{category.pk}', f'{SITE_TITLE} - {category.name}',
+            category.description or SITE_DESCRIPTION, category.get_absolute_url(),
+            Post.objects.filter(category=category), 'aggregator:category_feed', {'key': category.slug},
+        )
+    if kind == 'source':
+        source = get_object_or_404(BlogSource, pk=key, is_active=True)
+        return FeedScope(
+            f'source:{source.pk}', f'{SITE_TITLE} - {source.name}',
+            source.description or SITE_DESCRIPTION, source.homepage_url or reverse('aggregator:blog_sources'),
+            Post.objects.filter(blog_source=source), 'aggregator:source_feed', {'key': source.pk},
+        )
+    raise Http404
+
+
+def encode_cursor(published_date, post_id):
+    return f'{(published_date - EPOCH) // timedelta(microseconds=1)}_{post_id}'
+
+
+def decode_cursor(value):
+    """'<published microseconds>_<id>' -> (datetime, id); None when malformed"""
+    try:
+        micros, post_id = value.split('_')
+        return EPOCH + timedelta(microseconds=int(micros)), int(post_id)
+    except (ValueError, OverflowError):
+        return None
+
+
+def cache_key(request, fmt, scope, version, cursor_value):
+    # Documents embed absolute URLs: one copy per scheme and host it is served on
+    origin = f'{request.scheme}://{request.get_host()}'
+    return f'feed:{origin}:{fmt}:{scope.key}:{version}:{cursor_value or ""}'
+
+
+def stream_and_cache(chunks, key):
+    """Yield chunks to the client and store the whole document once complete"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts).encode('utf-8'), settings.FEED_CACHE_TIMEOUT)
+
+
+class FeedURLs:
+    """Absolute URLs of the feed being rendered, from the route and cursor only (the document is cached)"""
+
+    def __init__(self, request, scope, fmt, cursor_value, next_cursor):
+        path = scope.feed_url(fmt)
+        self.self = request.build_absolute_uri(f'{path}?before={cursor_value}' if cursor_value else path)
+        self.home = request.build_absolute_uri(scope.home_url)
+        self.next = request.build_absolute_uri(f'{path}?before={next_cursor}') if next_cursor else None
+
+
+def _x(value):
+    return escape(INVALID_XML_CHARS.sub('', value or ''))
+
+
+def _attr(value):
+    return quoteattr(INVALID_XML_CHARS.sub('', value or ''))
+
+
+def _author(post):
+    return post.blog_source.author or post.blog_source.name
+
+
+def rss_document(scope, items, urls, updated):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+    yield (
+        f'<title>{_x(scope.title)}</title><link>{_x(urls.home)}</link>'
+        f'<description>{_x(scope.description)}</description><language>vi</language>'
+        f'<atom:link href={_attr(urls.self)} rel="self" type="application/rss+xml"/>'
+    )
+    if urls.next:
+        yield f'<atom:link href={_attr(urls.next)} rel="next"/>'
+    if updated:
+        yield f'<lastBuildDate>{rfc2822_date(updated)}</lastBuildDate>'
+    for post in items:
+        category = f'<category>{_x(post.category.name)}</category>' if post.category else ''
+        yield (
+            f'<item><title>{_x(post.title)}</title><link>{_x(post.link)}</link>'
+            f'<guid isPermaLink="true">{_x(post.link)}</guid>'
+            f'<description>{_x(post.excerpt)}</description>'
+            f'<pubDate>{rfc2822_date(post.published_date)}</pubDate>'
+            f'<dc:creator>{_x(_author(post))}</dc:creator>'
+            f'{category}<source url={_attr(post.blog_source.rss_url)}>{_x(post.blog_source.name)}</source></item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def atom_document(scope, items, urls, updated):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="vi">'
+    yield (
+        f'<title>{_x(scope.title)}</title><subtitle>{_x(scope.description)}</subtitle>'
+        f'<id>{_x(urls.self)}</id><link href={_attr(urls.self)} rel="self"/>'
+        f'<link href={_attr(urls.home)} rel="alternate"/>'
+        f'<updated>{rfc3339_date(updated or EPOCH)}</updated>'
+    )
+    if urls.next:
+        yield f'<link href={_attr(urls.next)} rel="next"/>'
+    for post in items:
+        category = f'<category term={_attr(post.category.name)}/>' if post.category else ''
+        yield (
+            f'<entry><title>{_x(post.title)}</title><id>{_x(post.link)}</id>'
+            f'<link href={_attr(post.link)} rel="alternate"/>'
+            f'<published>{rfc3339_date(post.published_date)}</published>'
+            f'<updated>{rfc3339_date(post.updated_at)}</updated>'
+            f'<author><name>{_x(_author(post))}</name></author>'
+            f'<summary>{_x(post.excerpt)}</summary>{category}</entry>'
+        )
+    yield '</feed>\n'
+
+
+def json_document(scope, items, urls, updated):
+    header = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': scope.title,
+        'description': scope.description,
+        'home_page_url': urls.home,
+        'feed_url': urls.self,
+        'language': 'vi',
+    }
+    if urls.next:
+        header['next_url'] = urls.next
+    # Header without the closing brace, then items one by one
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "items": ['
+    separator = ''
+    for post in items:
+        item = {
+            'id': post.link,
+            'url': post.link,
+            'title': post.title,
+            'summary': post.excerpt,
+            'date_published': rfc3339_date(post.published_date),
+            'date_modified': rfc3339_date(post.updated_at),
+            'authors': [{'name': _author(post), 'url': post.blog_source.homepage_url or None}],
+        }
+        if post.thumbnail_url:
+            item['image'] = post.thumbnail_url
+        if post.category:
+            item['tags'] = [post.category.name]
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ','
+    yield ']}\n'
+
+
+WRITERS = {
+    'xml': rss_document,
+    'atom': atom_document,
+    'json': json_document,
+}
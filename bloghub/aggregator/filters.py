@@ -0,0 +1,33 @@
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework import filters
+
+from .normalization import search_key
+
+
+class FoldedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter over the stored *_folded columns: the query is folded the
+    same way, so 'lap trinh' matches 'Lập trình'. Other search fields (raw
+    columns such as MyPost.content) are searched with the term as typed.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        lookups = [
+            (self.construct_search(str(field), queryset), str(field).endswith('_folded'))
+            for field in search_fields
+        ]
+        conditions = []
+        for term in search_terms:
+            folded = search_key(term)
+            conditions.append(reduce(operator.or_, (
+                Q(**{lookup: folded if is_folded else term}) for lookup, is_folded in lookups
+            )))
+        return queryset.filter(reduce(operator.and_, conditions))
@@ -0,0 +1,125 @@
+"""
+Per-object fragment cache for rendered cards.
+
+A card is keyed by template, model, id and the fields that change its
+markup (e.g. updated_at), so a crawled Post renders once and is then served
+from cache. Category and source edits bump a generation in the shared
+cache, which the crawl processes and the web processes all see. Each page does one get_many/set_many round trip instead of one
+cache call per card. Cache misses are rendered by CARD_TEMPLATE_ENGINE when
+it has the card template (the Jinja2 copies in aggregator/jinja2/), by the
+Django engine otherwise.
+"""
+from collections import namedtuple
+from datetime import datetime
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.template import TemplateDoesNotExist, engines
+from django.utils.safestring import mark_safe
+
+from .models import ArchivedPost, BlogSource, Post, MyPost
+
+Card = namedtuple('Card', ['object', 'html'])
+
+# Fields (dotted through relations) whose change must re-render the card, in addition to the pk
+VERSION_FIELDS = {
+    Post: ('updated_at',),
+    MyPost: ('updated_at', 'views_count', 'author.username'),
+    BlogSource: ('updated_at', 'last_fetched'),
+    ArchivedPost: ('archived_at',),
+}
+
+GENERATION_KEY = 'card:generation'
+
+
+def get_generation():
+    """Cards embed category/source names, so those models bump a global generation"""
+    shared = caches['shared']
+    generation = shared.get(GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        shared.add(GENERATION_KEY, generation, None)
+    return generation
+
+
+def bump_generation():
+    shared = caches['shared']
+    try:
+        shared.incr(GENERATION_KEY)
+    except ValueError:
+        shared.set(GENERATION_KEY, 2, None)
+
+
+def _version_part(value):
+    if isinstance(value, datetime):
+        return str(value.timestamp())
+    return str(value)
+
+
+def card_key(generation, template_name, obj):
+    version = '-'.join(_version_part(attrgetter(field)(obj)) for field in VERSION_FIELDS[type(obj)])
+    template = template_name.rsplit('/', 1)[-1].split('.')[0]
+    return f'card:{generation}:{template}:{obj._meta.label_lower}:{obj.pk}:{version}'
+
+
+# template name -> alias of the engine rendering it
+_card_engines = {}
+
+
+def get_card_template(template_name):
+    alias = _card_engines.get(template_name)
+    if alias is None:
+        alias = settings.CARD_TEMPLATE_ENGINE
+        try:
+            engines[alias].get_template(template_name)
+        except TemplateDoesNotExist:
+            alias = 'django'
+        _card_engines[template_name] = alias
+    return engines[alias].get_template(template_name)
+
+
+def render_many(entries):
+    """Render (object, template_name, context_name) entries, returning HTML in order"""
+    if not entries:
+        return []
+
+    generation = get_generation()
+    keys = [card_key(generation, template_name, obj) for obj, template_name, _ in entries]
+    cached = cache.get_many(keys)
+
+    html_list = []
+    missing = {}
+    for key, (obj, template_name, context_name) in zip(keys, entries):
+        html = cached.get(key)
+        if html is None:
+            html = get_card_template(template_name).render({context_name: obj})
+            missing[key] = html
+        html_list.append(mark_safe(html))
+
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+
+    return html_list
+
+
+def render_cards(objects, template_name, context_name='post'):
+    objects = list(objects)
+    html_list = render_many([(obj, template_name, context_name) for obj in objects])
+    return [Card(obj, html) for obj, html in zip(objects, html_list)]
+
+
+POST_ITEM_TEMPLATES = {
+    'external': 'aggregator/partials/post_card.html',
+    'archived': 'aggregator/partials/post_card.html',
+    'my': 'aggregator/partials/my_post_card.html',
+}
+
+
+def render_post_items(items):
+    """Attach 'html' to the mixed {'type', 'object'} items used by listing pages"""
+    items = list(items)
+    entries = [(item['object'], POST_ITEM_TEMPLATES[item['type']], 'post') for item in items]
+    for item, html in zip(items, render_many(entries)):
+        item['html'] = html
+    return items
@@ -0,0 +1,34 @@
+"""
+Jinja2 environment for the optional card templates in aggregator/jinja2/.
+
+Only the hot card partials have Jinja2 copies; fragments renders them with
+the engine named by CARD_TEMPLATE_ENGINE. The globals and filters below
+stand in for the Django tags and filters those partials use, with the same
+output (dates are shown in the current time zone, like Django's |date).
+"""
+from django.template.defaultfilters import date as date_filter
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+from .templatetags.aggregator_tags import post_thumbnail
+
+
+def url(viewname, *args):
+    return reverse(viewname, args=args)
+
+
+def date(value, arg=None):
+    return date_filter(template_localtime(value), arg)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'post_thumbnail': post_thumbnail,
+    })
+    env.filters['date'] = date
+    return env
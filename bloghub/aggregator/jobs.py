@@ -0,0 +1,126 @@
+"""
+Database-backed crawl queue for crawl_worker.
+
+Every active BlogSource has one recurring FetchJob. A worker claims due jobs
+by taking a lease (random token + expiry): with SELECT ... FOR UPDATE SKIP
+LOCKED where the database supports it (PostgreSQL), otherwise with a
+conditional UPDATE per job, which SQLite applies one writer at a time. A job
+whose worker died becomes claimable again once its lease expires. Finishing
+a job requires the token, so a worker that lost its lease cannot reschedule
+a job another worker now owns.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import websub
+from .models import BlogSource, FetchJob
+
+
+def sync_jobs():
+    """One job per active source; jobs of inactive or deleted sources are dropped"""
+    active_ids = set(BlogSource.objects.filter(is_active=True).values_list('id', flat=True))
+    job_source_ids = set(FetchJob.objects.values_list('blog_source_id', flat=True))
+    FetchJob.objects.bulk_create(
+        [FetchJob(blog_source_id=source_id) for source_id in active_ids - job_source_ids],
+        ignore_conflicts=True,
+    )
+    stale = job_source_ids - active_ids
+    if stale:
+        FetchJob.objects.filter(blog_source_id__in=stale, status=FetchJob.QUEUED).delete()
+
+
+def claimable(now):
+    return (
+        Q(status=FetchJob.QUEUED, run_after__lte=now) |
+        Q(status=FetchJob.LEASED, lease_expires__lt=now)
+    )
+
+
+def claim(worker_id, limit=1, lease_seconds=None):
+    """Lease up to limit due jobs for worker_id; returns them with their source"""
+    now = timezone.now()
+    lease = {
+        'status': FetchJob.LEASED,
+        'leased_by': worker_id[:100],
+        'lease_expires': now + timedelta(seconds=lease_seconds or settings.CRAWL_LEASE_SECONDS),
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(
+                FetchJob.objects.select_for_update(skip_locked=True)
+                .filter(claimable(now)).order_by('run_after')[:limit]
+            )
+            for job in jobs:
+                for field, value in lease.items():
+                    setattr(job, field, value)
+                job.lease_token = uuid.uuid4().hex
+            FetchJob.objects.bulk_update(jobs, [*lease, 'lease_token'])
+        claimed = {job.pk: job.lease_token for job in jobs}
+    else:
+        # Compare-and-set: the UPDATE re-checks that the job is still
+        # claimable, so of two racing workers only one gets a row back
+        claimed = {}
+        candidates = FetchJob.objects.filter(claimable(now)).order_by('run_after').values_list('id', flat=True)
+        for job_id in candidates[:limit * 4]:
+            token = uuid.uuid4().hex
+            if FetchJob.objects.filter(claimable(now), pk=job_id).update(lease_token=token, **lease):
+                claimed[job_id] = token
+                if len(claimed) == limit:
+                    break
+
+    jobs = list(FetchJob.objects.filter(pk__in=claimed, lease_token__in=claimed.values()).select_related('blog_source'))
+    jobs.sort(key=lambda job: job.run_after)
+    return jobs
+
+
+def renew(job, lease_seconds=None):
+    """Extend the lease; False when it was lost to another worker"""
+    expires = timezone.now() + timedelta(seconds=lease_seconds or settings.CRAWL_LEASE_SECONDS)
+    return bool(FetchJob.objects.filter(pk=job.pk, lease_token=job.lease_token).update(lease_expires=expires))
+
+
+def finish(job, error=None):
+    """Release the lease and schedule the next crawl (with backoff after errors,
+    and the long WebSub fallback interval for sources a hub pushes)"""
+    now = timezone.now()
+    interval = timedelta(minutes=settings.CRAWL_INTERVAL_MINUTES)
+    if error:
+        # Exponent capped first: timedelta overflows long before attempts stop growing
+        delay = min(interval * 2 ** min(job.attempts, 16), timedelta(minutes=settings.CRAWL_MAX_BACKOFF_MINUTES))
+        changes = {'attempts': F('attempts') + 1, 'last_error': error[:2000]}
+    else:
+        delay = websub.fallback_interval() if websub.is_pushed(job.blog_source_id) else interval
+        changes = {'attempts': 0, 'last_error': ''}
+
+    return bool(FetchJob.objects.filter(pk=job.pk, lease_token=job.lease_token).update(
+        status=FetchJob.QUEUED,
+        run_after=now + delay,
+        leased_by='',
+        lease_token='',
+        lease_expires=None,
+        last_finished=now,
+        **changes,
+    ))
+
+
+def postpone(source_ids):
+    """Push the queued jobs of just-crawled sources one interval ahead"""
+    run_after = timezone.now() + timedelta(minutes=settings.CRAWL_INTERVAL_MINUTES)
+    return FetchJob.objects.filter(blog_source_id__in=source_ids, status=FetchJob.QUEUED).update(run_after=run_after)
+
+
+def run_now(source_ids):
+    """Make the queued jobs of source_ids (ids or a values() queryset) due immediately"""
+    sync_jobs()
+    return FetchJob.objects.filter(blog_source_id__in=source_ids, status=FetchJob.QUEUED).update(run_after=timezone.now())
+
+
+def run_all_now():
+    """Make every queued job due immediately"""
+    return FetchJob.objects.filter(status=FetchJob.QUEUED).update(run_after=timezone.now())
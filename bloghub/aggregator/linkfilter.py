@@ -0,0 +1,139 @@
+"""
+Persisted Bloom filter of known post links, used by fetch_feeds and the
+OPML first fetch. Long-lived processes (crawl_worker, WebSub deliveries)
+use NoFilter: a filter loaded once fills up as they add links.
+
+Every link of Post and ArchivedPost (raw and canonical) is added to the
+filter. A link the filter has seen is treated as known and skipped without a
+query; only the links it has not seen are checked against the database, so a
+filter that missed inserts made elsewhere (admin, another worker) is still
+safe. The cost is that a new link colliding with the filter (a false
+positive, LINK_FILTER_ERROR_RATE) is skipped.
+"""
+import hashlib
+import logging
+import math
+import struct
+
+from django.conf import settings
+
+from .models import ArchivedPost, Post
+from .normalization import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BHBF1'
+HEADER = struct.Struct('>5sQQQ')  # magic, bits, hashes, items
+
+
+class BloomFilter:
+    def __init__(self, bits, hashes, items=0, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.items = items
+        self.data = data if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        """Optimal bits and hash count for capacity items at error_rate"""
+        capacity = max(capacity, 1)
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, value):
+        data = self.data
+        for position in self._positions(value):
+            data[position >> 3] |= 1 << (position & 7)
+        self.items += 1
+
+    def __contains__(self, value):
+        data = self.data
+        for position in self._positions(value):
+            if not data[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def expected_error_rate(self):
+        """Expected false-positive rate at the current number of items"""
+        return (1 - math.exp(-self.hashes * self.items / self.bits)) ** self.hashes
+
+    def fill_ratio(self):
+        return bin(int.from_bytes(self.data, 'little')).count('1') / self.bits
+
+    def save(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.bits, self.hashes, self.items))
+            f.write(self.data)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            magic, bits, hashes, items = HEADER.unpack(f.read(HEADER.size))
+            data = bytearray(f.read())
+        if magic != MAGIC or len(data) != (bits + 7) // 8:
+            raise ValueError(f"Not a link filter: {path}")
+        return cls(bits, hashes, items, data)
+
+
+class NoFilter:
+    """Stands in for the filter where none is kept: every link is checked in the database"""
+
+    def add(self, value):
+        pass
+
+    def __contains__(self, value):
+        return False
+
+
+def known_links():
+    """Raw and canonical form of every stored link"""
+    for model in (Post, ArchivedPost):
+        for link in model.objects.values_list('link', flat=True).iterator(chunk_size=5000):
+            yield link
+            canonical = canonicalize_url(link)
+            if canonical != link:
+                yield canonical
+
+
+def build_filter():
+    """New filter sized for twice the current number of posts"""
+    count = Post.objects.count() + ArchivedPost.objects.count()
+    capacity = max(settings.LINK_FILTER_CAPACITY, count * 2)
+    link_filter = BloomFilter.for_capacity(capacity, settings.LINK_FILTER_ERROR_RATE)
+    for link in known_links():
+        link_filter.add(link)
+    return link_filter
+
+
+def capacity(link_filter):
+    """Items the filter holds at LINK_FILTER_ERROR_RATE"""
+    return int(link_filter.bits * math.log(2) ** 2 / -math.log(settings.LINK_FILTER_ERROR_RATE))
+
+
+def load_filter():
+    """Filter from LINK_FILTER_PATH, rebuilt when missing, unreadable or over capacity"""
+    path = settings.LINK_FILTER_PATH
+    if path.exists():
+        try:
+            link_filter = BloomFilter.load(path)
+            if link_filter.items <= capacity(link_filter):
+                return link_filter
+            logger.info("Link filter is over capacity, rebuilding")
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Could not load link filter {path}: {e}")
+    link_filter = build_filter()
+    link_filter.save(path)
+    return link_filter
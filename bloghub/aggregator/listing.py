@@ -0,0 +1,109 @@
+"""
+Listing pages (all posts, category): pagination and streamed rendering.
+
+MergedPosts lets Paginator page through crawled, archived and own posts as
+one newest-first list. count() is one COUNT per queryset and a page reads
+only the first rows of each queryset in index order, merged in Python,
+instead of loading and sorting every post of the site. ScrollPaginator
+skips the COUNT for the infinite scroll page.
+
+render_listing() streams the page when STREAM_LISTING_PAGES is on: the
+template up to CARDS_MARKER goes out before the post queries run, the cards
+follow in batches of LISTING_STREAM_BATCH as they come out of the fragment
+cache, and the rest of the template closes the document. The template is
+rendered a second time with the page for that last part, since it may
+depend on it (pagination links).
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from . import fragments
+
+CARDS_MARKER = '<!-- cards -->'
+EMPTY_LIST_TEMPLATE = 'aggregator/partials/all_post_list.html'
+
+
+class MergedPosts:
+    """Newest-first union of post querysets, sliceable and countable for Paginator"""
+
+    def __init__(self):
+        self.sources = []
+
+    def add(self, item_type, queryset, *date_fields):
+        """Add queryset; its items are dated by the first non-null of date_fields"""
+        date_fields = date_fields or ('published_date',)
+        listed_date = Coalesce(*date_fields) if len(date_fields) > 1 else F(date_fields[0])
+        queryset = queryset.annotate(listed_date=listed_date).order_by('-listed_date', '-id')
+        self.sources.append((item_type, queryset))
+
+    def count(self):
+        return sum(queryset.count() for _, queryset in self.sources)
+
+    def __len__(self):
+        return self.count()
+
+    @staticmethod
+    def items(item_type, posts):
+        for post in posts:
+            yield {'type': item_type, 'object': post, 'published_date': post.listed_date}
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        streams = [self.items(item_type, queryset[:stop]) for item_type, queryset in self.sources]
+        merged = heapq.merge(*streams, key=lambda item: (item['published_date'], item['object'].pk), reverse=True)
+        return list(islice(merged, start, stop))
+
+
+class ScrollPaginator(Paginator):
+    """
+    Paginator of infinite scroll pages, which never show a page count: no
+    COUNT query, and a page past the end is empty instead of the last one.
+    """
+
+    def get_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+def render_listing(request, template_name, context, get_page):
+    """Render a listing template; get_page() returns the Page of post items"""
+    if not settings.STREAM_LISTING_PAGES:
+        page_obj = get_page()
+        fragments.render_post_items(page_obj.object_list)
+        return render(request, template_name, {**context, 'page_obj': page_obj})
+
+    def chunks():
+        head, _ = render_to_string(
+            template_name, {**context, 'page_obj': None, 'stream_cards': True}, request
+        ).split(CARDS_MARKER, 1)
+        yield head
+
+        page_obj = get_page()
+        items = list(page_obj.object_list)
+        if not items:
+            yield render_to_string(EMPTY_LIST_TEMPLATE, {'page_obj': page_obj}, request)
+        batch_size = settings.LISTING_STREAM_BATCH
+        for start in range(0, len(items), batch_size):
+            batch = fragments.render_post_items(items[start:start + batch_size])
+            yield ''.join(item['html'] for item in batch)
+
+        _, tail = render_to_string(
+            template_name, {**context, 'page_obj': page_obj, 'stream_cards': True}, request
+        ).split(CARDS_MARKER, 1)
+        yield tail
+
+    return StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from aggregator.archive import archive_source, compact, retention_cutoff
+from aggregator.models import BlogSource
+
+
+class Command(BaseCommand):
+    help = 'Move old posts into the archive table, then ANALYZE (schedule daily, --vacuum weekly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source-id',
+            type=int,
+            help='Only archive posts of this blog source',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Posts moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the posts that would be archived',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Also VACUUM the database to give the freed pages back',
+        )
+
+    def handle(self, *args, **options):
+        sources = BlogSource.objects.order_by('id')
+        if options['source_id']:
+            sources = sources.filter(id=options['source_id'])
+
+        total = 0
+        for source in sources:
+            cutoff = retention_cutoff(source)
+            if cutoff is None:
+                continue
+            moved = archive_source(source, cutoff, options['batch_size'], options['dry_run'])
+            if moved:
+                self.stdout.write(f"  {source.name}: {moved} posts before {cutoff:%Y-%m-%d}")
+            total += moved
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {total} posts would be archived"))
+            return
+
+        start = time.perf_counter()
+        compact(vacuum=options['vacuum'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Archived {total} posts, "
+                f"{'VACUUM + ' if options['vacuum'] else ''}ANALYZE in {time.perf_counter() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from aggregator.models import BlogSource, Post, Category, MyPost
+from aggregator.normalization import sort_letter
+
+BENCH_DOMAIN = 'bench.invalid'
+
+WORDS = (
+    'lập trình python django hiệu năng cơ sở dữ liệu đời sống du lịch '
+    'ẩm thực công nghệ sách học tập kinh nghiệm tối ưu thiết kế web'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Measure page render time (run against a copy of the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create N synthetic posts (on bench.invalid) before measuring',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Requests per page (default: 20)',
+        )
+        parser.add_argument(
+            '--pages',
+            default='index,all_posts,blog_sources,category_detail',
+            help='Comma separated page names to measure',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Clear the cache before every request',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+
+        client = Client(HTTP_HOST='localhost')
+        repeat = options['repeat']
+
+        self.stdout.write(f"{'page':<20}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'KB':>10}")
+        for name in options['pages'].split(','):
+            url = self.page_url(name.strip())
+            if not url:
+                self.stdout.write(self.style.WARNING(f"⚠ Skipping {name}: no data"))
+                continue
+
+            timings = []
+            size = 0
+            for _ in range(repeat + 1):
+                if options['cold']:
+                    cache.clear()
+                start = time.perf_counter()
+                response = client.get(url)
+                content = b''.join(response) if response.streaming else response.content
+                timings.append((time.perf_counter() - start) * 1000)
+                size = len(content)
+
+            timings = sorted(timings[1:])  # First request warms up imports/templates
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{name:<20}{statistics.mean(timings):>10.1f}{statistics.median(timings):>10.1f}"
+                f"{p95:>10.1f}{size / 1024:>10.1f}"
+            )
+
+    def page_url(self, name):
+        if name == 'category_detail':
+            category = Category.objects.filter(is_active=True).first()
+            return category.get_absolute_url() if category else None
+        return reverse(f'aggregator:{name}')
+
+    def seed(self, count):
+        """Create a synthetic dataset: ~count posts across count/100 sources"""
+        now = timezone.now()
+        rng = random.Random(42)
+
+        categories = [
+            Category.objects.get_or_create(name=f'Bench {word}', defaults={'slug': f'bench-{i}'})[0]
+            for i, word in enumerate(WORDS[:8])
+        ]
+        sources = []
+        for i in range(max(1, count // 100)):
+            name = f'{rng.choice(WORDS).capitalize()} blog {i}'
+            sources.append(BlogSource(
+                name=name,
+                sort_letter=sort_letter(name),
+                rss_url=f'https://{BENCH_DOMAIN}/{i}/feed/',
+                homepage_url=f'https://{BENCH_DOMAIN}/{i}/',
+                tags=', '.join(rng.sample(WORDS, 3)),
+            ))
+        BlogSource.objects.bulk_create(sources)
+
+        posts = []
+        for i in range(count):
+            title = ' '.join(rng.choice(WORDS) for _ in range(8)).capitalize()
+            posts.append(Post(
+                title=title,
+                link=f'https://{BENCH_DOMAIN}/post/{now.timestamp():.0f}/{i}',
+                excerpt=' '.join(rng.choice(WORDS) for _ in range(40)),
+                published_date=now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+                blog_source=rng.choice(sources),
+                category=rng.choice(categories + [None]),
+            ))
+        for post in posts:
+            post.update_search_fields()
+        Post.objects.bulk_create(posts, batch_size=1000)
+
+        author = User.objects.filter(is_superuser=True).first() or User.objects.create(username='bench')
+        my_posts = [
+            MyPost(
+                title=f'Bench my post {now.timestamp():.0f} {i}',
+                slug=f'bench-{now.timestamp():.0f}-{i}',
+                content=' '.join(rng.choice(WORDS) for _ in range(400)),
+                category=rng.choice(categories),
+                author=author,
+                is_published=True,
+                published_date=now - timedelta(hours=rng.randint(0, 24 * 30)),
+                views_count=rng.randint(0, 1000),
+            )
+            for i in range(max(1, count // 50))
+        ]
+        for post in my_posts:
+            post.update_search_fields()
+        MyPost.objects.bulk_create(my_posts)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Seeded {count} posts, {len(sources)} sources"))
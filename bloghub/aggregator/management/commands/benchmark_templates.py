@@ -0,0 +1,130 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from aggregator import directory, fragments, listing
+from aggregator.models import BlogSource, Category, MyPost, Post
+
+DJANGO_BACKEND = 'django.template.backends.django.DjangoTemplates'
+JINJA2_BACKEND = 'django.template.backends.jinja2.Jinja2'
+
+
+class Command(BaseCommand):
+    help = 'Compare per-page render time of the listing pages with uncached/cached Django loaders and Jinja2 cards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Renders per page and option, best one reported (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        cached = self.django_engine(cached=True)
+        engines = [
+            ('django uncached', self.django_engine(cached=False), None),
+            ('django cached', cached, None),
+        ]
+        jinja2 = self.jinja2_engine()
+        if jinja2 is not None:
+            engines.append(('jinja2 cards', jinja2, cached))
+        else:
+            self.stdout.write(self.style.WARNING("⚠ Jinja2 is not installed; skipping the jinja2 option"))
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        header = f"{'page':<28}{'cards':>6}" + ''.join(f"{label + ' ms':>20}" for label, _, _ in engines)
+        self.stdout.write(header)
+        for name, cards, shell in self.pages():
+            timings = [
+                self.measure(lambda: self.render_page(engine, fallback or engine, cards, shell, request), options['repeat'])
+                for _, engine, fallback in engines
+            ]
+            self.stdout.write(f"{name:<28}{len(cards):>6}" + ''.join(f"{ms:>20.2f}" for ms in timings))
+        self.stdout.write("Cards are rendered without the fragment cache, as on a cache miss.")
+
+    def pages(self):
+        """(name, [(template, context name, object)], (shell template, context) or None)"""
+        posts = listing.MergedPosts()
+        posts.add('external', Post.objects.select_related('blog_source', 'category').filter(
+            blog_source__is_active=True, duplicate_of__isnull=True))
+        posts.add('my', MyPost.objects.filter(is_published=True).select_related('category', 'author'),
+                  'published_date', 'created_at')
+        page = listing.ScrollPaginator(posts, 30).get_page(1)
+        shell_context = {
+            'page_obj': page,
+            'blog_sources': list(BlogSource.objects.filter(is_active=True).order_by('name').values_list('id', 'name')),
+            'categories': list(Category.objects.filter(is_active=True).order_by('name').values_list('id', 'name')),
+            'current_type': 'all',
+        }
+        yield 'all_posts', self.post_cards(page.object_list), ('aggregator/all_posts.html', shell_context)
+
+        category = Category.objects.filter(is_active=True).first()
+        if category:
+            posts = listing.MergedPosts()
+            posts.add('external', category.posts.select_related('blog_source', 'category').filter(
+                blog_source__is_active=True, duplicate_of__isnull=True))
+            page = listing.ScrollPaginator(posts, 20).get_page(1)
+            shell = ('aggregator/category_detail.html', {'category': category, 'page_obj': page})
+            yield f'category_detail {category.slug}'[:27], self.post_cards(page.object_list), shell
+
+        sources = [source for group in directory.get_directory('', '')['grouped_sources'].values() for source in group]
+        yield 'blog_sources', [('aggregator/partials/source_card.html', 'source', source) for source in sources], None
+
+    @staticmethod
+    def post_cards(items):
+        return [(fragments.POST_ITEM_TEMPLATES[item['type']], 'post', item['object']) for item in items]
+
+    @staticmethod
+    def render_page(engine, fallback, cards, shell, request):
+        for template_name, context_name, obj in cards:
+            try:
+                template = engine.get_template(template_name)
+            except TemplateDoesNotExist:
+                template = fallback.get_template(template_name)
+            template.render({context_name: obj})
+        if shell:
+            template_name, context = shell
+            fallback.get_template(template_name).render(context, request)
+
+    @staticmethod
+    def measure(func, repeat):
+        """Milliseconds of the fastest of repeat runs"""
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    @staticmethod
+    def django_engine(cached):
+        config = next(t for t in settings.TEMPLATES if t['BACKEND'] == DJANGO_BACKEND)
+        loaders = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+        return DjangoTemplates({
+            'NAME': 'benchmark-cached' if cached else 'benchmark-uncached',
+            'DIRS': config.get('DIRS', []),
+            'APP_DIRS': False,
+            'OPTIONS': {
+                **config.get('OPTIONS', {}),
+                'loaders': [('django.template.loaders.cached.Loader', loaders)] if cached else loaders,
+            },
+        })
+
+    @staticmethod
+    def jinja2_engine():
+        config = next((t for t in settings.TEMPLATES if t['BACKEND'] == JINJA2_BACKEND), None)
+        if config is None:
+            return None
+        from django.template.backends.jinja2 import Jinja2
+        return Jinja2({
+            'NAME': 'benchmark-jinja2',
+            'DIRS': config.get('DIRS', []),
+            'APP_DIRS': config.get('APP_DIRS', False),
+            'OPTIONS': dict(config.get('OPTIONS', {})),
+        })
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from aggregator import sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Regenerate dirty sitemap shards and the sitemap index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Check every shard (first run, or after bulk imports that skip signals)',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt, changed = sitemaps.build(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {rebuilt} shards checked, {changed} files rewritten")
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from aggregator import thumbnails
+from aggregator.models import Post, MyPost
+
+
+class Command(BaseCommand):
+    help = 'Download post thumbnails and build resized WebP/JPEG variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=500,
+            help='Maximum number of posts to process per model (default: 500)',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry posts whose thumbnail previously failed',
+        )
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        states = ['', thumbnails.FAILED] if options['retry_failed'] else ['']
+
+        for model in (Post, MyPost):
+            queryset = model.objects.exclude(thumbnail_url='').filter(
+                thumbnail_hash__in=states
+            ).only('id', 'thumbnail_url', 'thumbnail_hash').order_by('-id')[:limit]
+
+            done = failed = 0
+            for obj in queryset:
+                if thumbnails.process_thumbnail(obj):
+                    done += 1
+                else:
+                    failed += 1
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ {model._meta.verbose_name}: {done} thumbnails built, {failed} failed"
+                )
+            )
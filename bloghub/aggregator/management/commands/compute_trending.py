@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from aggregator.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the homepage trending block (schedule every few minutes)'
+
+    def handle(self, *args, **options):
+        entries = compute_trending()
+        self.stdout.write(self.style.SUCCESS(f"✓ {len(entries)} trending posts"))
+        for entry in entries:
+            self.stdout.write(f"  #{entry.rank + 1} {entry.score:8.2f}  {entry.item}")
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from aggregator import dedup, feeds
+from aggregator.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint existing posts and cluster near-duplicates (backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Posts per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['simhash', *dedup.BAND_FIELDS]
+        queryset = Post.objects.filter(simhash__isnull=True).only('id', 'title', 'excerpt').order_by('id')
+
+        seen = clustered = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for post in batch:
+                dedup.fingerprint_post(post)
+            Post.objects.bulk_update(batch, fields, batch_size=250)
+
+            # Fingerprints are saved first so later posts in the batch see earlier ones
+            duplicates = []
+            for post in batch:
+                post.duplicate_of_id = dedup.find_original(post)
+                if post.duplicate_of_id:
+                    duplicates.append(post)
+            Post.objects.bulk_update(duplicates, ['duplicate_of'], batch_size=250)
+
+            seen += len(batch)
+            clustered += len(duplicates)
+            self.stdout.write(f"  {seen} posts fingerprinted, {clustered} duplicates")
+
+        if clustered:
+            feeds.invalidate()  # bulk_update leaves updated_at alone
+        self.stdout.write(self.style.SUCCESS(f"✓ {seen} posts fingerprinted, {clustered} duplicates clustered"))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from aggregator import opml
+from aggregator.models import BlogSource
+
+
+class Command(BaseCommand):
+    help = 'Export blog sources as an OPML file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='File to write (default: standard output)',
+        )
+        parser.add_argument(
+            '--active-only',
+            action='store_true',
+            help='Leave out disabled sources',
+        )
+
+    def handle(self, *args, **options):
+        sources = BlogSource.objects.order_by('name')
+        if options['active_only']:
+            sources = sources.filter(is_active=True)
+        document = opml.export_opml(sources.iterator())
+
+        if not options['output']:
+            sys.stdout.buffer.write(document + b'\n')
+            return
+        with open(options['output'], 'wb') as f:
+            f.write(document)
+        self.stdout.write(self.style.SUCCESS(f"✓ Exported {sources.count()} blog sources to {options['output']}"))
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from aggregator import opml
+
+
+class Command(BaseCommand):
+    help = 'Import blog sources from an OPML file (bulk, duplicates skipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='OPML file to import')
+        parser.add_argument(
+            '--inactive',
+            action='store_true',
+            help='Create the sources disabled',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be imported',
+        )
+        parser.add_argument(
+            '--fetch',
+            action='store_true',
+            help='Crawl the new sources right away and fill their metadata from the feeds',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Concurrent downloads for --fetch (default: 8)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Limit number of posts to fetch per source with --fetch (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            outlines = opml.parse_opml(Path(options['path']).read_bytes())
+        except (OSError, opml.OPMLError) as e:
+            raise CommandError(str(e))
+
+        result = opml.import_outlines(outlines, is_active=not options['inactive'], dry_run=options['dry_run'])
+        for url, reason in result.invalid:
+            self.stdout.write(self.style.WARNING(f"⚠ Skipping {url}: {reason}"))
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(
+            f"{len(outlines)} feeds in file: {verb.lower()} {len(result.created)}, "
+            f"{len(result.duplicates)} already known, {len(result.invalid)} invalid"
+        )
+
+        if options['fetch'] and result.created and not options['dry_run']:
+            self.stdout.write(f"Fetching {len(result.created)} new sources with {options['workers']} workers...")
+            run = opml.first_fetch(result.created, options['limit'], options['workers'])
+            self.stdout.write(
+                f"Crawl run #{run.pk}: {run.new_posts} new posts, {run.errors} errors, {run.duration_ms / 1000:.1f}s"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {verb} {len(result.created)} blog sources"))
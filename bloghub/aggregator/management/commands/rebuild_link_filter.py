@@ -0,0 +1,45 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from aggregator import linkfilter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the known-link Bloom filter used by fetch_feeds and report its false-positive rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--probes',
+            type=int,
+            default=100000,
+            help='Random unknown links tested to measure the false-positive rate (default: 100000)',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only report on the saved filter, do not rebuild',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['stats']:
+            link_filter = linkfilter.load_filter()
+        else:
+            link_filter = linkfilter.build_filter()
+            link_filter.save(settings.LINK_FILTER_PATH)
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Rebuilt link filter in {time.perf_counter() - start:.1f}s")
+            )
+
+        probes = options['probes']
+        false_positives = sum(
+            f'https://probe.invalid/{uuid.uuid4().hex}' in link_filter for _ in range(probes)
+        )
+        self.stdout.write(f"  Links:                {link_filter.items} (capacity {linkfilter.capacity(link_filter)})")
+        self.stdout.write(f"  Size:                 {len(link_filter.data) / 1024:.0f} KB, {link_filter.hashes} hashes")
+        self.stdout.write(f"  Fill ratio:           {link_filter.fill_ratio():.1%}")
+        self.stdout.write(f"  Expected FP rate:     {link_filter.expected_error_rate:.2e}")
+        if probes:
+            self.stdout.write(f"  Measured FP rate:     {false_positives / probes:.2e} ({false_positives}/{probes} probes)")
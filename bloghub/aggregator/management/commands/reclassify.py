@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from aggregator.classification import PostClassifier, reclassify, train_model
+from aggregator.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Assign categories to archived posts (backfill) and retrain the classifier'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--train',
+            action='store_true',
+            help='Retrain the Naive Bayes model from editor-labelled posts first (the only place it is trained)',
+        )
+        parser.add_argument(
+            '--include-auto',
+            action='store_true',
+            help='Also re-run posts that were categorized automatically before',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Posts per classification batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without saving',
+        )
+
+    def handle(self, *args, **options):
+        if options['train']:
+            model = train_model()
+            self.stdout.write(f"Trained model on {sum(model.class_docs.values())} labelled posts")
+            classifier = PostClassifier(model=model)
+        else:
+            classifier = PostClassifier()
+
+        seen, changed = reclassify(
+            Post.objects.all(),
+            classifier,
+            include_auto=options['include_auto'],
+            batch_size=options['batch_size'],
+            save=not options['dry_run'],
+            progress=lambda seen, changed: self.stdout.write(f"  {seen} posts checked, {changed} categorized"),
+        )
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"✓ {prefix}{changed} of {seen} posts categorized"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from aggregator import related
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the related-posts index for all published MyPosts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-dirty',
+            action='store_true',
+            help='Only rebuild when a MyPost was published or edited since the last run (for cron)',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_dirty'] and not related.has_dirty():
+            self.stdout.write(self.style.SUCCESS("✓ No MyPost changed, nothing to rebuild"))
+            return
+        start = time.perf_counter()
+        index = related.build_index()
+        built = time.perf_counter()
+        count = related.refresh_related(index=index)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {count} related links for {len(index.keys)} documents "
+                f"(index {built - start:.1f}s, neighbours {time.perf_counter() - built:.1f}s)"
+            )
+        )
@@ -0,0 +1,111 @@
+import json
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from aggregator.models import Post
+from aggregator.repair import FIXES, LOADED_FIELDS, PostRepairer
+
+
+class Command(BaseCommand):
+    help = 'Stream the post table once and repair dates, titles, excerpts and links in batches (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='append',
+            choices=FIXES,
+            help='Fix to apply, repeatable (default: all)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Posts read, fixed and written per transaction (default: 2000)',
+        )
+        parser.add_argument(
+            '--future-tolerance-hours',
+            type=int,
+            default=24,
+            help='Published dates further ahead than this are future dates (default: 24)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without saving',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue after the last committed chunk of an interrupted run',
+        )
+
+    def handle(self, *args, **options):
+        fixes = sorted(set(options['fix'] or FIXES))
+        path = settings.REPAIR_CHECKPOINT_PATH
+        dry_run = options['dry_run']
+        repairer = PostRepairer(fixes, timedelta(hours=options['future_tolerance_hours']))
+
+        start_id = scanned = 0
+        if options['resume']:
+            if not path.exists():
+                raise CommandError(f"No checkpoint to resume from at {path}")
+            checkpoint = json.loads(path.read_text())
+            if checkpoint['fixes'] != fixes:
+                raise CommandError(f"Checkpoint is for fixes {', '.join(checkpoint['fixes'])}; pass the same --fix options")
+            start_id, scanned = checkpoint['last_id'], checkpoint['scanned']
+            repairer.counts.update(checkpoint['counts'])
+            self.stdout.write(f"Resuming after post #{start_id} ({scanned} posts already scanned)")
+        elif path.exists() and not dry_run:
+            self.stdout.write(self.style.WARNING(f"⚠ Ignoring the checkpoint at {path} (use --resume to continue it)"))
+
+        posts = Post.objects.filter(id__gt=start_id).order_by('id').only(*LOADED_FIELDS)
+        stream = posts.iterator(chunk_size=options['chunk_size'])
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(f"{prefix}Repairing posts: {', '.join(fixes)}")
+
+        started = time.perf_counter()
+        run_scanned = fixed = 0
+        while True:
+            chunk = list(islice(stream, options['chunk_size']))
+            if not chunk:
+                break
+            groups = repairer.repair_chunk(chunk)
+            if groups and not dry_run:
+                with transaction.atomic():
+                    for fields, changed in groups.items():
+                        Post.objects.bulk_update(changed, fields, batch_size=500)
+
+            last_id = chunk[-1].id
+            run_scanned += len(chunk)
+            scanned += len(chunk)
+            fixed += sum(len(changed) for changed in groups.values())
+            if not dry_run:
+                self.save_checkpoint(path, fixes, last_id, scanned, repairer.counts)
+            rate = run_scanned / max(time.perf_counter() - started, 1e-6)
+            self.stdout.write(f"  {scanned} posts scanned, {fixed} fixed, up to #{last_id} ({rate:.0f} posts/s)")
+
+        if not dry_run and path.exists():
+            path.unlink()
+
+        for name in [*fixes, 'link_duplicates', 'empty_excerpts']:
+            if name in repairer.counts or name in fixes:
+                self.stdout.write(f"  {name:<16}{repairer.counts.get(name, 0):>8}")
+                for post_id, before, after in repairer.examples.get(name, []) if dry_run else []:
+                    self.stdout.write(f"      #{post_id}: {before!r} -> {after!r}")
+        self.stdout.write(self.style.SUCCESS(f"✓ {prefix}{fixed} of {run_scanned} posts repaired"))
+
+    @staticmethod
+    def save_checkpoint(path, fixes, last_id, scanned, counts):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({
+            'fixes': fixes,
+            'last_id': last_id,
+            'scanned': scanned,
+            'counts': dict(counts),
+        }))
+        tmp_path.replace(path)
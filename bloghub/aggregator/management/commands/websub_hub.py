@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from aggregator.crawler import download_feed, FeedFetchError
+
+TIMEOUT = 10
+
+
+class StandInHub:
+    """Minimal in-memory WebSub hub: verifies subscribers and pushes signed feeds"""
+
+    def __init__(self, log):
+        self.log = log
+        self.subscribers = {}  # topic -> {callback: secret}
+        self.lock = threading.Lock()
+
+    def verify(self, mode, topic, callback, secret, lease_seconds):
+        challenge = secrets.token_hex(16)
+        query = urllib.parse.urlencode({
+            'hub.mode': mode,
+            'hub.topic': topic,
+            'hub.challenge': challenge,
+            'hub.lease_seconds': lease_seconds,
+        })
+        separator = '&' if '?' in callback else '?'
+        try:
+            with urllib.request.urlopen(callback + separator + query, timeout=TIMEOUT) as response:
+                confirmed = response.read().decode('utf-8') == challenge
+        except (urllib.error.URLError, OSError) as e:
+            self.log(f"✗ Verification of {callback} failed: {e}")
+            return
+
+        if not confirmed:
+            self.log(f"✗ {callback} did not confirm {mode} of {topic}")
+            return
+        with self.lock:
+            if mode == 'subscribe':
+                self.subscribers.setdefault(topic, {})[callback] = secret
+            else:
+                self.subscribers.get(topic, {}).pop(callback, None)
+        self.log(f"✓ {mode} of {topic} by {callback}")
+
+    def publish(self, topic, content_type):
+        try:
+            body, _, _, _ = download_feed(topic)
+        except (FeedFetchError, OSError) as e:
+            self.log(f"✗ Could not fetch {topic}: {e}")
+            return
+        with self.lock:
+            subscribers = dict(self.subscribers.get(topic, {}))
+        for callback, secret in subscribers.items():
+            headers = {'Content-Type': content_type, 'Link': f'<{topic}>; rel="self"'}
+            if secret:
+                signature = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+                headers['X-Hub-Signature'] = f'sha256={signature}'
+            request = urllib.request.Request(callback, data=body, headers=headers)
+            try:
+                with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+                if status == 410:
+                    with self.lock:
+                        self.subscribers.get(topic, {}).pop(callback, None)
+            except (urllib.error.URLError, OSError) as e:
+                status = e
+            self.log(f"→ Delivered {topic} ({len(body)} bytes) to {callback}: {status}")
+
+
+def make_handler(hub, serve_dir):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            # Feed files for topics hosted by the stand-in itself
+            name = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).lstrip('/')
+            path = (serve_dir / name).resolve() if serve_dir else None
+            if not path or serve_dir not in path.parents or not path.is_file():
+                self.send_error(404)
+                return
+            data = path.read_bytes()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/xml; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            params = urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+            param = lambda name: params.get(name, [''])[0]
+            mode = param('hub.mode')
+
+            if mode in ('subscribe', 'unsubscribe') and param('hub.topic') and param('hub.callback'):
+                work = (hub.verify, mode, param('hub.topic'), param('hub.callback'),
+                        param('hub.secret'), param('hub.lease_seconds') or 86400)
+                status = 202
+            elif mode == 'publish' and (param('hub.url') or param('hub.topic')):
+                work = (hub.publish, param('hub.url') or param('hub.topic'), 'application/xml')
+                status = 204
+            else:
+                self.send_error(400, 'Unsupported hub.mode')
+                return
+
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            # Verification and delivery happen after the response, as with a real hub
+            threading.Thread(target=work[0], args=work[1:], daemon=True).start()
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in WebSub hub for testing push ingestion (not for production)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Port to listen on (default: 8765)',
+        )
+        parser.add_argument(
+            '--serve',
+            help='Directory of feed files served at http://127.0.0.1:<port>/<name> to use as topics',
+        )
+
+    def handle(self, *args, **options):
+        serve_dir = Path(options['serve']).resolve() if options['serve'] else None
+        if serve_dir and not serve_dir.is_dir():
+            raise CommandError(f"Not a directory: {serve_dir}")
+
+        def log(message):
+            self.stdout.write(message)
+            self.stdout.flush()
+
+        hub = StandInHub(log)
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), make_handler(hub, serve_dir))
+        self.stdout.write(self.style.SUCCESS(f"✓ Stand-in hub listening on http://127.0.0.1:{options['port']}/"))
+        self.stdout.write("Publish with: curl -d hub.mode=publish -d hub.url=<topic> <hub url>")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping hub")
+        finally:
+            server.server_close()
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0002_category_alter_blogsource_options_blogsource_author_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mypost',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, verbose_name='Mã ảnh thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, verbose_name='Mã ảnh thumbnail'),
+        ),
+    ]
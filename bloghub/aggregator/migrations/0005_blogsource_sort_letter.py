@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:36
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _fold_table():
+    """Copy of aggregator.normalization's accent folding when this migration was written"""
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for start, end in [(0x00C0, 0x024F), (0x1E00, 0x1EFF)]:
+        for code in range(start, end + 1):
+            char = chr(code)
+            base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+            if base and base != char and base.isascii():
+                table[code] = base
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+def sort_letter(name, table):
+    name = name.strip().translate(table)[:1].upper()
+    return name if 'A' <= name <= 'Z' else '#'
+
+
+def fill_sort_letter(apps, schema_editor):
+    table = _fold_table()
+    BlogSource = apps.get_model('aggregator', 'BlogSource')
+    sources = list(BlogSource.objects.only('id', 'name'))
+    for source in sources:
+        source.sort_letter = sort_letter(source.name, table)
+    BlogSource.objects.bulk_update(sources, ['sort_letter'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0004_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogsource',
+            name='sort_letter',
+            field=models.CharField(blank=True, editable=False, max_length=1, verbose_name='Chữ cái'),
+        ),
+        migrations.AddIndex(
+            model_name='blogsource',
+            index=models.Index(fields=['is_active', 'sort_letter', 'name'], name='blogsource_directory_idx'),
+        ),
+        migrations.RunPython(fill_sort_letter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:38
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _fold_table():
+    """Copy of aggregator.normalization's accent folding when this migration was written"""
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for start, end in [(0x00C0, 0x024F), (0x1E00, 0x1EFF)]:
+        for code in range(start, end + 1):
+            char = chr(code)
+            base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+            if base and base != char and base.isascii():
+                table[code] = base
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+def search_key(text, table):
+    return ' '.join((text or '').translate(table).lower().split())
+
+
+def fill_folded_fields(apps, schema_editor):
+    table = _fold_table()
+    for model_name in ('Post', 'MyPost'):
+        model = apps.get_model('aggregator', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'title', 'excerpt').iterator(chunk_size=2000):
+            obj.title_folded = search_key(obj.title, table)[:500]
+            obj.excerpt_folded = search_key(obj.excerpt, table)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['title_folded', 'excerpt_folded'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['title_folded', 'excerpt_folded'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0005_blogsource_sort_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mypost',
+            name='excerpt_folded',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='mypost',
+            name='title_folded',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_folded',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='title_folded',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(fill_folded_fields, migrations.RunPython.noop),
+    ]
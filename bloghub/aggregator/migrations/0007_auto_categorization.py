@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0006_folded_search_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='keywords',
+            field=models.TextField(blank=True, verbose_name='Từ khóa phân loại (phân cách bằng dấu phẩy)'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='category_is_auto',
+            field=models.BooleanField(default=False, verbose_name='Phân loại tự động'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0008_post_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Độ tương đồng')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Thứ tự')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='aggregator.mypost', verbose_name='Bài viết')),
+                ('related_my_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.mypost', verbose_name='Bài viết liên quan')),
+                ('related_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.post', verbose_name='Bài viết ngoài liên quan')),
+            ],
+            options={
+                'verbose_name': 'Bài viết liên quan',
+                'verbose_name_plural': 'Bài viết liên quan',
+                'ordering': ['post', 'rank'],
+                'indexes': [models.Index(fields=['post', 'rank'], name='relatedpost_post_rank_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0009_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Điểm')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Lượt xem trong cửa sổ')),
+                ('rank', models.PositiveSmallIntegerField(unique=True, verbose_name='Thứ hạng')),
+                ('computed_at', models.DateTimeField(verbose_name='Tính lúc')),
+                ('my_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.mypost', verbose_name='Bài viết')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.post', verbose_name='Bài viết ngoài')),
+            ],
+            options={
+                'verbose_name': 'Bài viết trending',
+                'verbose_name_plural': 'Bài viết trending',
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Giờ')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Lượt xem')),
+                ('my_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.mypost', verbose_name='Bài viết')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aggregator.post', verbose_name='Bài viết ngoài')),
+            ],
+            options={
+                'verbose_name': 'Lượt xem theo giờ',
+                'verbose_name_plural': 'Lượt xem theo giờ',
+                'indexes': [models.Index(fields=['bucket'], name='viewbucket_bucket_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='viewbucket',
+            constraint=models.UniqueConstraint(fields=('my_post', 'bucket'), name='viewbucket_my_post_bucket_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='viewbucket',
+            constraint=models.UniqueConstraint(fields=('post', 'bucket'), name='viewbucket_post_bucket_uniq'),
+        ),
+    ]
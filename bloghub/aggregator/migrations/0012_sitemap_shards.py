@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0011_post_published_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=20, verbose_name='Nhóm')),
+                ('number', models.PositiveIntegerField(default=0, verbose_name='Số thứ tự')),
+                ('url_count', models.PositiveIntegerField(default=0, verbose_name='Số URL')),
+                ('digest', models.CharField(blank=True, max_length=40, verbose_name='Mã nội dung')),
+                ('lastmod', models.DateTimeField(blank=True, null=True, verbose_name='Thay đổi lần cuối')),
+                ('is_dirty', models.BooleanField(default=True, verbose_name='Cần tạo lại')),
+            ],
+            options={
+                'verbose_name': 'Tệp sitemap',
+                'verbose_name_plural': 'Tệp sitemap',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sitemapshard',
+            constraint=models.UniqueConstraint(fields=('section', 'number'), name='sitemapshard_section_number_uniq'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0012_sitemap_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogsource',
+            name='retention_months',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Bài cũ hơn sẽ được chuyển vào kho lưu trữ. Để trống: dùng mặc định, 0: không lưu trữ', null=True, verbose_name='Lưu bài (tháng)'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=500, verbose_name='Tiêu đề')),
+                ('link', models.URLField(verbose_name='Link gốc')),
+                ('link_hash', models.BigIntegerField(db_index=True, editable=False)),
+                ('excerpt', models.TextField(blank=True, verbose_name='Mô tả ngắn')),
+                ('thumbnail_url', models.URLField(blank=True, verbose_name='Ảnh thumbnail')),
+                ('thumbnail_hash', models.CharField(blank=True, editable=False, max_length=40)),
+                ('published_date', models.DateTimeField(verbose_name='Ngày đăng')),
+                ('title_folded', models.CharField(blank=True, editable=False, max_length=500)),
+                ('excerpt_folded', models.TextField(blank=True, editable=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('blog_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to='aggregator.blogsource', verbose_name='Nguồn blog')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='aggregator.category', verbose_name='Danh mục')),
+            ],
+            options={
+                'verbose_name': 'Bài viết lưu trữ',
+                'verbose_name_plural': 'Bài viết lưu trữ',
+                'ordering': ['-published_date'],
+                'indexes': [models.Index(fields=['blog_source', '-published_date'], name='archived_source_published_idx')],
+            },
+        ),
+    ]
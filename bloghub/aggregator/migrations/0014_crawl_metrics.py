@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0013_post_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Bắt đầu')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Kết thúc')),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Thời gian (ms)')),
+                ('sources_count', models.PositiveIntegerField(default=0, verbose_name='Số nguồn')),
+                ('entries_seen', models.PositiveIntegerField(default=0, verbose_name='Số entry')),
+                ('new_posts', models.PositiveIntegerField(default=0, verbose_name='Bài mới')),
+                ('errors', models.PositiveIntegerField(default=0, verbose_name='Số lỗi')),
+            ],
+            options={
+                'verbose_name': 'Lượt crawl',
+                'verbose_name_plural': 'Lượt crawl',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SourceFetchLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Bắt đầu')),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='HTTP status')),
+                ('bytes', models.PositiveIntegerField(default=0, verbose_name='Dung lượng (byte)')),
+                ('fetch_ms', models.PositiveIntegerField(default=0, verbose_name='Tải (ms)')),
+                ('parse_ms', models.PositiveIntegerField(default=0, verbose_name='Phân tích (ms)')),
+                ('write_ms', models.PositiveIntegerField(default=0, verbose_name='Ghi (ms)')),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Tổng (ms)')),
+                ('entries_seen', models.PositiveIntegerField(default=0, verbose_name='Số entry')),
+                ('new_posts', models.PositiveIntegerField(default=0, verbose_name='Bài mới')),
+                ('error', models.TextField(blank=True, verbose_name='Lỗi')),
+                ('blog_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_logs', to='aggregator.blogsource', verbose_name='Nguồn blog')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='aggregator.crawlrun', verbose_name='Lượt crawl')),
+            ],
+            options={
+                'verbose_name': 'Nhật ký crawl nguồn',
+                'verbose_name_plural': 'Nhật ký crawl nguồn',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['blog_source', '-started_at'], name='fetchlog_source_started_idx'), models.Index(fields=['-started_at'], name='fetchlog_started_idx')],
+            },
+        ),
+    ]
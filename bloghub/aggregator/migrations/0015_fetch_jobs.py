@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0014_crawl_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Chờ crawl'), ('leased', 'Đang crawl')], default='queued', max_length=10, verbose_name='Trạng thái')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Crawl sau')),
+                ('leased_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('lease_token', models.CharField(blank=True, editable=False, max_length=32)),
+                ('lease_expires', models.DateTimeField(blank=True, null=True, verbose_name='Hết hạn lease')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Số lần lỗi liên tiếp')),
+                ('last_error', models.TextField(blank=True, verbose_name='Lỗi gần nhất')),
+                ('last_finished', models.DateTimeField(blank=True, null=True, verbose_name='Hoàn thành lần cuối')),
+                ('blog_source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_job', to='aggregator.blogsource', verbose_name='Nguồn blog')),
+            ],
+            options={
+                'verbose_name': 'Job crawl',
+                'verbose_name_plural': 'Job crawl',
+                'ordering': ['run_after'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='fetchjob_status_run_after_idx'), models.Index(fields=['status', 'lease_expires'], name='fetchjob_status_lease_idx')],
+            },
+        ),
+    ]
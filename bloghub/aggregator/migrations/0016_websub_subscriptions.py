@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0015_fetch_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebSubSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_url', models.URLField(max_length=500, verbose_name='Hub')),
+                ('topic_url', models.URLField(max_length=500, verbose_name='Topic')),
+                ('callback_token', models.CharField(editable=False, max_length=32, unique=True)),
+                ('secret', models.CharField(editable=False, max_length=64)),
+                ('state', models.CharField(choices=[('pending', 'Chờ xác nhận'), ('active', 'Đang hoạt động'), ('denied', 'Bị từ chối'), ('unsubscribed', 'Đã hủy')], default='pending', max_length=15, verbose_name='Trạng thái')),
+                ('lease_expires', models.DateTimeField(blank=True, null=True, verbose_name='Hết hạn đăng ký')),
+                ('last_delivery', models.DateTimeField(blank=True, null=True, verbose_name='Nhận lần cuối')),
+                ('deliveries', models.PositiveIntegerField(default=0, verbose_name='Số lần nhận')),
+                ('last_error', models.TextField(blank=True, verbose_name='Lỗi gần nhất')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+                ('blog_source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='websub', to='aggregator.blogsource', verbose_name='Nguồn blog')),
+            ],
+            options={
+                'verbose_name': 'Đăng ký WebSub',
+                'verbose_name_plural': 'Đăng ký WebSub',
+                'ordering': ['-updated_at'],
+            },
+        ),
+    ]
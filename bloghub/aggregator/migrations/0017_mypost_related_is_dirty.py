@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0016_websub_subscriptions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mypost',
+            name='related_is_dirty',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Cần tính lại bài liên quan'),
+        ),
+    ]
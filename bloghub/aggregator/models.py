@@ -2,7 +2,8 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.utils.text import slugify
+
+from .normalization import search_key, sort_letter, unique_slug
 
 
 class Category(models.Model):
@@ -11,6 +12,7 @@ class Category(models.Model):
     description = models.TextField(blank=True, verbose_name="Mô tả")
     color = models.CharField(max_length=7, default='#3B82F6', verbose_name="Màu sắc")
     icon = models.CharField(max_length=50, blank=True, verbose_name="Icon class")
+    keywords = models.TextField(blank=True, verbose_name="Từ khóa phân loại (phân cách bằng dấu phẩy)")
     is_active = models.BooleanField(default=True, verbose_name="Kích hoạt")
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -24,7 +26,7 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = unique_slug(Category, self.name, 100, exclude_pk=self.pk)
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
@@ -50,15 +52,32 @@ class BlogSource(models.Model):
     author = models.CharField(max_length=200, blank=True, verbose_name="Tác giả")
     language = models.CharField(max_length=10, default='vi', verbose_name="Ngôn ngữ")
     tags = models.CharField(max_length=500, blank=True, verbose_name="Tags (phân cách bằng dấu phẩy)")
+    sort_letter = models.CharField(max_length=1, blank=True, editable=False, verbose_name="Chữ cái")
+    retention_months = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Lưu bài (tháng)",
+        help_text="Bài cũ hơn sẽ được chuyển vào kho lưu trữ. Để trống: dùng mặc định, 0: không lưu trữ"
+    )
 
     class Meta:
         verbose_name = "Nguồn Blog"
         verbose_name_plural = "Nguồn Blog"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_active', 'sort_letter', 'name'], name='blogsource_directory_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.sort_letter = sort_letter(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'sort_letter'}
+        super().save(*args, **kwargs)
+
     @property
     def posts_count(self):
         return self.posts.count()
@@ -73,6 +92,7 @@ class Post(models.Model):
     link = models.URLField(unique=True, verbose_name="Link gốc")
     excerpt = models.TextField(blank=True, verbose_name="Mô tả ngắn")
     thumbnail_url = models.URLField(blank=True, verbose_name="Ảnh thumbnail")
+    thumbnail_hash = models.CharField(max_length=40, blank=True, editable=False, verbose_name="Mã ảnh thumbnail")
     published_date = models.DateTimeField(verbose_name="Ngày đăng")
     blog_source = models.ForeignKey(
         BlogSource, 
@@ -88,16 +108,57 @@ class Post(models.Model):
         related_name='posts',
         verbose_name="Danh mục"
     )
+    category_is_auto = models.BooleanField(default=False, verbose_name="Phân loại tự động")
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates',
+        verbose_name="Trùng với bài"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # SimHash of title + excerpt and its four 16-bit bands (aggregator.dedup)
+    simhash = models.BigIntegerField(null=True, blank=True, editable=False)
+    simhash_b0 = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+    simhash_b1 = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+    simhash_b2 = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+    simhash_b3 = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+
+    # Accent-folded, lowercase copies for diacritic-insensitive search
+    title_folded = models.CharField(max_length=500, blank=True, db_index=True, editable=False)
+    excerpt_folded = models.TextField(blank=True, editable=False)
 
     class Meta:
         verbose_name = "Bài viết"
         verbose_name_plural = "Bài viết"
         ordering = ['-published_date']
+        indexes = [
+            # Newest-first listings and keyset pagination (feeds)
+            models.Index(fields=['-published_date', '-id'], name='post_published_idx'),
+            models.Index(fields=['category', '-published_date'], name='post_category_published_idx'),
+            models.Index(fields=['blog_source', '-published_date'], name='post_source_published_idx'),
+            # Newest change in a feed's scope, part of its version (feeds)
+            models.Index(fields=['-updated_at'], name='post_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.update_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'excerpt'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'title_folded', 'excerpt_folded'}
+        super().save(*args, **kwargs)
+
+    def update_search_fields(self):
+        """Also call before bulk_create/bulk_update, which skip save()"""
+        self.title_folded = search_key(self.title)[:500]
+        self.excerpt_folded = search_key(self.excerpt)
+
     @property
     def short_excerpt(self):
         if self.excerpt and len(self.excerpt) > 150:
@@ -111,6 +172,7 @@ class MyPost(models.Model):
     content = models.TextField(verbose_name="Nội dung")
     excerpt = models.TextField(max_length=500, blank=True, verbose_name="Mô tả ngắn")
     thumbnail_url = models.URLField(blank=True, verbose_name="Ảnh thumbnail")
+    thumbnail_hash = models.CharField(max_length=40, blank=True, editable=False, verbose_name="Mã ảnh thumbnail")
     category = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -133,6 +195,12 @@ class MyPost(models.Model):
     views_count = models.PositiveIntegerField(default=0, verbose_name="Lượt xem")
     tags = models.CharField(max_length=500, blank=True, verbose_name="Tags (phân cách bằng dấu phẩy)")
 
+    # Accent-folded, lowercase copies for diacritic-insensitive search
+    title_folded = models.CharField(max_length=500, blank=True, db_index=True, editable=False)
+    excerpt_folded = models.TextField(blank=True, editable=False)
+    # Set on publish/edit, cleared by the next refresh_related run (aggregator.related)
+    related_is_dirty = models.BooleanField(default=False, editable=False, verbose_name="Cần tính lại bài liên quan")
+
     class Meta:
         verbose_name = "Bài viết của tôi"
         verbose_name_plural = "Bài viết của tôi"
@@ -143,11 +211,20 @@ class MyPost(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = unique_slug(MyPost, self.title, 500, exclude_pk=self.pk)
         if self.is_published and not self.published_date:
             self.published_date = timezone.now()
+        self.update_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'excerpt'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'title_folded', 'excerpt_folded'}
         super().save(*args, **kwargs)
 
+    def update_search_fields(self):
+        """Also call before bulk_create/bulk_update, which skip save()"""
+        self.title_folded = search_key(self.title)[:500]
+        self.excerpt_folded = search_key(self.excerpt)
+
     def get_absolute_url(self):
         return reverse('aggregator:my_post_detail', kwargs={'slug': self.slug})
 
@@ -168,3 +245,338 @@ class MyPost(models.Model):
         # Estimate reading time (avg 200 words per minute)
         word_count = len(self.content.split())
         return max(1, round(word_count / 200))
+
+
+class RelatedPost(models.Model):
+    """Precomputed nearest neighbours of a MyPost (aggregator.related)"""
+    post = models.ForeignKey(
+        MyPost,
+        on_delete=models.CASCADE,
+        related_name='related_entries',
+        verbose_name="Bài viết"
+    )
+    related_my_post = models.ForeignKey(
+        MyPost,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết liên quan"
+    )
+    related_post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết ngoài liên quan"
+    )
+    score = models.FloatField(verbose_name="Độ tương đồng")
+    rank = models.PositiveSmallIntegerField(verbose_name="Thứ tự")
+
+    class Meta:
+        verbose_name = "Bài viết liên quan"
+        verbose_name_plural = "Bài viết liên quan"
+        ordering = ['post', 'rank']
+        indexes = [
+            models.Index(fields=['post', 'rank'], name='relatedpost_post_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post} → {self.item}"
+
+    @property
+    def item(self):
+        return self.related_my_post or self.related_post
+
+    @property
+    def is_external(self):
+        return self.related_post_id is not None
+
+
+class ViewBucket(models.Model):
+    """Views of a MyPost / click-throughs of a Post, counted per hour (aggregator.trending)"""
+    my_post = models.ForeignKey(
+        MyPost,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết ngoài"
+    )
+    bucket = models.DateTimeField(verbose_name="Giờ")
+    count = models.PositiveIntegerField(default=0, verbose_name="Lượt xem")
+
+    class Meta:
+        verbose_name = "Lượt xem theo giờ"
+        verbose_name_plural = "Lượt xem theo giờ"
+        constraints = [
+            models.UniqueConstraint(fields=['my_post', 'bucket'], name='viewbucket_my_post_bucket_uniq'),
+            models.UniqueConstraint(fields=['post', 'bucket'], name='viewbucket_post_bucket_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='viewbucket_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.my_post or self.post} @ {self.bucket:%Y-%m-%d %H:00}: {self.count}"
+
+
+class TrendingEntry(models.Model):
+    """Top posts by time-decayed views, recomputed by compute_trending"""
+    my_post = models.ForeignKey(
+        MyPost,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bài viết ngoài"
+    )
+    score = models.FloatField(verbose_name="Điểm")
+    views = models.PositiveIntegerField(default=0, verbose_name="Lượt xem trong cửa sổ")
+    rank = models.PositiveSmallIntegerField(unique=True, verbose_name="Thứ hạng")
+    computed_at = models.DateTimeField(verbose_name="Tính lúc")
+
+    class Meta:
+        verbose_name = "Bài viết trending"
+        verbose_name_plural = "Bài viết trending"
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.item}"
+
+    @property
+    def item(self):
+        return self.my_post or self.post
+
+    @property
+    def is_external(self):
+        return self.post_id is not None
+
+
+class SitemapShard(models.Model):
+    """One static sitemap file under SITEMAP_ROOT (aggregator.sitemaps)"""
+    section = models.CharField(max_length=20, verbose_name="Nhóm")
+    number = models.PositiveIntegerField(default=0, verbose_name="Số thứ tự")
+    url_count = models.PositiveIntegerField(default=0, verbose_name="Số URL")
+    digest = models.CharField(max_length=40, blank=True, verbose_name="Mã nội dung")
+    lastmod = models.DateTimeField(null=True, blank=True, verbose_name="Thay đổi lần cuối")
+    is_dirty = models.BooleanField(default=True, verbose_name="Cần tạo lại")
+
+    class Meta:
+        verbose_name = "Tệp sitemap"
+        verbose_name_plural = "Tệp sitemap"
+        constraints = [
+            models.UniqueConstraint(fields=['section', 'number'], name='sitemapshard_section_number_uniq'),
+        ]
+
+    def __str__(self):
+        return f"sitemap-{self.section}-{self.number}"
+
+
+class ArchivedPost(models.Model):
+    """Post moved out of the hot table by archive_posts (aggregator.archive)"""
+    # Same id as the original Post, so old /go/<id>/ links keep working
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=500, verbose_name="Tiêu đề")
+    link = models.URLField(verbose_name="Link gốc")
+    # 63-bit hash of the canonical link: the compact duplicate check of fetch_feeds
+    link_hash = models.BigIntegerField(db_index=True, editable=False)
+    excerpt = models.TextField(blank=True, verbose_name="Mô tả ngắn")
+    thumbnail_url = models.URLField(blank=True, verbose_name="Ảnh thumbnail")
+    thumbnail_hash = models.CharField(max_length=40, blank=True, editable=False)
+    published_date = models.DateTimeField(verbose_name="Ngày đăng")
+    blog_source = models.ForeignKey(
+        BlogSource,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name="Nguồn blog"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Danh mục"
+    )
+    title_folded = models.CharField(max_length=500, blank=True, editable=False)
+    excerpt_folded = models.TextField(blank=True, editable=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Bài viết lưu trữ"
+        verbose_name_plural = "Bài viết lưu trữ"
+        ordering = ['-published_date']
+        indexes = [
+            models.Index(fields=['blog_source', '-published_date'], name='archived_source_published_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def short_excerpt(self):
+        if self.excerpt and len(self.excerpt) > 150:
+            return self.excerpt[:150] + "..."
+        return self.excerpt or ""
+
+
+class CrawlRun(models.Model):
+    """One fetch_feeds execution (aggregator.crawlstats)"""
+    started_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Bắt đầu")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Kết thúc")
+    duration_ms = models.PositiveIntegerField(default=0, verbose_name="Thời gian (ms)")
+    sources_count = models.PositiveIntegerField(default=0, verbose_name="Số nguồn")
+    entries_seen = models.PositiveIntegerField(default=0, verbose_name="Số entry")
+    new_posts = models.PositiveIntegerField(default=0, verbose_name="Bài mới")
+    errors = models.PositiveIntegerField(default=0, verbose_name="Số lỗi")
+
+    class Meta:
+        verbose_name = "Lượt crawl"
+        verbose_name_plural = "Lượt crawl"
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Crawl {self.started_at:%Y-%m-%d %H:%M}"
+
+
+class SourceFetchLog(models.Model):
+    """Timings and outcome of one source inside a CrawlRun"""
+    run = models.ForeignKey(
+        CrawlRun,
+        on_delete=models.CASCADE,
+        related_name='logs',
+        verbose_name="Lượt crawl"
+    )
+    blog_source = models.ForeignKey(
+        BlogSource,
+        on_delete=models.CASCADE,
+        related_name='fetch_logs',
+        verbose_name="Nguồn blog"
+    )
+    started_at = models.DateTimeField(verbose_name="Bắt đầu")
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="HTTP status")
+    bytes = models.PositiveIntegerField(default=0, verbose_name="Dung lượng (byte)")
+    fetch_ms = models.PositiveIntegerField(default=0, verbose_name="Tải (ms)")
+    parse_ms = models.PositiveIntegerField(default=0, verbose_name="Phân tích (ms)")
+    write_ms = models.PositiveIntegerField(default=0, verbose_name="Ghi (ms)")
+    duration_ms = models.PositiveIntegerField(default=0, verbose_name="Tổng (ms)")
+    entries_seen = models.PositiveIntegerField(default=0, verbose_name="Số entry")
+    new_posts = models.PositiveIntegerField(default=0, verbose_name="Bài mới")
+    error = models.TextField(blank=True, verbose_name="Lỗi")
+
+    class Meta:
+        verbose_name = "Nhật ký crawl nguồn"
+        verbose_name_plural = "Nhật ký crawl nguồn"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['blog_source', '-started_at'], name='fetchlog_source_started_idx'),
+            models.Index(fields=['-started_at'], name='fetchlog_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_source} @ {self.started_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def is_error(self):
+        return bool(self.error)
+
+
+class FetchJob(models.Model):
+    """Recurring crawl job of one source, leased by crawl_worker (aggregator.jobs)"""
+    QUEUED = 'queued'
+    LEASED = 'leased'
+    STATUS_CHOICES = [
+        (QUEUED, 'Chờ crawl'),
+        (LEASED, 'Đang crawl'),
+    ]
+
+    blog_source = models.OneToOneField(
+        BlogSource,
+        on_delete=models.CASCADE,
+        related_name='fetch_job',
+        verbose_name="Nguồn blog"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name="Trạng thái")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Crawl sau")
+    leased_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    lease_token = models.CharField(max_length=32, blank=True, editable=False)
+    lease_expires = models.DateTimeField(null=True, blank=True, verbose_name="Hết hạn lease")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Số lần lỗi liên tiếp")
+    last_error = models.TextField(blank=True, verbose_name="Lỗi gần nhất")
+    last_finished = models.DateTimeField(null=True, blank=True, verbose_name="Hoàn thành lần cuối")
+
+    class Meta:
+        verbose_name = "Job crawl"
+        verbose_name_plural = "Job crawl"
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='fetchjob_status_run_after_idx'),
+            models.Index(fields=['status', 'lease_expires'], name='fetchjob_status_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_source} ({self.get_status_display()})"
+
+
+class WebSubSubscription(models.Model):
+    """WebSub (PubSubHubbub) subscription of a source whose feed announces a hub (aggregator.websub)"""
+    PENDING = 'pending'
+    ACTIVE = 'active'
+    DENIED = 'denied'
+    UNSUBSCRIBED = 'unsubscribed'
+    STATE_CHOICES = [
+        (PENDING, 'Chờ xác nhận'),
+        (ACTIVE, 'Đang hoạt động'),
+        (DENIED, 'Bị từ chối'),
+        (UNSUBSCRIBED, 'Đã hủy'),
+    ]
+
+    blog_source = models.OneToOneField(
+        BlogSource,
+        on_delete=models.CASCADE,
+        related_name='websub',
+        verbose_name="Nguồn blog"
+    )
+    hub_url = models.URLField(max_length=500, verbose_name="Hub")
+    topic_url = models.URLField(max_length=500, verbose_name="Topic")
+    callback_token = models.CharField(max_length=32, unique=True, editable=False)
+    secret = models.CharField(max_length=64, editable=False)
+    state = models.CharField(max_length=15, choices=STATE_CHOICES, default=PENDING, verbose_name="Trạng thái")
+    lease_expires = models.DateTimeField(null=True, blank=True, verbose_name="Hết hạn đăng ký")
+    last_delivery = models.DateTimeField(null=True, blank=True, verbose_name="Nhận lần cuối")
+    deliveries = models.PositiveIntegerField(default=0, verbose_name="Số lần nhận")
+    last_error = models.TextField(blank=True, verbose_name="Lỗi gần nhất")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Ngày cập nhật")
+
+    class Meta:
+        verbose_name = "Đăng ký WebSub"
+        verbose_name_plural = "Đăng ký WebSub"
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"{self.blog_source} via {self.hub_url} ({self.get_state_display()})"
+
+    @property
+    def is_live(self):
+        """Active and within its lease: the hub pushes, polling can slow down"""
+        return self.state == self.ACTIVE and bool(self.lease_expires) and self.lease_expires > timezone.now()
@@ -0,0 +1,126 @@
+"""
+Text normalization for Vietnamese content: accent folding used for sort
+keys, slugs and diacritic-insensitive search columns.
+"""
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def _build_fold_table():
+    """Map every precomposed Latin letter to its base letter (đ/Đ included)"""
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    # Latin-1 Supplement, Latin Extended-A/B and Latin Extended Additional
+    # cover every Vietnamese precomposed letter.
+    ranges = [(0x00C0, 0x024F), (0x1E00, 0x1EFF)]
+    for start, end in ranges:
+        for code in range(start, end + 1):
+            char = chr(code)
+            base = ''.join(
+                c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c)
+            )
+            if base and base != char and base.isascii():
+                table[code] = base
+    # Stray combining marks (text stored in NFD form)
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+FOLD_TABLE = _build_fold_table()
+
+_NON_SLUG = re.compile(r'[^a-z0-9]+')
+_NON_WORD = _NON_SLUG
+
+# Query parameters that only track the visit and never change the content
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', '_hsenc', '_hsmi', 'spm',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'ga_')
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def fold(text):
+    """Remove diacritics: 'Lập trình Đà Nẵng' -> 'Lap trinh Da Nang'"""
+    if not text:
+        return ''
+    return text.translate(FOLD_TABLE)
+
+
+def sort_letter(name):
+    """Directory bucket for a name: folded uppercase first letter, '#' otherwise"""
+    name = fold(name.strip())[:1].upper()
+    return name if 'A' <= name <= 'Z' else '#'
+
+
+def plain_text(text):
+    """Folded lowercase text with punctuation turned into single spaces"""
+    return ' '.join(_NON_WORD.sub(' ', fold(text).lower()).split())
+
+
+def search_key(text):
+    """Stored/queried form for diacritic-insensitive search: folded, lowercase, single spaces"""
+    return ' '.join(fold(text).lower().split())
+
+
+def slugify_vi(text, max_length=None):
+    """Slug that keeps Vietnamese words readable: 'Lập trình' -> 'lap-trinh'"""
+    slug = _NON_SLUG.sub('-', fold(text).lower()).strip('-')
+    if max_length:
+        slug = slug[:max_length].rstrip('-')
+    return slug
+
+
+def unique_slug(model, text, max_length, exclude_pk=None, field='slug'):
+    """
+    Unique slug for model in one query: fetch every taken slug sharing the
+    base and pick the first free '-N' suffix (no save/retry loop).
+    """
+    base = slugify_vi(text, max_length) or model._meta.model_name
+    # Shorter prefix so suffixed slugs truncated to max_length are also seen
+    prefix = base[:max(1, max_length - 6)]
+    queryset = model._default_manager.filter(**{f'{field}__startswith': prefix})
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken = set(queryset.values_list(field, flat=True))
+
+    if base not in taken:
+        return base
+
+    suffix = 2
+    while True:
+        tail = f'-{suffix}'
+        candidate = base[:max_length - len(tail)].rstrip('-') + tail
+        if candidate not in taken:
+            return candidate
+        suffix += 1
+
+
+def canonicalize_url(url):
+    """
+    Canonical form of a post link used for duplicate checks: lowercase
+    scheme/host, no default port, fragment or tracking parameters, sorted query.
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url)
+        port = parts.port  # ValueError when out of range or not a number
+    except ValueError:
+        return url
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return url
+
+    netloc = parts.hostname.lower()
+    if port and str(port) != DEFAULT_PORTS[parts.scheme]:
+        netloc = f'{netloc}:{port}'
+    if parts.username:
+        return url  # Leave credentials alone
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', urlencode(query), ''))
@@ -0,0 +1,217 @@
+"""
+OPML import and export of blog sources.
+
+parse_opml() reads the feed outlines of an OPML file; enclosing folders and
+the OPML 2.0 category attribute become tags. import_outlines() validates the
+feed URLs, drops the ones already known (earlier in the file or in the
+database, compared on their canonical form without scheme) and creates the
+rest with one bulk_create. first_fetch() downloads and parses the new feeds
+in a thread pool, fills blank source fields from the feed metadata and
+ingests the entries through the FeedCrawler in the main thread, so only the
+network waits run concurrently.
+"""
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.utils.html import strip_tags
+from django.utils.http import http_date
+
+from .crawler import FeedCrawler
+from .models import BlogSource
+from .normalization import canonicalize_url, sort_letter
+from . import crawlstats, directory, jobs, suggest
+
+Outline = namedtuple('Outline', ['title', 'xml_url', 'html_url', 'description', 'language', 'tags'])
+ImportResult = namedtuple('ImportResult', ['created', 'duplicates', 'invalid'])
+
+validate_url = URLValidator(schemes=['http', 'https'])
+URL_MAX_LENGTH = BlogSource._meta.get_field('rss_url').max_length
+
+
+class OPMLError(Exception):
+    pass
+
+
+def feed_key(url):
+    """Duplicate key of a feed URL: canonical form without scheme or trailing slash"""
+    return canonicalize_url(url).split('://', 1)[-1].rstrip('/')
+
+
+def parse_opml(data):
+    """Feed outlines (those with an xmlUrl) of an OPML document, in file order"""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise OPMLError(f"Invalid OPML: {e}")
+    body = root.find('body')
+    if root.tag != 'opml' or body is None:
+        raise OPMLError("Invalid OPML: missing <opml><body>")
+
+    outlines = []
+
+    def walk(element, folders):
+        for node in element.findall('outline'):
+            title = (node.get('title') or node.get('text') or '').strip()
+            xml_url = (node.get('xmlUrl') or node.get('xmlurl') or '').strip()
+            if not xml_url:
+                walk(node, folders + [title] if title else folders)
+                continue
+            categories = [
+                part.strip() for category in (node.get('category') or '').split(',')
+                for part in category.split('/') if part.strip()
+            ]
+            tags = list(dict.fromkeys(folders + categories))
+            outlines.append(Outline(
+                title=title,
+                xml_url=xml_url,
+                html_url=(node.get('htmlUrl') or '').strip(),
+                description=(node.get('description') or '').strip(),
+                language=(node.get('language') or '').strip(),
+                tags=tags,
+            ))
+
+    walk(body, [])
+    return outlines
+
+
+def check_url(url):
+    """Error message for an unusable feed URL, '' when it is fine"""
+    if len(url) > URL_MAX_LENGTH:
+        return f"longer than {URL_MAX_LENGTH} characters"
+    try:
+        validate_url(url)
+    except ValidationError:
+        return "not a valid http(s) URL"
+    return ''
+
+
+def language_code(value):
+    return (value or '').split('-')[0].split('_')[0].lower()[:10]
+
+
+def host_name(url):
+    return urlsplit(url).hostname or url
+
+
+def new_source(outline, is_active):
+    name = (outline.title or host_name(outline.xml_url))[:200]
+    source = BlogSource(
+        name=name,
+        sort_letter=sort_letter(name),
+        rss_url=outline.xml_url,
+        homepage_url=outline.html_url if outline.html_url and not check_url(outline.html_url) else '',
+        description=outline.description,
+        tags=', '.join(outline.tags)[:500],
+        is_active=is_active,
+    )
+    if outline.language:
+        source.language = language_code(outline.language)
+    return source
+
+
+def import_outlines(outlines, is_active=True, dry_run=False):
+    """Create the sources of new, valid outlines with one bulk_create"""
+    known = {feed_key(url) for url in BlogSource.objects.values_list('rss_url', flat=True).iterator()}
+    sources, duplicates, invalid = [], [], []
+    for outline in outlines:
+        error = check_url(outline.xml_url)
+        if error:
+            invalid.append((outline.xml_url, error))
+            continue
+        key = feed_key(outline.xml_url)
+        if key in known:
+            duplicates.append(outline.xml_url)
+            continue
+        known.add(key)
+        sources.append(new_source(outline, is_active))
+
+    if sources and not dry_run:
+        sources = BlogSource.objects.bulk_create(sources, batch_size=500)
+        # bulk_create skips the BlogSource signals
+        directory.invalidate()
+        suggest.invalidate()
+        jobs.sync_jobs()
+    return ImportResult(sources, duplicates, invalid)
+
+
+def export_opml(sources, title='BlogHub'):
+    """OPML 2.0 document (bytes) with one outline per source, tags as categories"""
+    root = ET.Element('opml', version='2.0')
+    head = ET.SubElement(root, 'head')
+    ET.SubElement(head, 'title').text = title
+    ET.SubElement(head, 'dateCreated').text = http_date()
+    body = ET.SubElement(root, 'body')
+    for source in sources:
+        attrs = {'type': 'rss', 'text': source.name, 'title': source.name, 'xmlUrl': source.rss_url}
+        if source.homepage_url:
+            attrs['htmlUrl'] = source.homepage_url
+        if source.description:
+            attrs['description'] = source.description
+        if source.language:
+            attrs['language'] = source.language
+        if source.tag_list:
+            attrs['category'] = ','.join(f'/{tag}' for tag in source.tag_list)
+        ET.SubElement(body, 'outline', attrs)
+    ET.indent(root)
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+
+def fill_metadata(source, feed_info):
+    """Fill blank fields of a freshly imported source from its feed's metadata"""
+    changed = []
+
+    def update(field, value, max_length=None):
+        value = (value or '').strip()
+        if max_length:
+            value = value[:max_length]
+        if value and getattr(source, field) != value:
+            setattr(source, field, value)
+            changed.append(field)
+
+    if source.name == host_name(source.rss_url):
+        update('name', feed_info.get('title'), 200)
+    link = feed_info.get('link') or ''
+    if not source.homepage_url and not check_url(link):
+        update('homepage_url', link)
+    logo = (feed_info.get('image') or {}).get('href') or feed_info.get('logo') or feed_info.get('icon') or ''
+    if not source.logo_url and not check_url(logo):
+        update('logo_url', logo)
+    if not source.description:
+        update('description', strip_tags(feed_info.get('subtitle') or ''))
+    if not source.author:
+        update('author', feed_info.get('author'), 200)
+    # language is never blank: the feed's replaces the model default only
+    if feed_info.get('language') and source.language == BlogSource._meta.get_field('language').default:
+        update('language', language_code(feed_info['language']))
+
+    if changed:
+        source.save(update_fields=changed + ['updated_at'])
+    return changed
+
+
+def first_fetch(sources, limit=50, workers=8, stdout=None, with_thumbnails=False, classify=True):
+    """Crawl new sources once: downloads in parallel, metadata and posts saved in order"""
+    crawler = FeedCrawler(stdout, with_thumbnails=with_thumbnails, classify=classify)
+    recorder = crawlstats.CrawlRecorder()
+    logs = {source.pk: recorder.start_source(source) for source in sources}
+    crawled = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(crawler.load_feed, source, logs[source.pk]): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            if future.exception() is None:
+                fill_metadata(source, future.result().feed)
+            _, error = crawler.crawl_source(source, limit, recorder, log=logs[source.pk], prefetched=future)
+            if not error:
+                crawled.append(source.pk)
+
+    run = recorder.finish()
+    jobs.postpone(crawled)
+    crawler.link_filter.save(settings.LINK_FILTER_PATH)
+    return run
@@ -0,0 +1,154 @@
+"""
+Related-content index for my_post_detail.
+
+Published MyPosts and the most recent crawled Posts are turned into
+L2-normalized TF-IDF vectors (folded words and bigrams, plus boosted tags).
+Nearest neighbours of every MyPost are found through an inverted index and
+stored as RelatedPost rows, so the detail page reads them with one indexed
+query. Publishing or editing a MyPost only marks it dirty. The index is
+only rebuilt by the refresh_related command, never on the request or crawl
+path: every few minutes with --if-dirty when a MyPost is dirty (every list
+is rebuilt, so older posts pick up the new one too), and hourly in full so
+newly crawled posts become neighbours. Unpublishing or deleting a MyPost
+drops the rows that point at it straight away.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .classification import TITLE_WEIGHT, split_terms, tokenize
+from .models import MyPost, Post, RelatedPost
+
+TAG_WEIGHT = 3
+# Only the strongest query terms are looked up: nearly the same ranking,
+# without walking the long posting lists of common words
+QUERY_TERMS = 25
+MY_POST = 'my'
+EXTERNAL = 'external'
+
+
+def document_terms(title, text, tags=''):
+    terms = tokenize(title) * TITLE_WEIGHT + tokenize(text)
+    for tag in split_terms(tags):
+        terms += [f'tag:{tag}'] * TAG_WEIGHT
+    return Counter(terms)
+
+
+class RelatedIndex:
+    """In-memory TF-IDF vectors with an inverted index for cosine lookups"""
+
+    def __init__(self, documents):
+        """documents: list of ((kind, id), Counter of terms)"""
+        self.keys = [key for key, _ in documents]
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+
+        document_frequency = Counter()
+        for _, terms in documents:
+            document_frequency.update(terms.keys())
+        total = len(documents) or 1
+        self.idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+
+        self.vectors = []
+        self.postings = defaultdict(list)
+        for position, (_, terms) in enumerate(documents):
+            vector = self.vectorize(terms)
+            self.vectors.append(vector)
+            for term, weight in vector.items():
+                self.postings[term].append((position, weight))
+
+    def vectorize(self, terms):
+        vector = {
+            term: (1 + math.log(count)) * self.idf.get(term, 0.0)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items() if weight}
+
+    def neighbours(self, key, count):
+        """Top `count` (key, score) by cosine similarity, excluding key itself"""
+        position = self.positions.get(key)
+        if position is None:
+            return []
+
+        vector = self.vectors[position]
+        query = sorted(vector.items(), key=lambda item: item[1], reverse=True)[:QUERY_TERMS]
+
+        scores = defaultdict(float)
+        for term, weight in query:
+            for other, other_weight in self.postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(position, None)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:count]
+        return [(self.keys[other], score) for other, score in best if score >= settings.RELATED_MIN_SCORE]
+
+
+def build_index():
+    documents = []
+    for post_id, title, excerpt, content, tags in MyPost.objects.filter(
+        is_published=True
+    ).values_list('id', 'title', 'excerpt', 'content', 'tags').iterator(chunk_size=1000):
+        # Only the opening of the article: enough signal, bounded cost
+        documents.append(((MY_POST, post_id), document_terms(title, f'{excerpt} {content[:2000]}', tags)))
+
+    external = Post.objects.filter(
+        blog_source__is_active=True, duplicate_of__isnull=True
+    ).order_by('-published_date').values_list(
+        'id', 'title', 'excerpt', 'blog_source__tags'
+    )[:settings.RELATED_EXTERNAL_POOL]
+    for post_id, title, excerpt, tags in external.iterator(chunk_size=1000):
+        documents.append(((EXTERNAL, post_id), document_terms(title, excerpt, tags)))
+
+    return RelatedIndex(documents)
+
+
+def mark_dirty(post_ids):
+    """Queue MyPosts for the next refresh_related run"""
+    MyPost.objects.filter(pk__in=post_ids).update(related_is_dirty=True)
+
+
+def has_dirty():
+    return MyPost.objects.filter(is_published=True, related_is_dirty=True).exists()
+
+
+def forget(post_id):
+    """Drop the stored links from and to an unpublished or deleted MyPost"""
+    listed_by = RelatedPost.objects.filter(related_my_post_id=post_id).values_list('post_id', flat=True)
+    mark_dirty(list(listed_by))  # Their lists are one short until the next run
+    RelatedPost.objects.filter(Q(post_id=post_id) | Q(related_my_post_id=post_id)).delete()
+
+
+def refresh_related(post_ids=None, index=None):
+    """Recompute stored neighbours for the given MyPost ids (all published by default)"""
+    # Read first: posts marked during the build stay dirty for the next run
+    dirty = list(MyPost.objects.filter(related_is_dirty=True).values_list('id', flat=True))
+    index = index or build_index()
+    if post_ids is None:
+        post_ids = [post_id for kind, post_id in index.keys if kind == MY_POST]
+
+    count = settings.RELATED_POSTS_COUNT
+    rows = []
+    for post_id in post_ids:
+        for rank, ((kind, related_id), score) in enumerate(index.neighbours((MY_POST, post_id), count)):
+            rows.append(RelatedPost(
+                post_id=post_id,
+                related_my_post_id=related_id if kind == MY_POST else None,
+                related_post_id=related_id if kind == EXTERNAL else None,
+                score=score,
+                rank=rank,
+            ))
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=post_ids).delete()
+        RelatedPost.objects.bulk_create(rows, batch_size=500)
+        recomputed = set(post_ids)
+        MyPost.objects.filter(
+            pk__in=[post_id for post_id in dirty if post_id in recomputed]
+        ).update(related_is_dirty=False)
+    return len(rows)
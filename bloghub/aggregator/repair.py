@@ -0,0 +1,145 @@
+"""
+Row-level repairs of crawled posts, applied by repair_posts.
+
+PostRepairer fixes one chunk of in-memory posts at a time and groups the
+changed posts by the fields they changed, so the command can stream the
+table once and write every fix of a chunk with one bulk_update per group.
+Only the fields of a group are written: the columns deferred by the
+streaming query are never loaded one post at a time. Link canonicalization needs the
+links already taken: they are looked up once per chunk, and a post whose
+canonical link belongs to another post is marked as its duplicate instead.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .crawler import EntryHTMLParser
+from .dedup import fingerprint_post
+from .models import Post
+from .normalization import canonicalize_url
+
+FIXES = ('naive_dates', 'future_dates', 'titles', 'excerpts', 'links')
+TITLE_MAX_LENGTH = Post._meta.get_field('title').max_length
+EXCERPT_MAX_LENGTH = 500  # Same cut as the crawler
+LOADED_FIELDS = (
+    'id', 'title', 'link', 'excerpt', 'published_date', 'created_at', 'duplicate_of_id',
+)
+TEXT_FIELDS = ('title_folded', 'excerpt_folded', 'simhash', 'simhash_b0', 'simhash_b1', 'simhash_b2', 'simhash_b3')
+
+
+def clean_title(title):
+    title = ' '.join((title or '').split()) or 'No Title'
+    return title[:TITLE_MAX_LENGTH]
+
+
+def clean_excerpt(excerpt):
+    if '<' in excerpt and '>' in excerpt:
+        parser = EntryHTMLParser()
+        parser.feed(excerpt)
+        parser.close()
+        excerpt = parser.text
+    excerpt = ' '.join(excerpt.split())
+    if len(excerpt) > EXCERPT_MAX_LENGTH + 3:
+        excerpt = excerpt[:EXCERPT_MAX_LENGTH] + '...'
+    return excerpt
+
+
+class PostRepairer:
+    def __init__(self, fixes=FIXES, future_tolerance=timedelta(days=1)):
+        self.fixes = set(fixes)
+        self.future_tolerance = future_tolerance
+        self.counts = Counter()
+        self.examples = {}  # fix -> [(post id, before, after)]
+
+    def note(self, fix, post, before, after, max_examples=5):
+        self.counts[fix] += 1
+        examples = self.examples.setdefault(fix, [])
+        if len(examples) < max_examples:
+            examples.append((post.id, before, after))
+
+    def repair_dates(self, post, now):
+        changed = set()
+        value = post.published_date
+        if 'naive_dates' in self.fixes and timezone.is_naive(value):
+            post.published_date = timezone.make_aware(value)
+            self.note('naive_dates', post, value, post.published_date)
+            changed.add('published_date')
+        if 'future_dates' in self.fixes and post.published_date > now + self.future_tolerance:
+            # The crawl time is the best known upper bound of the real date
+            value, post.published_date = post.published_date, min(post.created_at or now, now)
+            self.note('future_dates', post, value, post.published_date)
+            changed.add('published_date')
+        return changed
+
+    def repair_text(self, post):
+        changed = set()
+        if 'titles' in self.fixes:
+            title = clean_title(post.title)
+            if title != post.title:
+                self.note('titles', post, post.title[:80], title[:80])
+                post.title = title
+                changed.add('title')
+        if 'excerpts' in self.fixes:
+            excerpt = clean_excerpt(post.excerpt)
+            if excerpt != post.excerpt:
+                self.note('excerpts', post, post.excerpt[:80], excerpt[:80])
+                post.excerpt = excerpt
+                changed.add('excerpt')
+            if not excerpt:
+                # Nothing to rebuild it from without the original entry
+                self.counts['empty_excerpts'] += 1
+        if changed:
+            post.update_search_fields()
+            fingerprint_post(post)
+            changed.update(TEXT_FIELDS)
+        return changed
+
+    def repair_links(self, posts):
+        """Canonicalize links; returns {post id: changed fields}"""
+        wanted = {}
+        for post in posts:
+            canonical = canonicalize_url(post.link)
+            if canonical and canonical != post.link:
+                wanted[post.id] = canonical
+        if not wanted:
+            return {}
+
+        taken = dict(Post.objects.filter(link__in=set(wanted.values())).values_list('link', 'id'))
+        changed = {}
+        for post in posts:
+            canonical = wanted.get(post.id)
+            if not canonical:
+                continue
+            owner = taken.get(canonical)
+            if owner is None:
+                self.note('links', post, post.link, canonical)
+                post.link = canonical
+                taken[canonical] = post.id
+                changed[post.id] = {'link'}
+            elif owner != post.id and post.duplicate_of_id is None:
+                # The same story stored twice: keep both rows, cluster them
+                self.note('link_duplicates', post, post.link, f'duplicate of #{owner}')
+                post.duplicate_of_id = owner
+                changed[post.id] = {'duplicate_of'}
+        return changed
+
+    def repair_chunk(self, posts):
+        """Fix posts in memory; returns {sorted tuple of changed fields: posts}"""
+        now = timezone.now()
+        changed = {}
+        for post in posts:
+            fields = self.repair_dates(post, now) | self.repair_text(post)
+            if fields:
+                changed[post.id] = fields
+        if 'links' in self.fixes:
+            for post_id, fields in self.repair_links(posts).items():
+                changed.setdefault(post_id, set()).update(fields)
+
+        groups = {}
+        for post in posts:
+            fields = changed.get(post.id)
+            if fields:
+                post.updated_at = now  # bulk_update skips auto_now
+                groups.setdefault(tuple(sorted(fields | {'updated_at'})), []).append(post)
+        return groups
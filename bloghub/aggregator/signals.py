@@ -0,0 +1,64 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import BlogSource, Category, MyPost
+from . import directory, feeds, fragments, related, sitemaps, suggest
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=BlogSource)
+def invalidate_cards(sender, update_fields=None, **kwargs):
+    # A crawl only touches last_fetched, which is already part of the source
+    # card key and not shown on post cards
+    if update_fields and set(update_fields) <= {'last_fetched'}:
+        return
+    # Post cards and feeds show the source name/logo and category name/color
+    fragments.bump_generation()
+    feeds.invalidate()
+
+
+@receiver([post_save, post_delete], sender=BlogSource)
+def invalidate_directory(sender, **kwargs):
+    # Also fires after every crawl through last_fetched, refreshing post counts
+    directory.invalidate()
+
+
+@receiver(post_save, sender=MyPost)
+def queue_related_refresh(sender, instance, update_fields=None, **kwargs):
+    # views_count updates go through queryset.update(), other saves are edits
+    if update_fields and set(update_fields) <= {'thumbnail_hash', 'updated_at'}:
+        return
+    if instance.is_published:
+        related.mark_dirty([instance.pk])
+        instance.related_is_dirty = True
+    else:
+        related.forget(instance.pk)
+
+
+@receiver(pre_delete, sender=MyPost)
+def forget_related_on_delete(sender, instance, **kwargs):
+    # Before the cascade: the posts that listed this one get queued
+    related.forget(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=MyPost)
+def update_post_sitemap(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'thumbnail_hash', 'updated_at'}:
+        return
+    # The build_sitemaps command (cron) regenerates the dirty shards
+    sitemaps.mark_dirty(sitemaps.POSTS, sitemaps.shard_number(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def update_page_sitemap(sender, **kwargs):
+    sitemaps.mark_dirty(sitemaps.PAGES)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=BlogSource)
+@receiver([post_save, post_delete], sender=MyPost)
+def update_suggestions(sender, update_fields=None, **kwargs):
+    # Also fires after every crawl through last_fetched: the new posts get indexed
+    if sender is MyPost and update_fields and set(update_fields) <= {'thumbnail_hash', 'updated_at'}:
+        return
+    suggest.invalidate()
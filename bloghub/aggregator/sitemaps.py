@@ -0,0 +1,142 @@
+"""
+Static, incrementally rebuilt sitemaps under SITEMAP_ROOT.
+
+Published MyPosts are split into shards by id range (SITEMAP_SHARD_SIZE ids
+per file), plus one shard for listing pages and categories. Saving a post or
+category only marks its SitemapShard dirty; build(), run from cron by the
+build_sitemaps command, regenerates dirty shards, rewrites a .xml.gz file
+only when its content digest changed and then rewrites sitemap.xml, the
+index. Crawlers read the files without a query.
+
+Crawled Posts are not listed: their URLs belong to other sites, and a
+sitemap may only list URLs of its own host.
+"""
+import gzip
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, MyPost, SitemapShard
+
+POSTS = 'posts'
+PAGES = 'pages'
+INDEX_NAME = 'sitemap.xml'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# Listing pages included in the pages shard
+PAGE_NAMES = ('aggregator:index', 'aggregator:all_posts', 'aggregator:categories', 'aggregator:blog_sources')
+
+
+def absolute(path):
+    return settings.SITEMAP_BASE_URL.rstrip('/') + path
+
+
+def shard_number(post_id):
+    return post_id // settings.SITEMAP_SHARD_SIZE
+
+
+def file_name(section, number):
+    return f'sitemap-{section}-{number}.xml.gz'
+
+
+def mark_dirty(section, number=0):
+    if not SitemapShard.objects.filter(section=section, number=number).update(is_dirty=True):
+        SitemapShard.objects.get_or_create(section=section, number=number, defaults={'is_dirty': True})
+
+
+def post_urls(number):
+    size = settings.SITEMAP_SHARD_SIZE
+    posts = MyPost.objects.filter(
+        is_published=True, id__gte=number * size, id__lt=(number + 1) * size
+    ).order_by('id').values_list('slug', 'updated_at')
+    for slug, updated_at in posts.iterator(chunk_size=2000):
+        yield absolute(reverse('aggregator:my_post_detail', args=[slug])), updated_at
+
+
+def page_urls():
+    for name in PAGE_NAMES:
+        yield absolute(reverse(name)), None
+    categories = Category.objects.filter(is_active=True).order_by('id').values_list('slug', 'created_at')
+    for slug, created_at in categories:
+        yield absolute(reverse('aggregator:category_detail', args=[slug])), created_at
+
+
+def render_urlset(urls):
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n']
+    count = 0
+    for loc, lastmod in urls:
+        lastmod = f'<lastmod>{lastmod.date().isoformat()}</lastmod>' if lastmod else ''
+        parts.append(f'<url><loc>{escape(loc)}</loc>{lastmod}</url>\n')
+        count += 1
+    parts.append('</urlset>\n')
+    return ''.join(parts).encode('utf-8'), count
+
+
+def write_file(name, data):
+    root = settings.SITEMAP_ROOT
+    root.mkdir(parents=True, exist_ok=True)
+    tmp_path = root / f'{name}.tmp'
+    tmp_path.write_bytes(data)
+    tmp_path.replace(root / name)
+
+
+def build_shard(shard):
+    """Regenerate one shard; returns True when its file changed"""
+    urls = page_urls() if shard.section == PAGES else post_urls(shard.number)
+    data, count = render_urlset(urls)
+    digest = hashlib.sha1(data).hexdigest()
+    path = settings.SITEMAP_ROOT / file_name(shard.section, shard.number)
+
+    changed = digest != shard.digest or not path.exists()
+    if changed:
+        if count:
+            # mtime=0 keeps the gzip bytes stable for identical content
+            write_file(path.name, gzip.compress(data, mtime=0))
+        else:
+            path.unlink(missing_ok=True)
+        shard.digest = digest
+        shard.lastmod = timezone.now()
+    shard.url_count = count
+    shard.is_dirty = False
+    shard.save()
+    return changed
+
+
+def build_index():
+    shards = SitemapShard.objects.filter(url_count__gt=0).order_by('section', 'number')
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n']
+    for shard in shards:
+        loc = absolute(reverse('aggregator:sitemap_file', args=[file_name(shard.section, shard.number)]))
+        parts.append(f'<sitemap><loc>{escape(loc)}</loc><lastmod>{shard.lastmod.isoformat()}</lastmod></sitemap>\n')
+    parts.append('</sitemapindex>\n')
+    write_file(INDEX_NAME, ''.join(parts).encode('utf-8'))
+
+
+def mark_all_dirty():
+    """Make sure every id range has a shard row, then flag them all"""
+    max_id = MyPost.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    existing = set(SitemapShard.objects.filter(section=POSTS).values_list('number', flat=True))
+    SitemapShard.objects.bulk_create([
+        SitemapShard(section=POSTS, number=number)
+        for number in range(shard_number(max_id) + 1) if number not in existing
+    ])
+    if not SitemapShard.objects.filter(section=PAGES).exists():
+        SitemapShard.objects.create(section=PAGES)
+    SitemapShard.objects.update(is_dirty=True)
+
+
+def build(full=False):
+    """Rebuild dirty shards (all when full) and the index; returns (rebuilt, changed)"""
+    if full:
+        mark_all_dirty()
+    rebuilt = changed = 0
+    for shard in SitemapShard.objects.filter(is_dirty=True).order_by('section', 'number'):
+        rebuilt += 1
+        changed += build_shard(shard)
+    if changed or not (settings.SITEMAP_ROOT / INDEX_NAME).exists():
+        build_index()
+    return rebuilt, changed
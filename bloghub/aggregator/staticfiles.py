@@ -0,0 +1,204 @@
+"""
+Static file storage and serving.
+
+CompressedManifestStaticFilesStorage extends Django's manifest storage:
+collectstatic minifies CSS and JS, writes content-hashed copies
+(css/style.3f2a1b9c0d4e.css) listed in staticfiles.json and, next to every
+compressible file, a .gz and (when the brotli package is installed) a .br
+variant. StaticFilesMiddleware serves STATIC_ROOT from those files without
+touching the URL resolver: the smallest variant the client accepts, with a
+year-long immutable Cache-Control for hashed names since their content can
+never change, and STATIC_MAX_AGE for the rest.
+"""
+import gzip
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf', '.eot'}
+COMPRESS_MIN_SIZE = 200  # Smaller files gain less than the headers cost
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+CSS_TOKENS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)''', re.S)
+CSS_TIGHT = set('{};,>')
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace, leaving strings untouched"""
+
+    def replace(match):
+        string, comment, space = match.groups()
+        if string:
+            return string
+        if comment:
+            # /*! ... */ marks a licence header that must be kept
+            return comment if comment.startswith('/*!') else ' '
+        before = css[match.start() - 1] if match.start() else '{'
+        after = css[match.end()] if match.end() < len(css) else '}'
+        return '' if before in CSS_TIGHT or before == ':' or after in CSS_TIGHT else ' '
+
+    # Comments first: whitespace next to them is only known once they are gone
+    css = CSS_TOKENS.sub(lambda m: m.group(0) if not m.group(2) else replace(m), css)
+    return CSS_TOKENS.sub(replace, css).replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """
+    Line-level JS minification: indentation, blank lines and whole-line //
+    comments go. Anything smarter needs a real parser, so files using
+    template literals (whose lines are content) are left as they are.
+    """
+    if '`' in js:
+        return js
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that minifies CSS/JS and precompresses what it collects"""
+    keep_intermediate_files = False
+    # Names missing from the manifest are hashed from STATIC_ROOT instead of
+    # raising, so a file added since the last collectstatic still renders
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic has not run (DEBUG off in tests or a fresh
+            # checkout): link the unhashed name rather than fail the page
+            return name
+
+    def _save(self, name, content):
+        # Minified before post_process so the hash is taken of what is served
+        minify = MINIFIERS.get(posixpath.splitext(name)[1])
+        if minify and not name.endswith(('.min.css', '.min.js')):
+            # post_process hands over files it has already read for hashing
+            content.seek(0)
+            content = ContentFile(minify(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            for path in {name, self.hashed_files.get(self.hash_key(self.clean_name(name)), name)}:
+                if posixpath.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS and self.exists(path):
+                    self.compress(path)
+
+    def compress(self, name):
+        """Write name.gz and name.br when they are noticeably smaller than name"""
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) < len(data) * 0.95:
+                self._save(name + suffix, ContentFile(compressed))
+
+
+class StaticFile:
+    """A file under STATIC_ROOT and its precompressed variants"""
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, path, immutable):
+        stat = path.stat()
+        self.path = path
+        self.content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.last_modified = http_date(stat.st_mtime)
+        # Weak: the encoded variants share it
+        self.etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.max_age = IMMUTABLE_MAX_AGE if immutable else settings.STATIC_MAX_AGE
+        self.immutable = immutable
+        self.variants = [
+            (encoding, path.with_name(path.name + suffix))
+            for encoding, suffix in self.ENCODINGS
+            if path.with_name(path.name + suffix).is_file()
+        ]
+
+    def choose(self, accept_encoding):
+        """(Content-Encoding or None, path) of the smallest variant the client accepts"""
+        accepted = set()
+        for part in accept_encoding.split(','):
+            coding, _, params = part.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(coding.strip().lower())
+        for encoding, path in self.variants:
+            if encoding in accepted or '*' in accepted:
+                return encoding, path
+        return None, self.path
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files before the rest of the middleware stack.
+    Place it right after SecurityMiddleware; it steps aside when there is no
+    STATIC_ROOT or STATIC_URL points at another host.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        static_url = settings.STATIC_URL or ''
+        if not settings.STATIC_ROOT or '://' in static_url or static_url.startswith('//'):
+            raise MiddlewareNotUsed
+        self.prefix = '/' + static_url.lstrip('/')
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.files = {}
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            static_file = self.find(request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def find(self, name):
+        if name in self.files:
+            return self.files[name]
+        normalized = posixpath.normpath(name).lstrip('/')
+        if normalized != name or normalized.startswith('..') or name.endswith(('.gz', '.br')):
+            return None
+        path = self.root / normalized
+        if not path.is_file():
+            # Not cached: the file may still be collected later
+            return None
+        static_file = self.files[name] = StaticFile(path, immutable=name in self.hashed_names)
+        return static_file
+
+    def serve(self, request, static_file):
+        if static_file.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            encoding, path = static_file.choose(request.headers.get('Accept-Encoding', ''))
+            response = FileResponse(path.open('rb'), content_type=static_file.content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = static_file.etag
+        response['Last-Modified'] = static_file.last_modified
+        response['Cache-Control'] = f'public, max-age={static_file.max_age}' + (', immutable' if static_file.immutable else '')
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
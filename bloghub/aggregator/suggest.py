@@ -0,0 +1,347 @@
+"""
+Search-as-you-type suggestions from an in-memory prefix index.
+
+SuggestionIndex keeps every accent-folded word of post titles, source names
+and category names in sorted arrays, next to the id of the entry it comes
+from, so the words starting with a prefix are one bisect range. Categories,
+sources and own posts (a few thousand entries) have arrays of their own and
+their range is scanned whole. Crawled posts are sorted by word, then by
+rank, so the postings of every word start with its newest posts: a lookup
+merges the runs of the words in the range by rank and stops after
+SUGGEST_SCAN_LIMIT postings, or once it has enough entries that also have a
+word starting with each other query word. The best ranked come first:
+categories, sources, own posts, then crawled posts newest first. Nothing of
+it touches the database.
+
+The index is built in a background thread when the WSGI/ASGI application
+starts (warm_up). Later changes go into a small delta array merged into the
+main one once it reaches SUGGEST_DELTA_MAX words: crawled posts are read
+after the highest indexed id, while own posts, sources and categories (a
+few thousand rows) are re-read and compared. A refresh runs in the
+background when invalidate() bumped the version in the shared cache
+(signals, including the crawl processes' last_fetched saves) or the
+index is older than SUGGEST_REFRESH_SECONDS; a full rebuild every
+SUGGEST_REBUILD_SECONDS drops removed or archived posts for good.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.urls import reverse
+
+from .models import BlogSource, Category, MyPost, Post
+from .normalization import plain_text
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'suggest:version'
+CATEGORY, SOURCE, MY_POST, POST = 'category', 'source', 'my_post', 'post'
+KIND_ORDER = {CATEGORY: 0, SOURCE: 1, MY_POST: 2, POST: 3}
+PREFIX_END = '\uffff'  # After every word character: word + PREFIX_END closes a prefix range
+MERGED_RUNS = 64  # Words of a prefix whose posting lists are merged rather than ranked
+
+
+def get_version():
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        shared.add(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate():
+    shared = caches['shared']
+    try:
+        shared.incr(VERSION_KEY)
+    except ValueError:
+        shared.set(VERSION_KEY, 2, None)
+
+
+def _rank(kind, timestamp=0.0):
+    """Lower ranks first: by kind, then by timestamp, newest first"""
+    return KIND_ORDER[kind] * 1e10 - timestamp
+
+
+def _entry_url(kind, key):
+    if kind == CATEGORY:
+        return reverse('aggregator:category_detail', args=[key])
+    if kind == SOURCE:
+        return f"{reverse('aggregator:blog_sources')}?{urlencode({'search': key})}"
+    if kind == MY_POST:
+        return reverse('aggregator:my_post_detail', args=[key])
+    return reverse('aggregator:post_redirect', args=[key])
+
+
+class SuggestionIndex:
+    """Sorted (word, entry id) arrays over the suggestion entries"""
+
+    def __init__(self):
+        # Entries are columns indexed by entry id, so lookups filter and rank in C
+        self.kinds, self.keys, self.labels, self.texts, self.ranks = [], [], [], [], []
+        self.urls = []  # Reversed on first use: reverse() costs more than the lookup
+        # Crawled posts, by (word, rank)
+        self.main = ([], [])
+        self.delta = ([], [])
+        # Categories, sources and own posts, by word
+        self.names = ([], [])
+        self.dead = set()
+        self.inactive_sources = None
+        # (kind, pk or source name) -> (entry id, signature) of the re-read kinds
+        self.tracked = {}
+        self.last_post_id = 0
+        self.version = None
+        self.built_at = self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self.kinds) - len(self.dead)
+
+    # Building
+
+    def add(self, kind, key, label, rank):
+        """Append an entry; returns its (word, entry id) pairs, not yet searchable"""
+        entry_id = len(self.kinds)
+        words = list(dict.fromkeys(plain_text(label).split()))
+        self.keys.append(key)
+        self.labels.append(label)
+        # ' word' in text <=> a word of the entry starts with word
+        self.texts.append(' ' + ' '.join(words))
+        self.ranks.append(rank)
+        self.urls.append(None)
+        self.kinds.append(kind)
+        return [(word, entry_id) for word in words]
+
+    def _post_order(self, pair):
+        word, entry_id = pair
+        return word, self.ranks[entry_id]
+
+    def publish(self, pairs):
+        """Make crawled post pairs searchable through the delta array"""
+        if not pairs:
+            return
+        key = self._post_order
+        merged = list(heapq.merge(zip(*self.delta), sorted(pairs, key=key), key=key))
+        if len(merged) >= settings.SUGGEST_DELTA_MAX:
+            merged = list(heapq.merge(zip(*self.main), merged, key=key))
+            self.main = self._arrays(merged)
+            self.delta = ([], [])
+        else:
+            self.delta = self._arrays(merged)
+
+    def publish_names(self, pairs):
+        if pairs:
+            self.names = self._arrays(list(heapq.merge(zip(*self.names), sorted(pairs))))
+
+    @staticmethod
+    def _arrays(pairs):
+        if not pairs:
+            return [], []
+        keys, ids = zip(*pairs)
+        return list(keys), list(ids)
+
+    @staticmethod
+    def inactive_source_ids():
+        return frozenset(BlogSource.objects.filter(is_active=False).values_list('id', flat=True))
+
+    def sync_posts(self):
+        """Index crawled posts of active sources newer than the last indexed id"""
+        posts = Post.objects.filter(
+            id__gt=self.last_post_id, blog_source__is_active=True, duplicate_of__isnull=True
+        ).order_by('id')
+        if not self.last_post_id:
+            # First build: only the newest SUGGEST_MAX_POSTS
+            newest = Post.objects.order_by('-id').values_list('id', flat=True)[settings.SUGGEST_MAX_POSTS:][:1]
+            posts = posts.filter(id__gt=next(iter(newest), 0))
+        pairs = []
+        rows = posts.values_list('id', 'title', 'published_date', 'created_at')
+        for pk, title, published, created in rows.iterator(chunk_size=2000):
+            pairs.extend(self.add(POST, pk, title, _rank(POST, (published or created).timestamp())))
+            self.last_post_id = pk
+        return pairs
+
+    def sync_tracked(self):
+        """Re-read own posts, sources and categories; replace the entries that changed"""
+        rows = {}
+        for pk, title, slug, published, created in MyPost.objects.filter(is_published=True).values_list(
+            'id', 'title', 'slug', 'published_date', 'created_at'
+        ):
+            rows[MY_POST, pk] = (slug, title, _rank(MY_POST, (published or created).timestamp()))
+        # Names rank shortest first: the closest completion of a prefix. Sources
+        # link to a directory search by name, so one entry per name
+        for name in BlogSource.objects.filter(is_active=True).values_list('name', flat=True):
+            rows[SOURCE, name] = (name, name, _rank(SOURCE, -len(name)))
+        for pk, name, slug in Category.objects.filter(is_active=True).values_list('id', 'name', 'slug'):
+            rows[CATEGORY, pk] = (slug, name, _rank(CATEGORY, -len(name)))
+
+        pairs = []
+        for ident in set(self.tracked) - set(rows):
+            self.dead.add(self.tracked.pop(ident)[0])
+        for ident, signature in rows.items():
+            current = self.tracked.get(ident)
+            if current and current[1] == signature:
+                continue
+            if current:
+                self.dead.add(current[0])
+            key, label, rank = signature
+            pairs.extend(self.add(ident[0], key, label, rank))
+            self.tracked[ident] = (len(self.kinds) - 1, signature)
+        return pairs
+
+    def refresh(self, version=None):
+        """Add what changed since the last sync; False when it takes a full rebuild"""
+        if self.inactive_source_ids() != self.inactive_sources:
+            return False  # Posts of a (de)activated source come or go
+        self.publish_names(self.sync_tracked())
+        self.publish(self.sync_posts())
+        self.version = version
+        self.refreshed_at = time.monotonic()
+        return True
+
+    @classmethod
+    def build(cls, version=None):
+        index = cls()
+        index.inactive_sources = cls.inactive_source_ids()
+        index.names = cls._arrays(sorted(index.sync_tracked()))
+        index.main = cls._arrays(sorted(index.sync_posts(), key=index._post_order))
+        index.version = version
+        index.built_at = index.refreshed_at = time.monotonic()
+        return index
+
+    # Lookups
+
+    def _range(self, keys, word):
+        start = bisect_left(keys, word)
+        return start, bisect_left(keys, word + PREFIX_END, start)
+
+    def _range_size(self, word):
+        return sum(
+            stop - start for start, stop in (self._range(keys, word) for keys, _ in (self.main, self.delta, self.names))
+        )
+
+    def _ranked_posts(self, keys, ids, word):
+        """Postings of the words starting with word, best ranked first, at most SUGGEST_SCAN_LIMIT"""
+        rank, limit = self.ranks.__getitem__, settings.SUGGEST_SCAN_LIMIT
+        first, stop = self._range(keys, word)
+        runs = []
+        start = first
+        while start < stop and len(runs) < MERGED_RUNS:
+            end = bisect_right(keys, keys[start], start, stop)
+            runs.append(ids[start:end])
+            start = end
+        if start < stop:
+            # A short prefix of many words: ranking the range beats merging its runs
+            return heapq.nsmallest(limit, ids[first:stop], key=rank)
+        return islice(heapq.merge(*runs, key=rank), limit)
+
+    def lookup(self, query, limit=None, kinds=None):
+        """Best entries whose words start with every word of query, of kinds only if given"""
+        words = plain_text(query).split()
+        if not words or len(''.join(words)) < settings.SUGGEST_MIN_LENGTH:
+            return []
+        limit = limit or settings.SUGGEST_LIMIT
+        words.sort(key=self._range_size)
+        texts, entry_kinds, dead = self.texts, self.kinds, self.dead
+        needles = [' ' + word for word in words[1:]]
+
+        def matches(entry_id):
+            return (
+                entry_id not in dead
+                and all(needle in texts[entry_id] for needle in needles)
+                and (not kinds or entry_kinds[entry_id] in kinds)
+            )
+
+        name_keys, name_ids = self.names
+        start, stop = self._range(name_keys, words[0])
+        candidates = [entry_id for entry_id in set(name_ids[start:stop]) if matches(entry_id)]
+        if not kinds or POST in kinds:
+            # Merged by rank, so the first matches are the best ones
+            found = set()
+            merged = heapq.merge(
+                *(self._ranked_posts(keys, ids, words[0]) for keys, ids in (self.main, self.delta)),
+                key=self.ranks.__getitem__,
+            )
+            for scanned, entry_id in enumerate(merged):
+                if len(found) >= limit or scanned >= settings.SUGGEST_SCAN_LIMIT:
+                    break
+                if entry_id not in found and matches(entry_id):
+                    found.add(entry_id)
+                    candidates.append(entry_id)
+        best = heapq.nsmallest(limit, candidates, key=self.ranks.__getitem__)
+        return [
+            {'type': entry_kinds[entry_id], 'label': self.labels[entry_id], 'url': self.url(entry_id)}
+            for entry_id in best
+        ]
+
+    def url(self, entry_id):
+        url = self.urls[entry_id]
+        if url is None:
+            url = self.urls[entry_id] = _entry_url(self.kinds[entry_id], self.keys[entry_id])
+        return url
+
+
+_index = None
+_lock = threading.Lock()
+_next_check = 0.0
+
+
+def _run(task):
+    if not _lock.acquire(blocking=False):
+        return  # Another thread is on it
+    try:
+        task()
+    except Exception:
+        logger.exception('Suggestion index update failed')
+    finally:
+        _lock.release()
+        connections.close_all()
+
+
+def _rebuild():
+    global _index
+    started = time.perf_counter()
+    _index = SuggestionIndex.build(get_version())
+    logger.info('Suggestion index built: %d entries in %.2fs', len(_index), time.perf_counter() - started)
+
+
+def _refresh():
+    version = get_version()  # Read first: a bump during the refresh triggers another one
+    if not _index.refresh(version):
+        _rebuild()
+
+
+def _start(task):
+    threading.Thread(target=_run, args=(task,), name='suggest-index', daemon=True).start()
+
+
+def warm_up():
+    """Build the index in the background (called when the application starts)"""
+    if settings.SUGGEST_ENABLED:
+        _start(_rebuild)
+
+
+def maybe_update():
+    """Start a background refresh or rebuild when due; checks at most every SUGGEST_CHECK_SECONDS"""
+    global _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return
+    _next_check = now + settings.SUGGEST_CHECK_SECONDS
+    index = _index
+    if index is None or now - index.built_at > settings.SUGGEST_REBUILD_SECONDS:
+        _start(_rebuild)
+    elif index.version != get_version() or now - index.refreshed_at > settings.SUGGEST_REFRESH_SECONDS:
+        _start(_refresh)
+
+
+def suggest(query, limit=None, kinds=None):
+    """Suggestions for query; empty until the index is built"""
+    maybe_update()
+    index = _index
+    return index.lookup(query, limit, kinds) if index is not None else []
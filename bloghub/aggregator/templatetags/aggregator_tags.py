@@ -0,0 +1,29 @@
+from django import template
+from django.conf import settings
+
+from aggregator import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('aggregator/partials/thumbnail.html')
+def post_thumbnail(post, css_class='w-full h-auto object-cover', sizes='(min-width: 640px) 320px, 100vw'):
+    """Render <picture> dùng ảnh resize local nếu có, ngược lại dùng ảnh gốc"""
+    context = {
+        'post': post,
+        'css_class': css_class,
+        'sizes': sizes,
+        'src': post.thumbnail_url,
+    }
+    if thumbnails.has_variants(post):
+        widths = settings.THUMBNAIL_WIDTHS
+        context.update({
+            'src': thumbnails.variant_url(post.thumbnail_hash, widths[-1]),
+            'webp_srcset': ', '.join(
+                f'{thumbnails.variant_url(post.thumbnail_hash, w, "webp")} {w}w' for w in widths
+            ),
+            'jpg_srcset': ', '.join(
+                f'{thumbnails.variant_url(post.thumbnail_hash, w)} {w}w' for w in widths
+            ),
+        })
+    return context
@@ -1,3 +1,1501 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import hmac
+import io
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone as dt_timezone
+from html import unescape
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import feedparser
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .changelists import EstimatedCountPaginator, estimated_count
+from .classification import NaiveBayesModel, PostClassifier, tokenize
+from .compression import choose_encoding
+from .crawler import EntryHTMLParser, FeedCrawler, FeedFetchError, download_feed
+from .dates import EntryDateParser
+from .linkfilter import BloomFilter
+from .models import (
+    ArchivedPost, BlogSource, Category, CrawlRun, FetchJob, MyPost, Post, RelatedPost, SitemapShard,
+    TrendingEntry, ViewBucket, WebSubSubscription,
+)
+from .normalization import canonicalize_url, fold, search_key, slugify_vi, sort_letter, unique_slug
+from .staticfiles import StaticFile, minify_css, minify_js
+from .suggest import SuggestionIndex
+from . import (
+    archive, compression, crawler, crawlstats, dates, dedup, directory, fragments, jobs, listing, opml, related,
+    sitemaps, thumbnails, throttling, trending, websub,
+)
+
+# Per-test in-memory caches: the shared cache is a directory under media/
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AggregatorTestCase(TestCase):
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+    def make_source(self, name='Blog', **fields):
+        fields.setdefault('rss_url', f'https://{name.lower().replace(" ", "-")}.example/feed/')
+        return BlogSource.objects.create(name=name, **fields)
+
+    def make_post(self, source, title, days_ago=0, **fields):
+        fields.setdefault('link', f'https://{source.pk}.example/{Post.objects.count()}/')
+        return Post.objects.create(
+            title=title,
+            blog_source=source,
+            published_date=timezone.now() - timedelta(days=days_ago),
+            **fields
+        )
+
+    def temporary_directory(self):
+        """Directory removed after the test"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return Path(directory.name)
+
+    def enable_settings(self, **settings):
+        """override_settings for the rest of the test, usable from setUp"""
+        override = override_settings(**settings)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+def rss(*items):
+    """RSS document with (title, link) items"""
+    entries = ''.join(
+        f'<item><title>{title}</title><link>{link}</link><description>{title}</description></item>'
+        for title, link in items
+    )
+    return f'<rss version="2.0"><channel><title>Feed</title>{entries}</channel></rss>'.encode()
+
+
+def word(number):
+    """Distinct letters-only word for number: 0 -> 'a', 26 -> 'ba'"""
+    letters = ''
+    while True:
+        letters = chr(ord('a') + number % 26) + letters
+        number //= 26
+        if not number:
+            return letters
+
+def image_bytes(size=(800, 400), fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ThumbnailTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_settings(THUMBNAIL_ROOT=self.temporary_directory())
+        self.post = self.make_post(self.make_source(), 'Ảnh', thumbnail_url='https://img.example/a.png')
+
+    def test_variants_are_resized_and_served(self):
+        digest = thumbnails.build_variants(image_bytes())
+
+        for width in (320, 640):
+            with Image.open(thumbnails.variant_path(thumbnails.variant_name(digest, width, 'jpg'))) as image:
+                self.assertEqual(image.size, (width, width // 2))
+        response = self.client.get(thumbnails.variant_url(digest, 320, 'webp'))
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(thumbnails.variant_url('0' * 40, 320)).status_code, 404)
+
+    def test_small_images_are_not_upscaled(self):
+        digest = thumbnails.build_variants(image_bytes((100, 50)))
+        with Image.open(thumbnails.variant_path(thumbnails.variant_name(digest, 640, 'webp'))) as image:
+            self.assertEqual(image.size, (100, 50))
+
+    def test_only_http_urls_are_fetched(self):
+        for url in ('file:///etc/passwd', 'ftp://img.example/a.png', 'data:image/png;base64,AAAA'):
+            with self.assertRaises(thumbnails.ThumbnailError):
+                thumbnails.download_image(url)
+
+    def test_broken_images_are_marked_failed_and_skipped(self):
+        with mock.patch.object(thumbnails, 'download_image', return_value=b'not an image'), \
+                self.assertLogs('aggregator.thumbnails', 'WARNING'):
+            self.assertFalse(thumbnails.process_thumbnail(self.post))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_hash, thumbnails.FAILED)
+        self.assertFalse(thumbnails.has_variants(self.post))
+
+        with mock.patch.object(thumbnails, 'download_image', return_value=image_bytes()) as download:
+            call_command('build_thumbnails', stdout=StringIO())
+            download.assert_not_called()
+            call_command('build_thumbnails', '--retry-failed', stdout=StringIO())
+            download.assert_called_once_with('https://img.example/a.png')
+        self.post.refresh_from_db()
+        self.assertTrue(thumbnails.has_variants(self.post))
+
+
+def parse_html(html, collect_text=True):
+    parser = EntryHTMLParser(collect_text)
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+class EntryExtractionTests(SimpleTestCase):
+    def test_text_skips_scripts_and_collapses_whitespace(self):
+        parser = parse_html('<p>Xin  <b>chào</b></p>\n<script>var a = "<p>";</script><style>p {}</style><p>bạn &amp; tôi</p>')
+        self.assertEqual(parser.text, 'Xin chào bạn & tôi')
+
+    def test_first_real_image(self):
+        cases = {
+            # Tracking pixel first, then a lazy-loaded image
+            '<img src="/pixel.gif" width="1"><img src="data:," data-lazy-src="/lazy.jpg">': '/lazy.jpg',
+            '<img src="data:image/gif;base64,R0lG" srcset="/small.jpg 320w, /big.jpg 1024w">': '/small.jpg',
+            '<p>Không có ảnh</p>': '',
+        }
+        for html, expected in cases.items():
+            self.assertEqual(parse_html(html).best_image, expected, html)
+
+    def test_image_hints_win_over_inline_images(self):
+        parser = parse_html('<img src="/inline.jpg"/><meta property="og:image" content="/og.jpg"/>')
+        self.assertEqual((parser.image_url, parser.best_image), ('/inline.jpg', '/og.jpg'))
+
+    def entry(self, item):
+        feed = feedparser.parse(
+            '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/" '
+            'xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>'
+            f'<item><title>T</title><link>https://blog.example/t</link>{item}</item>'
+            '</channel></rss>'
+        )
+        return feed.entries[0]
+
+    def test_feed_metadata_before_html(self):
+        feed_crawler = FeedCrawler(classify=False, load_link_filter=False)
+        entry = self.entry(
+            '<media:content url="https://blog.example/video.mp4" medium="video"/>'
+            '<media:content url="https://blog.example/cover.jpg" medium="image"/>'
+            '<description>&lt;img src="/inline.jpg"&gt;</description>'
+        )
+        self.assertEqual(feed_crawler.extract_thumbnail(entry), 'https://blog.example/cover.jpg')
+
+    def test_excerpt_is_cut_and_content_is_scanned_for_images(self):
+        feed_crawler = FeedCrawler(classify=False, load_link_filter=False)
+        entry = self.entry(
+            f'<description>{"chữ " * 200}</description>'
+            '<content:encoded><![CDATA[<p>Nội dung</p><img src="/content.jpg">]]></content:encoded>'
+        )
+        excerpt, image_url = feed_crawler.extract_excerpt_and_image(entry)
+        self.assertEqual(len(excerpt), 503)
+        self.assertTrue(excerpt.endswith('...'))
+        self.assertEqual(image_url, '/content.jpg')
+
+
+class FragmentCacheTests(AggregatorTestCase):
+    TEMPLATE = 'aggregator/partials/post_card.html'
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Python', slug='python')
+        self.source = self.make_source('Nguồn A')
+        self.posts = [self.make_post(self.source, f'Bài {number}', category=self.category) for number in range(3)]
+        fragments._card_engines.clear()
+
+    def render(self, posts=None):
+        """HTML of the cards and the number of cards rendered (not served from the cache)"""
+        template = fragments.get_card_template(self.TEMPLATE)
+        with mock.patch.object(template, 'render', wraps=template.render) as render, \
+                mock.patch.object(fragments, 'get_card_template', return_value=template):
+            cards = fragments.render_cards(posts or self.posts, self.TEMPLATE)
+        return [card.html for card in cards], render.call_count
+
+    def test_one_cache_round_trip_per_page(self):
+        self.render()
+        with mock.patch.object(fragments.cache, 'get_many', wraps=fragments.cache.get_many) as get_many:
+            html, rendered = self.render()
+        get_many.assert_called_once()
+        self.assertEqual(rendered, 0)
+        self.assertIn('Bài 1', html[1])
+
+    def test_edited_post_is_rendered_again(self):
+        self.render()
+        post = self.posts[0]
+        post.title = 'Bài đã sửa'
+        post.save()
+        html, rendered = self.render([post, *self.posts[1:]])
+        self.assertEqual(rendered, 1)
+        self.assertIn('Bài đã sửa', html[0])
+
+    def test_category_and_source_edits_invalidate_every_card(self):
+        self.render()
+        self.category.name = 'Django'
+        self.category.save()
+        html, rendered = self.render()
+        self.assertEqual(rendered, 3)
+        self.assertIn('Django', html[0])
+
+        # A crawl only moves last_fetched, which post cards do not show
+        self.source.last_fetched = timezone.now()
+        self.source.save(update_fields=['last_fetched'])
+        self.assertEqual(self.render()[1], 0)
+
+    def test_my_post_cards_follow_the_author(self):
+        author = User.objects.create(username='writer')
+        post = MyPost.objects.create(title='Của tôi', content='...', author=author, is_published=True)
+        template = 'aggregator/partials/my_post_card.html'
+        first = fragments.card_key(1, template, post)
+        author.username = 'renamed'
+        self.assertNotEqual(fragments.card_key(1, template, post), first)
+
+
+class DirectoryTests(AggregatorTestCase):
+    def test_sort_letter(self):
+        for name, letter in (('Đà Lạt Blog', 'D'), ('ăn uống', 'A'), ('  Python', 'P'), ('9gag', '#'), ('', '#')):
+            self.assertEqual(sort_letter(name), letter, name)
+
+    def test_sources_grouped_with_post_counts(self):
+        first = self.make_source('Ý tưởng')
+        self.make_source('Yêu code')
+        self.make_source('Đường đi')
+        self.make_source('Yên tĩnh', is_active=False)
+        for number in range(3):
+            self.make_post(first, f'Bài {number}')
+
+        data = directory.get_directory()
+        self.assertEqual(list(data['grouped_sources']), ['D', 'Y'])
+        self.assertEqual([source.name for source in data['grouped_sources']['Y']], ['Yêu code', 'Ý tưởng'])
+        self.assertEqual((data['total_sources'], data['total_posts']), (3, 3))
+        self.assertEqual(directory.available_letters(), ['D', 'Y'])
+        self.assertEqual(list(directory.get_directory(letter='d')['grouped_sources']), ['D'])
+
+    def test_source_changes_refresh_the_cached_directory(self):
+        source = self.make_source('Alpha')
+        self.assertEqual(directory.get_directory()['total_posts'], 0)
+        self.make_post(source, 'Bài mới')
+        # Post counts are refreshed by the crawl saving last_fetched
+        source.last_fetched = timezone.now()
+        source.save(update_fields=['last_fetched'])
+        self.assertEqual(directory.get_directory()['total_posts'], 1)
+
+        source.name = 'Beta'
+        source.save()
+        self.assertEqual(list(directory.get_directory()['grouped_sources']), ['B'])
+        self.assertEqual(directory.available_letters(), ['B'])
+
+
+class NormalizationTests(AggregatorTestCase):
+    def test_fold_and_slugs(self):
+        self.assertEqual(fold('Lập trình Đà Nẵng'), 'Lap trinh Da Nang')
+        # Text stored in decomposed (NFD) form folds the same way
+        self.assertEqual(fold('Tie\u0302\u0301ng Vie\u0323\u0302t'), 'Tieng Viet')
+        self.assertEqual(search_key('  Học   MÁY\n'), 'hoc may')
+        self.assertEqual(slugify_vi('Lập trình: Python & Django!'), 'lap-trinh-python-django')
+        self.assertEqual(slugify_vi('Xây dựng ứng dụng', max_length=9), 'xay-dung')
+
+    def test_unique_slug_picks_the_first_free_suffix(self):
+        for slug in ('lap-trinh', 'lap-trinh-2', 'lap-trinh-4'):
+            Category.objects.create(name=slug, slug=slug)
+        self.assertEqual(unique_slug(Category, 'Lập trình', 100), 'lap-trinh-3')
+        self.assertEqual(unique_slug(Category, 'Lập trình mới', 100), 'lap-trinh-moi')
+        self.assertEqual(Category.objects.create(name='Lập trình').slug, 'lap-trinh-3')
+        # Saving an existing row does not count its own slug as taken
+        own = Category.objects.get(slug='lap-trinh')
+        self.assertEqual(unique_slug(Category, 'Lập trình', 100, exclude_pk=own.pk), 'lap-trinh')
+
+    def test_suffix_fits_max_length(self):
+        Category.objects.create(name='x', slug='abcdefghij')
+        self.assertEqual(unique_slug(Category, 'abcdefghij', 10), 'abcdefgh-2')
+
+    def search(self, url_name, query):
+        response = self.client.get(reverse(url_name), {'search': query})
+        return [result['title'] for result in response.json()['results']]
+
+    def test_api_search_ignores_accents(self):
+        source = self.make_source()
+        self.make_post(source, 'Lập trình Python', excerpt='Hướng dẫn cơ bản')
+        self.make_post(source, 'Nấu ăn')
+        for query in ('lap trinh', 'LẬP TRÌNH', 'huong dan'):
+            self.assertEqual(self.search('aggregator:post-list', query), ['Lập trình Python'], query)
+
+    def test_raw_columns_are_searched_as_typed(self):
+        MyPost.objects.create(
+            title='Ghi chú', content='Dùng ORM của Django', is_published=True,
+            author=User.objects.create(username='writer'),
+        )
+        self.assertEqual(self.search('aggregator:mypost-list', 'ORM của'), ['Ghi chú'])
+        self.assertEqual(self.search('aggregator:mypost-list', 'ghi chu'), ['Ghi chú'])
+
+
+class ClassifierTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_settings(CLASSIFIER_MODEL_PATH=self.temporary_directory() / 'model.json')
+        self.python = Category.objects.create(name='Python', keywords='django, flask')
+        self.devops = Category.objects.create(name='DevOps', keywords='docker, kubernetes')
+        self.source = self.make_source()
+
+    def classify(self, title, excerpt='', source=None):
+        post = Post(title=title, excerpt=excerpt, blog_source=source or self.source)
+        return PostClassifier().classify(post)
+
+    def test_tokens_are_folded_with_bigrams(self):
+        self.assertEqual(tokenize('Học máy 2024 với Python'), ['hoc', 'may', 'voi', 'python', 'hoc_may', 'may_voi', 'voi_python'])
+
+    def test_keyword_rules_weight_the_title(self):
+        self.assertEqual(self.classify('Deploy Django lên server'), self.python.pk)
+        self.assertEqual(self.classify('Chạy Django trong Docker', 'docker compose và docker swarm'), self.devops.pk)
+        # A tie in the title alone is left to the next signals
+        self.assertIsNone(self.classify('Django và Docker'))
+
+    def test_source_tags_naming_one_category(self):
+        tagged = self.make_source('Ops blog', tags='devops, linux')
+        self.assertEqual(self.classify('Ghi chép tuần này', source=tagged), self.devops.pk)
+        both = self.make_source('Mixed', tags='Python, DevOps')
+        self.assertIsNone(self.classify('Ghi chép tuần này', source=both))
+
+    def test_model_is_only_trained_by_reclassify(self):
+        for number in range(5):
+            self.make_post(self.source, f'Bài {number} về pandas numpy', category=self.python)
+            self.make_post(self.source, f'Bài {number} về terraform ansible', category=self.devops)
+        self.assertIsNone(self.classify('Dùng numpy xử lý dữ liệu'))
+
+        call_command('reclassify', '--train', stdout=StringIO())
+        self.assertEqual(self.classify('Dùng numpy xử lý dữ liệu'), self.python.pk)
+        self.assertEqual(self.classify('Viết module terraform'), self.devops.pk)
+        self.assertIsNone(self.classify('Một chủ đề hoàn toàn khác'))
+
+    def test_reclassify_keeps_editor_choices(self):
+        edited = self.make_post(self.source, 'Django cho người mới', category=self.devops)
+        crawled = self.make_post(self.source, 'Kubernetes cơ bản')
+        call_command('reclassify', stdout=StringIO())
+        edited.refresh_from_db()
+        crawled.refresh_from_db()
+        self.assertEqual((edited.category, edited.category_is_auto), (self.devops, False))
+        self.assertEqual((crawled.category, crawled.category_is_auto), (self.devops, True))
+
+    def test_empty_model(self):
+        self.assertEqual(NaiveBayesModel().predict(['python']), (None, 0.0))
+
+
+class CanonicalizeUrlTests(SimpleTestCase):
+    def test_drops_tracking_parameters_fragment_and_default_port(self):
+        self.assertEqual(
+            canonicalize_url('HTTPS://Example.COM:443/post?utm_source=rss&b=2&fbclid=x&a=1#comments'),
+            'https://example.com/post?a=1&b=2',
+        )
+
+    def test_keeps_other_ports_and_adds_root_path(self):
+        self.assertEqual(canonicalize_url('http://example.com:8080'), 'http://example.com:8080/')
+
+    def test_leaves_unusual_urls_alone(self):
+        for url in ('mailto:me@example.com', 'http://example.com:99999/a', 'https://user:pw@example.com/a'):
+            self.assertEqual(canonicalize_url(url), url)
+        self.assertEqual(canonicalize_url('  '), '')
+
+
+class DuplicateClusterTests(AggregatorTestCase):
+    TEXT = 'Hướng dẫn cài đặt Django với PostgreSQL trên Ubuntu server cho người mới bắt đầu'
+
+    def make_fingerprinted(self, source, title, days_ago=0):
+        post = Post(
+            title=title, link=f'https://{source.pk}.example/{Post.objects.count()}/',
+            blog_source=source, published_date=timezone.now() - timedelta(days=days_ago),
+        )
+        dedup.fingerprint_post(post)
+        post.duplicate_of_id = dedup.find_original(post)
+        post.save()
+        return post
+
+    def make_with_fingerprint(self, source, fingerprint):
+        post = self.make_post(source, 'Bài', simhash=dedup.to_signed(fingerprint))
+        Post.objects.filter(pk=post.pk).update(**dict(zip(dedup.BAND_FIELDS, dedup.bands(fingerprint))))
+        return post
+
+    def test_copies_join_the_first_story(self):
+        first, second, third = self.make_source('One'), self.make_source('Two'), self.make_source('Three')
+        head = self.make_fingerprinted(first, self.TEXT, days_ago=2)
+        # Syndicated copies often only differ in case and punctuation
+        copy = self.make_fingerprinted(second, f'[{self.TEXT.upper()}]', days_ago=1)
+        other = self.make_fingerprinted(third, 'Kinh nghiệm phỏng vấn lập trình viên Python tại các công ty sản phẩm lớn')
+
+        self.assertEqual(copy.duplicate_of_id, head.pk)
+        self.assertIsNone(other.duplicate_of_id)
+        self.assertEqual(set(dedup.one_per_story(Post.objects.all())), {head, other})
+
+    def test_copy_is_shown_when_the_head_is_filtered_out(self):
+        head = self.make_fingerprinted(self.make_source('Inactive', is_active=False), self.TEXT, days_ago=1)
+        copy = self.make_fingerprinted(self.make_source('Active'), self.TEXT)
+
+        self.assertEqual(copy.duplicate_of_id, head.pk)
+        visible = dedup.one_per_story(Post.objects.filter(blog_source__is_active=True))
+        self.assertEqual(list(visible), [copy])
+
+    def test_copy_behind_a_crowded_band_is_found(self):
+        source = self.make_source()
+        fingerprint = 0x0123_4567_89AB_CDEF
+        # Older posts sharing only the lowest band, far away in Hamming distance
+        for number in range(60):
+            self.make_with_fingerprint(source, fingerprint ^ (0xFFFF_FFFF_FFFF_0000 - (number << 16)))
+        original = self.make_with_fingerprint(source, fingerprint ^ 0b101)
+
+        post = Post(title='Bản sao')
+        post.simhash = dedup.to_signed(fingerprint)
+        for field, value in zip(dedup.BAND_FIELDS, dedup.bands(fingerprint)):
+            setattr(post, field, value)
+        self.assertEqual(dedup.find_original(post), original.pk)
+
+    def test_short_texts_are_not_fingerprinted(self):
+        self.assertIsNone(dedup.simhash('Hello world'))
+
+
+class RelatedPostsTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(username='writer')
+        self.django = self.write('Triển khai Django với Gunicorn', 'Cấu hình Django, Gunicorn và Nginx', 'django')
+        self.django_orm = self.write('Tối ưu Django ORM', 'Truy vấn Django ORM nhanh hơn', 'django')
+        self.cooking = self.write('Nấu phở bò', 'Công thức nấu phở bò Hà Nội', 'am thuc')
+        self.crawled = self.make_post(self.make_source(), 'Django ORM và Gunicorn', excerpt='Django ORM')
+
+    def write(self, title, content, tags, **fields):
+        return MyPost.objects.create(
+            title=title, content=content, tags=tags, author=self.author, is_published=True, **fields
+        )
+
+    def neighbours(self, post):
+        return [
+            entry.related_my_post_id or entry.related_post_id
+            for entry in RelatedPost.objects.filter(post=post).order_by('rank')
+        ]
+
+    def dirty(self):
+        return set(MyPost.objects.filter(related_is_dirty=True).values_list('id', flat=True))
+
+    def test_neighbours_by_similarity(self):
+        related.refresh_related()
+        self.assertEqual(set(self.neighbours(self.django)), {self.django_orm.pk, self.crawled.pk})
+        self.assertEqual(self.neighbours(self.cooking), [])
+        self.assertEqual(self.dirty(), set())
+
+    def test_saves_only_mark_posts_dirty(self):
+        related.refresh_related()
+        out = StringIO()
+        call_command('refresh_related', '--if-dirty', stdout=out)
+        self.assertIn('nothing to rebuild', out.getvalue())
+
+        dumplings = self.write('Gói bánh chưng', 'Công thức nấu bánh chưng ngày Tết', 'am thuc')
+        self.assertEqual(self.dirty(), {dumplings.pk})
+        self.assertEqual(self.neighbours(self.cooking), [])
+
+        call_command('refresh_related', '--if-dirty', stdout=StringIO())
+        self.assertEqual(self.dirty(), set())
+        # Older posts pick up the new one too
+        self.assertEqual(self.neighbours(self.cooking), [dumplings.pk])
+
+    def test_unpublished_and_deleted_posts_disappear_at_once(self):
+        related.refresh_related()
+        self.django_orm.is_published = False
+        self.django_orm.save()
+        self.assertNotIn(self.django_orm.pk, self.neighbours(self.django))
+        self.assertFalse(RelatedPost.objects.filter(post=self.django_orm).exists())
+        self.assertIn(self.django.pk, self.dirty())
+
+        related.refresh_related()
+        self.django.delete()
+        self.assertFalse(RelatedPost.objects.filter(related_my_post_id=self.django.pk).exists())
+
+    def test_crawls_leave_the_rebuild_to_the_command(self):
+        self.enable_settings(LINK_FILTER_PATH=self.temporary_directory() / 'links.bin')
+        source = self.make_source('Django blog')
+        feed = rss(('Django ORM nâng cao', 'https://django-blog.example/orm/'))
+        with mock.patch.object(crawler, 'download_feed', return_value=(feed, 200, len(feed), {})), \
+                mock.patch.object(related, 'refresh_related') as refresh:
+            call_command('fetch_feeds', '--source-id', str(source.pk), stdout=StringIO())
+        self.assertTrue(Post.objects.filter(title='Django ORM nâng cao').exists())
+        refresh.assert_not_called()
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=12, TRENDING_WINDOW_HOURS=72, TRENDING_EXTERNAL_WEIGHT=0.5, TRENDING_COUNT=5)
+class TrendingTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now().replace(minute=30, second=0, microsecond=0)
+        self.author = User.objects.create(username='writer')
+        self.source = self.make_source()
+
+    def my_post(self, title, **fields):
+        return MyPost.objects.create(title=title, content='...', author=self.author, is_published=True, **fields)
+
+    def views(self, count, hours_ago=0, **lookup):
+        for _ in range(count):
+            trending.record_view(now=self.now - timedelta(hours=hours_ago), **lookup)
+
+    def test_views_share_one_row_per_hour(self):
+        post = self.my_post('Bài')
+        self.views(3, my_post_id=post.pk)
+        self.views(2, hours_ago=1, my_post_id=post.pk)
+        self.assertEqual(
+            list(ViewBucket.objects.order_by('bucket').values_list('count', flat=True)), [2, 3]
+        )
+
+    def test_click_through_counts_a_view(self):
+        post = self.make_post(self.source, 'Bài ngoài', link='https://blog.example/a')
+        response = self.client.get(reverse('aggregator:post_redirect', args=[post.pk]))
+        self.assertRedirects(response, 'https://blog.example/a', fetch_redirect_response=False)
+        self.assertEqual(ViewBucket.objects.get().post_id, post.pk)
+
+    def test_recent_views_outweigh_old_ones(self):
+        old, recent, external = self.my_post('Cũ'), self.my_post('Mới'), self.make_post(self.source, 'Ngoài')
+        self.views(10, hours_ago=24, my_post_id=old.pk)  # Two half-lives: worth 2.5
+        self.views(4, my_post_id=recent.pk)
+        self.views(6, post_id=external.pk)  # Half weight: 3
+        self.views(50, hours_ago=80, my_post_id=old.pk)  # Outside the window
+
+        entries = trending.compute_trending(now=self.now)
+        self.assertEqual(
+            [(entry.my_post_id or entry.post_id) for entry in entries], [recent.pk, external.pk, old.pk]
+        )
+        self.assertAlmostEqual(entries[2].score, 10 * 0.5 ** (24 / 12), delta=0.01)
+        self.assertEqual(entries[2].views, 10)
+        # Buckets older than the window are dropped
+        self.assertEqual(ViewBucket.objects.filter(bucket__lt=self.now - timedelta(hours=72)).count(), 0)
+
+    def test_hidden_posts_and_previous_runs_are_dropped(self):
+        draft = self.my_post('Nháp')
+        shown = self.my_post('Đăng')
+        self.views(5, my_post_id=draft.pk)
+        self.views(1, my_post_id=shown.pk)
+        trending.compute_trending(now=self.now)
+        self.assertEqual(TrendingEntry.objects.count(), 2)
+
+        MyPost.objects.filter(pk=draft.pk).update(is_published=False)
+        call_command('compute_trending', stdout=StringIO())
+        self.assertEqual([entry.my_post for entry in trending.get_trending()], [shown])
+
+
+class FeedTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.make_source()
+        self.post = self.make_post(self.source, 'Bài viết đầu tiên')
+        self.url = reverse('aggregator:feed', kwargs={'fmt': 'atom'})
+
+    def get(self, url=None, **headers):
+        response = self.client.get(url or self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_conditional_get(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Bài viết đầu tiên'.encode(), body)
+
+        response, _ = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_and_edited_posts_change_the_etag(self):
+        first, _ = self.get()
+        self.make_post(self.source, 'Bài viết thứ hai')
+        second, body = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertIn('Bài viết thứ hai'.encode(), body)
+
+        self.post.title = 'Tiêu đề đã sửa'
+        self.post.save()
+        third, body = self.get(HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertIn('Tiêu đề đã sửa'.encode(), body)
+
+    def test_cached_document_ignores_extra_query_parameters(self):
+        self.get(self.url + '?utm_source=evil')
+        response, body = self.get()
+        self.assertFalse(response.streaming)  # Served from the cache
+        self.assertNotIn(b'evil', body)
+        self.assertIn(b'<id>http://testserver/feeds/all.atom</id>', body)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'www.bloghub.example'])
+    def test_cached_documents_are_kept_per_scheme_and_host(self):
+        self.get()
+        _, body = self.get(HTTP_HOST='www.bloghub.example', secure=True)
+        self.assertIn(b'<id>https://www.bloghub.example/feeds/all.atom</id>', body)
+        _, body = self.get()
+        self.assertIn(b'<id>http://testserver/feeds/all.atom</id>', body)
+
+    def test_control_characters_are_dropped_from_xml(self):
+        self.make_post(self.source, 'Tiêu đề\x08 lỗi\x1b', excerpt='Trích\x00 dẫn\x0c')
+        for fmt in ('xml', 'atom'):
+            _, body = self.get(reverse('aggregator:feed', kwargs={'fmt': fmt}))
+            ET.fromstring(body)
+            self.assertIn('Tiêu đề lỗi'.encode(), body)
+
+
+@override_settings(SITEMAP_SHARD_SIZE=10, SITEMAP_BASE_URL='https://bloghub.example')
+class SitemapTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.temporary_directory()
+        self.enable_settings(SITEMAP_ROOT=self.root)
+        self.author = User.objects.create(username='writer')
+
+    def write(self, pk, **fields):
+        fields.setdefault('is_published', True)
+        return MyPost.objects.create(pk=pk, title=f'Bài {pk}', content='...', author=self.author, **fields)
+
+    def locations(self, name):
+        data = (self.root / name).read_bytes()
+        if name.endswith('.gz'):
+            data = gzip.decompress(data)
+        namespace = {'sitemap': sitemaps.XMLNS}
+        return [element.text for element in ET.fromstring(data).iterfind('.//sitemap:loc', namespace)]
+
+    def test_full_build_shards_posts_by_id(self):
+        for pk in (1, 5, 12):
+            self.write(pk)
+        self.write(13, is_published=False)
+        call_command('build_sitemaps', '--full', stdout=StringIO())
+
+        self.assertEqual(self.locations('sitemap.xml'), [
+            'https://bloghub.example/sitemap-pages-0.xml.gz',
+            'https://bloghub.example/sitemap-posts-0.xml.gz',
+            'https://bloghub.example/sitemap-posts-1.xml.gz',
+        ])
+        self.assertEqual(self.locations('sitemap-posts-1.xml.gz'), ['https://bloghub.example/post/bai-12/'])
+        self.assertIn('https://bloghub.example/categories/', self.locations('sitemap-pages-0.xml.gz'))
+
+    def test_saves_only_mark_their_shard(self):
+        self.write(1)
+        sitemaps.build(full=True)
+        self.assertFalse(SitemapShard.objects.filter(is_dirty=True).exists())
+
+        self.write(25)
+        Category.objects.create(name='Python', slug='python')
+        self.assertEqual(
+            set(SitemapShard.objects.filter(is_dirty=True).values_list('section', 'number')),
+            {(sitemaps.POSTS, 2), (sitemaps.PAGES, 0)},
+        )
+        self.assertFalse((self.root / 'sitemap-posts-2.xml.gz').exists())
+
+        self.assertEqual(sitemaps.build(), (2, 2))
+        self.assertIn('https://bloghub.example/category/python/', self.locations('sitemap-pages-0.xml.gz'))
+        self.assertEqual(len(self.locations('sitemap.xml')), 3)
+
+    def test_unchanged_shards_are_not_rewritten(self):
+        post = self.write(1)
+        sitemaps.build(full=True)
+        path = self.root / 'sitemap-posts-0.xml.gz'
+        before = path.stat().st_mtime_ns
+
+        post.views_count = 10
+        post.save()  # Not in the sitemap: same digest
+        self.assertEqual(sitemaps.build(), (1, 0))
+        self.assertEqual(path.stat().st_mtime_ns, before)
+
+        post.is_published = False
+        post.save()
+        self.assertEqual(sitemaps.build(), (1, 1))
+        self.assertFalse(path.exists())
+        self.assertNotIn('https://bloghub.example/sitemap-posts-0.xml.gz', self.locations('sitemap.xml'))
+
+    def test_files_are_served(self):
+        self.write(1)
+        sitemaps.build(full=True)
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/sitemap-posts-9.xml.gz').status_code, 404)
+
+
+@override_settings(ARCHIVE_AFTER_MONTHS=12)
+class ArchiveTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.make_source()
+
+    def test_old_posts_move_to_the_archive(self):
+        old = self.make_post(self.source, 'Bài cũ', days_ago=400, link='https://blog.example/old?utm_source=x')
+        new = self.make_post(self.source, 'Bài mới', days_ago=10)
+        kept = self.make_post(self.make_source('Forever', retention_months=0), 'Giữ mãi', days_ago=900)
+
+        out = StringIO()
+        call_command('archive_posts', '--dry-run', stdout=out)
+        self.assertIn('1 posts would be archived', out.getvalue())
+        call_command('archive_posts', stdout=StringIO())
+
+        self.assertEqual(set(Post.objects.all()), {new, kept})
+        archived = ArchivedPost.objects.get()
+        self.assertEqual((archived.pk, archived.title), (old.pk, 'Bài cũ'))
+        # Old links still redirect, and the crawler still knows them
+        response = self.client.get(reverse('aggregator:post_redirect', args=[old.pk]))
+        self.assertRedirects(response, old.link, fetch_redirect_response=False)
+        self.assertEqual(
+            archive.archived_hashes(['https://blog.example/old', 'https://blog.example/other']),
+            {archive.link_hash('https://blog.example/old')},
+        )
+
+    def test_copies_get_a_new_head(self):
+        other = self.make_source('Other')
+        head = self.make_post(self.source, 'Gốc', days_ago=400)
+        first = self.make_post(other, 'Bản sao 1', days_ago=5, duplicate_of=head)
+        second = self.make_post(other, 'Bản sao 2', days_ago=4, duplicate_of=head)
+
+        self.assertEqual(archive.archive_source(self.source, archive.retention_cutoff(self.source)), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNone(first.duplicate_of_id)
+        self.assertEqual(second.duplicate_of_id, first.pk)
+
+    def test_crawler_skips_archived_links(self):
+        self.make_post(self.source, 'Bài cũ', days_ago=400, link='https://blog.example/old')
+        archive.archive_source(self.source, archive.retention_cutoff(self.source))
+
+        feed = feedparser.parse(rss(
+            ('Bài cũ', 'https://blog.example/old?utm_medium=rss'), ('Mới', 'https://blog.example/new'),
+        ))
+        feed_crawler = FeedCrawler(classify=False, load_link_filter=False)
+        self.assertEqual(feed_crawler.ingest_feed(self.source, feed, 10), 1)
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ['Mới'])
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_membership_and_persistence(self):
+        link_filter = BloomFilter.for_capacity(1000, 1e-6)
+        links = [f'https://example.com/{number}/' for number in range(1000)]
+        for link in links:
+            link_filter.add(link)
+
+        self.assertTrue(all(link in link_filter for link in links))
+        self.assertFalse(any(f'https://other.example/{number}/' in link_filter for number in range(1000)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'filter.bin'
+            link_filter.save(path)
+            loaded = BloomFilter.load(path)
+        self.assertEqual(loaded.items, 1000)
+        self.assertIn(links[0], loaded)
+
+
+class FakeResponse(io.BytesIO):
+    """What urlopen returns, for download_feed"""
+
+    def __init__(self, body, headers=None, status=200):
+        super().__init__(body)
+        self.headers = headers or {}
+        self.status = status
+
+
+class CrawlStatsTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_settings(LINK_FILTER_PATH=self.temporary_directory() / 'links.bin')
+        self.up = self.make_source('Up')
+        self.down = self.make_source('Down')
+
+    def download(self, url, allow_local=False):
+        if url == self.down.rss_url:
+            raise FeedFetchError('HTTP 500', status=500)
+        feed = rss(('Một', 'https://up.example/1'), ('Hai', 'https://up.example/2'))
+        return feed, 200, 120, {}
+
+    def crawl(self):
+        with mock.patch.object(crawler, 'download_feed', side_effect=self.download), \
+                self.assertLogs('aggregator.crawler', 'ERROR'):
+            call_command('fetch_feeds', stdout=StringIO())
+
+    def test_run_history_and_source_health(self):
+        self.crawl()
+        run = CrawlRun.objects.get()
+        self.assertEqual((run.sources_count, run.new_posts, run.errors), (2, 2, 1))
+        self.assertIsNotNone(run.finished_at)
+
+        health = {row['blog_source__name']: row for row in crawlstats.source_health()}
+        self.assertEqual((health['Up']['fetches'], health['Up']['new_posts']), (1, 2))
+        self.assertEqual((health['Up']['last_status'], health['Up']['total_bytes']), (200, 120))
+        self.assertEqual((health['Down']['error_rate'], health['Down']['last_status']), (1.0, 500))
+        self.assertEqual(health['Down']['last_error'], 'Failed to fetch RSS: HTTP 500')
+
+    @override_settings(CRAWL_LOG_RETENTION_DAYS=30)
+    def test_old_runs_are_pruned(self):
+        self.crawl()
+        CrawlRun.objects.update(started_at=timezone.now() - timedelta(days=31))
+        self.crawl()
+        self.assertEqual(CrawlRun.objects.count(), 1)
+
+    def test_prometheus_endpoint(self):
+        self.crawl()
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('aggregator:metrics')).status_code, 404)
+        with override_settings(METRICS_ENABLED=True):
+            text = self.client.get(reverse('aggregator:metrics')).content.decode()
+        self.assertIn('bloghub_crawl_last_run_new_posts 2\n', text)
+        self.assertIn(f'bloghub_source_failures{{source_id="{self.down.pk}",source="Down"}} 1\n', text)
+        self.assertIn(f'bloghub_source_last_http_status{{source_id="{self.up.pk}",source="Up"}} 200\n', text)
+
+
+@override_settings(FEED_MAX_BYTES=1000)
+class DownloadFeedTests(SimpleTestCase):
+    def urlopen(self, body, **headers):
+        return mock.patch.object(crawler.urllib.request, 'urlopen', return_value=FakeResponse(body, headers))
+
+    def test_headers_for_feedparser(self):
+        content_type = 'application/rss+xml; charset=windows-1258'
+        with self.urlopen(b'<rss/>', **{'Content-Type': content_type, 'Content-Length': '6'}):
+            data, status, size, headers = download_feed('https://blog.example/feed')
+        self.assertEqual((data, status, size), (b'<rss/>', 200, 6))
+        self.assertEqual(headers, {
+            'content-type': content_type,
+            'content-location': 'https://blog.example/feed',
+        })
+
+    def test_size_is_capped_on_the_wire_and_after_gzip(self):
+        with self.urlopen(b'x' * 1001), self.assertRaises(FeedFetchError):
+            download_feed('https://blog.example/feed')
+        bomb = gzip.compress(b'\0' * 100000)
+        self.assertLess(len(bomb), 1000)
+        with self.urlopen(bomb, **{'Content-Encoding': 'gzip'}), self.assertRaises(FeedFetchError):
+            download_feed('https://blog.example/feed')
+        with self.urlopen(gzip.compress(b'<rss/>'), **{'Content-Encoding': 'gzip'}):
+            self.assertEqual(download_feed('https://blog.example/feed')[0], b'<rss/>')
+
+    def test_only_http_unless_local_files_are_allowed(self):
+        with tempfile.NamedTemporaryFile(suffix='.xml') as local:
+            local.write(b'<rss/>')
+            local.flush()
+            with self.assertRaises(FeedFetchError):
+                download_feed(local.name)
+            with self.assertRaises(FeedFetchError):
+                download_feed(f'file://{local.name}')
+            self.assertEqual(download_feed(local.name, allow_local=True)[0], b'<rss/>')
+
+
+class CrawlJobTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.make_source()
+        jobs.sync_jobs()
+
+    def test_one_job_per_active_source(self):
+        self.make_source('Paused', is_active=False)
+        jobs.sync_jobs()
+        self.assertEqual(list(FetchJob.objects.values_list('blog_source', flat=True)), [self.source.pk])
+
+    def test_a_leased_job_is_not_claimed_twice(self):
+        [job] = jobs.claim('worker-1')
+        self.assertEqual(job.blog_source, self.source)
+        self.assertEqual(jobs.claim('worker-2'), [])
+
+    def test_expired_lease_is_taken_over(self):
+        [job] = jobs.claim('worker-1')
+        FetchJob.objects.filter(pk=job.pk).update(lease_expires=timezone.now() - timedelta(seconds=1))
+
+        [taken] = jobs.claim('worker-2')
+        self.assertEqual(taken.leased_by, 'worker-2')
+        # The first worker lost its lease: it can neither renew nor reschedule
+        self.assertFalse(jobs.renew(job))
+        self.assertFalse(jobs.finish(job))
+        self.assertTrue(jobs.finish(taken))
+
+    @override_settings(CRAWL_INTERVAL_MINUTES=30, CRAWL_MAX_BACKOFF_MINUTES=60 * 24)
+    def test_errors_back_off_exponentially_up_to_the_cap(self):
+        for attempts, expected in ((0, timedelta(minutes=30)), (2, timedelta(minutes=120)), (40, timedelta(days=1))):
+            FetchJob.objects.update(attempts=attempts)
+            [job] = jobs.claim('worker-1')
+            before = timezone.now()
+            self.assertTrue(jobs.finish(job, error='HTTP 500'))
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, FetchJob.QUEUED)
+            self.assertEqual(job.attempts, attempts + 1)
+            self.assertAlmostEqual((job.run_after - before).total_seconds(), expected.total_seconds(), delta=5)
+            FetchJob.objects.update(run_after=timezone.now())
+
+    def test_success_resets_attempts(self):
+        FetchJob.objects.update(attempts=3, last_error='timeout')
+        [job] = jobs.claim('worker-1')
+        jobs.finish(job)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.last_error), (0, ''))
+
+
+class CrawlWorkerTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filter_path = self.temporary_directory() / 'links.bin'
+        self.enable_settings(LINK_FILTER_PATH=self.filter_path)
+        self.source = self.make_source()
+        self.feed = rss(('Django ORM', 'https://blog.example/orm'), ('Ghi chép', 'https://blog.example/notes'))
+
+    def run_worker(self, claim=jobs.claim):
+        with mock.patch.object(crawler, 'download_feed', return_value=(self.feed, 200, len(self.feed), {})), \
+                mock.patch.object(jobs, 'claim', side_effect=claim):
+            call_command('crawl_worker', '--once', '--run-all-now', stdout=StringIO())
+
+    def test_links_are_checked_in_the_database(self):
+        self.run_worker()
+        self.assertEqual(Post.objects.count(), 2)
+        # No filter is loaded or written by the long-lived worker
+        self.assertFalse(self.filter_path.exists())
+
+        Post.objects.filter(link='https://blog.example/notes').delete()
+        self.run_worker()
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_each_cycle_reloads_the_classifier(self):
+        real_claim = jobs.claim
+
+        def claim(*args, **kwargs):
+            # An editor adds a category while the worker is running
+            if not Category.objects.exists():
+                Category.objects.create(name='Python', keywords='django')
+            return real_claim(*args, **kwargs)
+
+        self.run_worker(claim)
+        self.assertEqual(Post.objects.get(link='https://blog.example/orm').category.name, 'Python')
+
+
+@override_settings(WEBSUB_ENABLED=True)
+class WebSubTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.subscription = WebSubSubscription.objects.create(
+            blog_source=self.make_source(),
+            hub_url='https://hub.example/',
+            topic_url='https://blog.example/feed/',
+            callback_token='token',
+            secret='secret',
+        )
+        self.callback = reverse('aggregator:websub_callback', args=['token'])
+        # The process-wide crawler caches categories
+        self.addCleanup(setattr, websub, '_crawler', None)
+
+    def intent(self, **params):
+        return {'hub.topic': self.subscription.topic_url, 'hub.challenge': 'c123', **params}
+
+    def test_subscribe_intent_activates_the_lease(self):
+        challenge = websub.verify_intent(self.subscription, self.intent(**{
+            'hub.mode': 'subscribe', 'hub.lease_seconds': '3600',
+        }))
+        self.assertEqual(challenge, 'c123')
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.state, WebSubSubscription.ACTIVE)
+        self.assertAlmostEqual(
+            (self.subscription.lease_expires - timezone.now()).total_seconds(), 3600, delta=5
+        )
+
+    def test_intent_for_another_topic_or_mode_is_refused(self):
+        self.assertIsNone(websub.verify_intent(self.subscription, self.intent(**{
+            'hub.mode': 'subscribe', 'hub.topic': 'https://evil.example/feed/',
+        })))
+        # Not unsubscribed here, so an unsubscribe intent is not ours
+        self.assertIsNone(websub.verify_intent(self.subscription, self.intent(**{'hub.mode': 'unsubscribe'})))
+
+    def test_callback_echoes_the_challenge(self):
+        response = self.client.get(self.callback, self.intent(**{'hub.mode': 'subscribe'}))
+        self.assertEqual(response.content, b'c123')
+
+    def test_signature(self):
+        body = b'<rss/>'
+        signature = hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+        self.assertTrue(websub.verify_signature(self.subscription, body, f'sha256={signature}'))
+        self.assertTrue(websub.verify_signature(self.subscription, body, f'SHA256={signature.upper()}'))
+        self.assertFalse(websub.verify_signature(self.subscription, body + b' ', f'sha256={signature}'))
+        self.assertFalse(websub.verify_signature(self.subscription, body, f'md5={signature}'))
+        self.assertFalse(websub.verify_signature(self.subscription, body, None))
+
+    def push(self, body, secret=b'secret'):
+        signature = hmac.new(secret, body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            self.callback, body, content_type='application/rss+xml', HTTP_X_HUB_SIGNATURE=f'sha256={signature}'
+        )
+
+    def test_signed_deliveries_are_ingested_once(self):
+        self.subscription.state = WebSubSubscription.ACTIVE
+        self.subscription.save()
+        body = rss(*((f'Bài {number}', f'https://blog.example/{number}') for number in range(30)))
+
+        self.assertEqual(self.push(body, secret=b'forged').status_code, 202)
+        self.assertEqual(Post.objects.count(), 0)
+        self.push(body)
+        self.push(body)
+        self.assertEqual(Post.objects.count(), 30)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.deliveries, 2)
+
+    def test_inactive_subscription_is_gone(self):
+        self.assertEqual(self.push(b'<rss/>').status_code, 410)
+
+
+@override_settings(TIME_ZONE='Asia/Ho_Chi_Minh')
+class EntryDateTests(SimpleTestCase):
+    def utc(self, *args):
+        return datetime(*args, tzinfo=dt_timezone.utc)
+
+    def test_named_and_numeric_zones(self):
+        parser = EntryDateParser()
+        cases = {
+            'Fri, 01 Mar 2024 10:00:00 GMT': self.utc(2024, 3, 1, 10),
+            'Fri, 01 Mar 2024 10:00:00 +0700': self.utc(2024, 3, 1, 3),
+            '2024-03-01T10:00:00Z': self.utc(2024, 3, 1, 10),
+            '2024-03-01T10:00:00.250+07:00': self.utc(2024, 3, 1, 3, 0, 0, 250000),
+        }
+        for value, expected in cases.items():
+            self.assertEqual(parser.parse_value(value), expected, value)
+
+    def test_dates_without_a_zone_are_local(self):
+        parser = EntryDateParser()
+        for value in ('2024-03-01 10:00:00', 'March 1, 2024 10:00 AM', 'Fri, 01 Mar 2024 10:00:00'):
+            self.assertEqual(parser.parse_value(value), self.utc(2024, 3, 1, 3), value)
+        # "PM" is not a zone abbreviation
+        self.assertEqual(parser.parse_value('01/03/2024 3:15 PM'), self.utc(2024, 1, 3, 8, 15))
+
+    def test_feedparser_tuple_only_for_zoned_strings(self):
+        parser = EntryDateParser()
+        entry = feedparser.parse(
+            '<rss version="2.0"><channel>'
+            '<item><pubDate>Fri, 01 Mar 2024 10:00:00 +0700</pubDate></item>'
+            '<item><pubDate>Fri, 01 Mar 2024 10:00:00</pubDate></item>'
+            '</channel></rss>'
+        ).entries
+        self.assertEqual(parser.parse(entry[0]), self.utc(2024, 3, 1, 3))
+        self.assertEqual(parser.counts['struct'], 1)
+        # feedparser would read this one as UTC
+        self.assertEqual(parser.parse(entry[1]), self.utc(2024, 3, 1, 3))
+        self.assertEqual(parser.counts['struct'], 1)
+
+    def test_format_that_worked_is_tried_first(self):
+        parser = EntryDateParser()
+        parser.parse_value('March 1, 2024 10:00 AM', key=1)
+        self.assertEqual(parser.formats[1], 'dateutil')
+        with mock.patch.dict('aggregator.dates.STRING_PARSERS', rfc822=mock.Mock(side_effect=ValueError)):
+            parser.parse_value('March 2, 2024 10:00 AM', key=1)
+            dates.STRING_PARSERS['rfc822'].assert_not_called()
+
+    def test_entries_without_a_date_get_now(self):
+        parser = EntryDateParser()
+        before = timezone.now()
+        self.assertGreaterEqual(parser.parse({'published': 'not a date'}), before)
+        self.assertEqual(parser.counts['missing'], 1)
+
+
+class OPMLTests(AggregatorTestCase):
+    def test_export_then_import_round_trip(self):
+        self.make_source(
+            'Blog Một', rss_url='https://mot.example/feed/', homepage_url='https://mot.example/',
+            description='Mô tả', language='en', tags='python, web',
+        )
+        self.make_source('Blog Hai', rss_url='https://hai.example/rss.xml')
+        document = opml.export_opml(BlogSource.objects.order_by('name'))
+        exported = list(BlogSource.objects.order_by('name').values_list(
+            'name', 'rss_url', 'homepage_url', 'description', 'language', 'tags',
+        ))
+
+        BlogSource.objects.all().delete()
+        result = opml.import_outlines(opml.parse_opml(document))
+        self.assertEqual(len(result.created), 2)
+        self.assertEqual(list(BlogSource.objects.order_by('name').values_list(
+            'name', 'rss_url', 'homepage_url', 'description', 'language', 'tags',
+        )), exported)
+
+        again = opml.import_outlines(opml.parse_opml(document))
+        self.assertEqual((again.created, len(again.duplicates)), ([], 2))
+
+    def test_invalid_documents_and_urls(self):
+        with self.assertRaises(opml.OPMLError):
+            opml.parse_opml(b'<html/>')
+        outlines = opml.parse_opml(
+            b'<opml version="2.0"><body><outline text="Folder">'
+            b'<outline text="Bad" xmlUrl="ftp://bad.example/feed"/>'
+            b'<outline text="Good" xmlUrl="https://good.example/feed"/>'
+            b'</outline></body></opml>'
+        )
+        result = opml.import_outlines(outlines)
+        self.assertEqual([source.name for source in result.created], ['Good'])
+        self.assertEqual(result.created[0].tags, 'Folder')
+        self.assertEqual([url for url, _ in result.invalid], ['ftp://bad.example/feed'])
+
+    def test_first_fetch_fills_metadata_and_posts(self):
+        self.enable_settings(LINK_FILTER_PATH=self.temporary_directory() / 'links.bin')
+        [source] = opml.import_outlines(opml.parse_opml(
+            b'<opml version="2.0"><body><outline xmlUrl="https://new.example/feed"/></body></opml>'
+        )).created
+        feed = (
+            '<rss version="2.0"><channel><title>Blog Mới</title><link>https://new.example/</link>'
+            '<description>Viết về Python</description><language>vi-VN</language>'
+            '<item><title>Bài một</title><link>https://new.example/1</link></item>'
+            '</channel></rss>'
+        ).encode()
+        with mock.patch.object(crawler, 'download_feed', return_value=(feed, 200, len(feed), {})):
+            run = opml.first_fetch([source], classify=False)
+
+        source.refresh_from_db()
+        self.assertEqual(
+            (source.name, source.homepage_url, source.description, source.language),
+            ('Blog Mới', 'https://new.example/', 'Viết về Python', 'vi'),
+        )
+        self.assertEqual(run.new_posts, 1)
+        self.assertIsNotNone(source.last_fetched)
+
+
+class AdminTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.sources = [self.make_source(f'Blog {number}') for number in range(3)]
+        jobs.sync_jobs()
+
+    def run_action(self, model, action, objects):
+        return self.client.post(reverse(f'admin:aggregator_{model}_changelist'), {
+            'action': action, '_selected_action': [obj.pk for obj in objects],
+        })
+
+    def test_deactivate_and_activate_sources(self):
+        paused = self.sources[:2]
+        self.assertEqual(directory.get_directory()['total_sources'], 3)
+        response = self.run_action('blogsource', 'deactivate', paused)
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(BlogSource.objects.filter(is_active=False).count(), 2)
+        # update() skips the signals: caches and jobs are refreshed by the action
+        self.assertEqual(directory.get_directory()['total_sources'], 1)
+        self.assertEqual(list(FetchJob.objects.values_list('blog_source', flat=True)), [self.sources[2].pk])
+
+        self.run_action('blogsource', 'activate', paused)
+        self.assertEqual(FetchJob.objects.count(), 3)
+
+    def test_refetch_and_export(self):
+        FetchJob.objects.update(run_after=timezone.now() + timedelta(hours=1))
+        self.run_action('blogsource', 'refetch', self.sources[:1])
+        self.assertEqual(len(jobs.claim('admin-test', 5)), 1)
+
+        response = self.run_action('blogsource', 'export_opml', self.sources)
+        self.assertEqual(response['Content-Type'], 'text/x-opml; charset=utf-8')
+        self.assertEqual(len(opml.parse_opml(response.content)), 3)
+
+    def test_recategorize_keeps_editor_choices(self):
+        python = Category.objects.create(name='Python', keywords='django')
+        other = Category.objects.create(name='Khác')
+        crawled = self.make_post(self.sources[0], 'Học Django')
+        edited = self.make_post(self.sources[0], 'Django admin', category=other)
+        self.run_action('post', 'recategorize', [crawled, edited])
+        crawled.refresh_from_db()
+        edited.refresh_from_db()
+        self.assertEqual((crawled.category, edited.category), (python, other))
+
+    def test_unfiltered_counts_use_the_planner_estimate(self):
+        for number in range(5):
+            self.make_post(self.sources[0], f'Bài {number}')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for number in range(2):
+            self.make_post(self.sources[1], f'Bài mới {number}')
+        self.assertEqual(estimated_count(Post), 5)
+
+        with override_settings(ADMIN_ESTIMATED_COUNT_MIN=5):
+            self.assertEqual(EstimatedCountPaginator(Post.objects.all(), 20).count, 5)
+            filtered = Post.objects.filter(blog_source=self.sources[1])
+            self.assertEqual(EstimatedCountPaginator(filtered, 20).count, 2)
+        with override_settings(ADMIN_ESTIMATED_COUNT_MIN=50000):
+            self.assertEqual(EstimatedCountPaginator(Post.objects.all(), 20).count, 7)
+
+
+class RepairTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_settings(REPAIR_CHECKPOINT_PATH=self.temporary_directory() / 'repair.json')
+        self.source = self.make_source()
+
+    def test_repair_is_applied_once(self):
+        messy = self.make_post(
+            self.source, '  Tiêu   đề\n thừa khoảng trắng ',
+            excerpt='<p>Đoạn <b>trích</b></p>',
+            link='https://Blog.example:443/bai-viet?utm_source=rss#top',
+        )
+        Post.objects.filter(pk=messy.pk).update(published_date=timezone.now() + timedelta(days=30))
+
+        call_command('repair_posts', stdout=StringIO())
+        messy.refresh_from_db()
+        repaired_at = messy.updated_at
+        call_command('repair_posts', stdout=StringIO())
+
+        self.assertEqual(messy.title, 'Tiêu đề thừa khoảng trắng')
+        self.assertEqual(messy.excerpt, 'Đoạn trích')
+        self.assertEqual(messy.link, 'https://blog.example/bai-viet')
+        self.assertLessEqual(messy.published_date, timezone.now())
+        self.assertEqual(messy.title_folded, 'tieu de thua khoang trang')
+        messy.refresh_from_db()
+        self.assertEqual(messy.updated_at, repaired_at)
+
+    def test_each_post_writes_only_its_own_fixes(self):
+        for number in range(50):
+            self.make_post(self.source, f'Bài {number}', link=f'https://blog.example/{number}')
+        future = list(Post.objects.order_by('id').values_list('id', flat=True))[::2]
+        Post.objects.filter(id__in=future).update(published_date=timezone.now() + timedelta(days=30))
+        Post.objects.filter(id=future[1]).update(title='  Bài   lỗi ')
+        untouched = Post.objects.get(id=future[2])
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('repair_posts', '--chunk-size', '50', stdout=StringIO())
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        # One statement for the date fixes, one for the post that also got a title fix
+        self.assertEqual(len(updates), 2)
+        self.assertLess(len(queries), 10)
+
+        fixed = Post.objects.get(id=future[1])
+        self.assertEqual((fixed.title, fixed.title_folded), ('Bài lỗi', 'bai loi'))
+        dated = Post.objects.get(id=future[2])
+        self.assertLessEqual(dated.published_date, timezone.now())
+        self.assertEqual((dated.title_folded, dated.simhash), (untouched.title_folded, untouched.simhash))
+
+
+class StaticFilesTests(AggregatorTestCase):
+    def test_minify_css_keeps_strings_and_licences(self):
+        css = '/*! MIT */\n/* note */\n.a > .b {\n  content: "  x  ";\n  margin: 0 auto;\n}\n'
+        self.assertEqual(minify_css(css), '/*! MIT */ .a>.b{content:"  x  ";margin:0 auto}')
+
+    def test_minify_js_leaves_template_literals_alone(self):
+        self.assertEqual(minify_js('  // comment\n\n  const a = 1;\n    call(a);\n'), 'const a = 1;\ncall(a);\n')
+        literal = 'const html = `\n  <p>x</p>\n`;\n'
+        self.assertEqual(minify_js(literal), literal)
+
+    def test_choose_smallest_accepted_variant(self):
+        path = self.temporary_directory() / 'app.js'
+        path.write_bytes(b'x' * 500)
+        path.with_name('app.js.gz').write_bytes(b'gz')
+        path.with_name('app.js.br').write_bytes(b'br')
+        static_file = StaticFile(path, immutable=True)
+
+        self.assertEqual(static_file.choose('gzip, deflate, br'), ('br', path.with_name('app.js.br')))
+        self.assertEqual(static_file.choose('br;q=0, gzip'), ('gzip', path.with_name('app.js.gz')))
+        self.assertEqual(static_file.choose('identity'), (None, path))
+        self.assertEqual(static_file.choose('*'), ('br', path.with_name('app.js.br')))
+
+    def test_pages_render_before_collectstatic(self):
+        self.enable_settings(STATIC_ROOT=self.temporary_directory())
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/css/style.css')
+
+    def test_collected_files_are_hashed_compressed_and_served(self):
+        self.enable_settings(STATIC_ROOT=self.temporary_directory())
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin', 'rest_framework'])
+        response = self.client.get('/')
+        hashed = next(
+            part.split('"')[0] for part in response.content.decode().split('href="/static/')[1:]
+            if part.startswith('css/style.')
+        )
+        self.assertNotEqual(hashed, 'css/style.css')
+
+        served = self.client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip')
+        body = b''.join(served.streaming_content)
+        self.assertEqual(served['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', served['Cache-Control'])
+        self.assertEqual(gzip.decompress(body).decode(), minify_css((Path('static') / 'css/style.css').read_text()))
+        self.assertEqual(self.client.get(f'/static/{hashed}', HTTP_IF_NONE_MATCH=served['ETag']).status_code, 304)
+
+
+class MergedPostsTests(AggregatorTestCase):
+    def test_pages_interleave_both_kinds_newest_first(self):
+        source = self.make_source()
+        author = User.objects.create(username='writer')
+        for days_ago in range(0, 10, 2):
+            self.make_post(source, f'Post {days_ago}', days_ago=days_ago)
+        for days_ago in range(1, 9, 2):
+            MyPost.objects.create(
+                title=f'Mine {days_ago}', content='...', author=author, is_published=True,
+                published_date=timezone.now() - timedelta(days=days_ago),
+            )
+
+        posts = listing.MergedPosts()
+        posts.add('external', Post.objects.all())
+        posts.add('my', MyPost.objects.all(), 'published_date', 'created_at')
+        paginator = Paginator(posts, 4)
+
+        self.assertEqual(paginator.count, 9)
+        self.assertEqual(paginator.num_pages, 3)
+        titles = [
+            item['object'].title
+            for number in paginator.page_range for item in paginator.page(number).object_list
+        ]
+        self.assertEqual(titles, [
+            'Post 0', 'Mine 1', 'Post 2', 'Mine 3', 'Post 4', 'Mine 5', 'Post 6', 'Mine 7', 'Post 8',
+        ])
+
+    def test_scroll_page_past_the_end_is_empty(self):
+        source = self.make_source()
+        for days_ago in range(3):
+            self.make_post(source, f'Post {days_ago}', days_ago=days_ago)
+        paginator = listing.ScrollPaginator(Post.objects.order_by('-published_date'), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual([post.title for post in paginator.get_page(2)], ['Post 2'])
+        self.assertEqual(list(paginator.get_page(5)), [])
+        self.assertEqual(paginator.get_page('x').number, 1)
+
+
+class CompressionTests(AggregatorTestCase):
+    def test_choose_encoding_follows_q_values(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, deflate'), None)
+        self.assertEqual(choose_encoding('identity'), None)
+        self.assertEqual(choose_encoding('*'), 'br' if compression.brotli else 'gzip')
+
+    def test_streamed_listing_is_compressed_whole(self):
+        source = self.make_source()
+        for number in range(25):
+            self.make_post(source, f'Bài số {number}')
+        url = reverse('aggregator:all_posts')
+
+        plain = self.client.get(url)
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(plain.streaming)
+        html = b''.join(plain.streaming_content).decode()
+        self.assertIn('Bài số 24', html)
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(compressed.streaming_content)).decode(), html)
+
+
+class CardTemplateTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        fragments._card_engines.clear()
+        self.addCleanup(fragments._card_engines.clear)
+        category = Category.objects.create(name='Lập trình', slug='lap-trinh', color='#ff0000')
+        self.source = self.make_source(
+            'Nguồn <A>', description='Blog về "Python" & Django', tags='python, web',
+            homepage_url='https://nguon-a.example/', logo_url='https://nguon-a.example/logo.png',
+        )
+        self.post = self.make_post(
+            self.source, 'Bài <b>1</b> & "trích dẫn"', category=category,
+            excerpt='Đoạn trích ' * 40, thumbnail_url='https://nguon-a.example/a.png', thumbnail_hash='ab' * 20,
+        )
+        self.my_post = MyPost.objects.create(
+            title='Bài của tôi', content='Nội dung ' * 80, is_published=True,
+            author=User.objects.create(username='writer'),
+        )
+
+    def render(self, engine, template_name, **context):
+        fragments._card_engines.clear()
+        with self.settings(CARD_TEMPLATE_ENGINE=engine):
+            rendered = fragments.get_card_template(template_name).render(context)
+        self.assertNotIn('<b>', rendered)
+        # Jinja2 escapes quotes as &#34; where Django writes &quot;
+        return unescape(re.sub(r'\s+', ' ', re.sub(r'>\s+<', '><', rendered)).strip())
+
+    def test_django_templates_use_the_cached_loader(self):
+        loaders = engines['django'].engine.template_loaders
+        self.assertIsInstance(loaders[0], CachedLoader)
+
+    def test_jinja2_cards_match_the_django_ones(self):
+        cards = [
+            ('aggregator/partials/post_card.html', {'post': self.post}),
+            ('aggregator/partials/my_post_card.html', {'post': self.my_post}),
+            ('aggregator/partials/source_card.html', {'source': self.source}),
+        ]
+        for template_name, context in cards:
+            with self.subTest(template_name):
+                self.assertEqual(
+                    self.render('jinja2', template_name, **context),
+                    self.render('django', template_name, **context),
+                )
+
+    def test_templates_without_a_jinja2_copy_fall_back_to_django(self):
+        with self.settings(CARD_TEMPLATE_ENGINE='jinja2'):
+            template = fragments.get_card_template('aggregator/partials/post_list.html')
+        self.assertEqual(fragments._card_engines['aggregator/partials/post_list.html'], 'django')
+        self.assertIs(template.backend, engines['django'])
+
+
+class TokenBucketTests(AggregatorTestCase):
+    def test_refill(self):
+        key = 'throttle:test:client'
+        self.assertIsNone(throttling.take(key, 2, 1.0, now=100.0))
+        self.assertIsNone(throttling.take(key, 2, 1.0, now=100.0))
+        self.assertAlmostEqual(throttling.take(key, 2, 1.0, now=100.0), 1.0)
+        # Half a second refills half a token: still empty
+        self.assertAlmostEqual(throttling.take(key, 2, 1.0, now=100.5), 0.5)
+        self.assertIsNone(throttling.take(key, 2, 1.0, now=101.0))
+
+    def test_idle_time_does_not_pile_up_credit(self):
+        key = 'throttle:test:idle'
+        self.assertIsNone(throttling.take(key, 2, 1.0, now=100.0))
+        results = [throttling.take(key, 2, 1.0, now=1000.0) for _ in range(3)]
+        self.assertEqual(results[:2], [None, None])
+        self.assertIsNotNone(results[2])
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate('60/min'), (60, 1.0))
+        self.assertEqual(throttling.parse_rate('10/s'), (10, 10.0))
+
+    def test_buckets_and_stats_are_shared_between_processes(self):
+        key = 'throttle:test:shared'
+        self.assertIsNone(throttling.take(key, 1, 1.0, now=100.0))
+        throttling.record('posts', 'allowed')
+        throttling.record('posts', 'throttled')
+        throttling.record('posts', 'allowed')
+        # Another web process has its own 'default' cache but the same 'shared' one
+        caches['default'].clear()
+
+        self.assertIsNotNone(throttling.take(key, 1, 1.0, now=100.0))
+        self.assertEqual(throttling.stats(), {'posts': {'allowed': 2, 'throttled': 1}})
+        self.assertEqual(caches['shared'].get(f'{key}:start'), 100.0)
+
+
+class SuggestionTests(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.make_source('Nguồn')
+        # Alphabetically first words on the oldest posts
+        for number in range(80):
+            self.make_post(self.source, f'aba{word(number)} story', days_ago=80 - number)
+
+    def lookup(self, query, index=None, **kwargs):
+        index = index or SuggestionIndex.build()
+        return [(entry['type'], entry['label']) for entry in index.lookup(query, **kwargs)]
+
+    @override_settings(SUGGEST_SCAN_LIMIT=5, SUGGEST_LIMIT=4)
+    def test_names_first_then_newest_posts(self):
+        Category.objects.create(name='Abz', slug='abz')
+        self.assertEqual(self.lookup('ab'), [
+            ('category', 'Abz'),
+            ('post', f'aba{word(79)} story'),
+            ('post', f'aba{word(78)} story'),
+            ('post', f'aba{word(77)} story'),
+        ])
+
+    @override_settings(SUGGEST_SCAN_LIMIT=5)
+    def test_every_word_must_match(self):
+        self.make_post(self.source, 'Abacus in Python', days_ago=100)
+        self.assertEqual(self.lookup('py ab'), [('post', 'Abacus in Python')])
+
+    def test_kinds_filter_and_accents(self):
+        MyPost.objects.create(
+            title='Ăn sáng ở Hà Nội', content='...', is_published=True,
+            author=User.objects.create(username='writer'),
+        )
+        self.assertEqual(self.lookup('an sang'), [('my_post', 'Ăn sáng ở Hà Nội')])
+        self.assertEqual(self.lookup('an sang', kinds={'post'}), [])
+
+    def test_refresh_adds_new_rows_without_querying_on_lookup(self):
+        index = SuggestionIndex.build()
+        self.make_post(self.source, 'Zebra crossing')
+        self.make_source('Zeta Blog')
+        index.refresh()
+
+        with self.assertNumQueries(0):
+            found = self.lookup('ze', index)
+        self.assertEqual(found, [('source', 'Zeta Blog'), ('post', 'Zebra crossing')])
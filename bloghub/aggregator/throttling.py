@@ -0,0 +1,167 @@
+"""
+Token bucket throttles for the REST API.
+
+A bucket holds up to N tokens and refills at N per period, from the DRF
+style rates in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] ('60/min'). Its state
+is two keys in the 'shared' cache, so every web process draws from the same
+bucket: when it started filling and how many tokens were taken. A request
+takes its token with one cache.incr and gives it back with decr when
+refused; incr is atomic on Redis or Memcached, so concurrent requests never
+share the last token there, while the file-based default can let a few
+racing requests through. When
+a bucket is found full its start moves forward instead of letting credit
+pile up; keys idle for THROTTLE_KEY_TIMEOUT expire, which only ever
+restarts a bucket full.
+
+EndpointThrottle limits every API view by its throttle_scope; SearchThrottle
+and DeepPageThrottle add a shared, stricter bucket for the requests that
+cost a LIKE scan or a large OFFSET. SuggestThrottle replaces them on the
+suggestion endpoint, which never queries the database. Allowed/throttled
+counts per scope are kept in the same cache for the Prometheus endpoint.
+
+Anonymous clients are told apart by get_ident(): the address NUM_PROXIES
+hops back in X-Forwarded-For, so it has to match the deployment.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+STATS_KEY = 'throttle_stats:{scope}:{result}'
+STATS_SCOPES_KEY = 'throttle_stats:scopes'
+RESULTS = ('allowed', 'throttled')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """(capacity, tokens per second) of a rate like '60/min'"""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def _incr(key, delta=1):
+    shared = caches['shared']
+    try:
+        return shared.incr(key, delta)
+    except ValueError:
+        if shared.add(key, delta, settings.THROTTLE_KEY_TIMEOUT):
+            return delta
+        return shared.incr(key, delta)
+
+
+def take(key, capacity, rate, now=None):
+    """Take a token from the bucket at key; seconds to wait when it is empty, else None"""
+    now = time.time() if now is None else now
+    shared = caches['shared']
+    start_key, taken_key = f'{key}:start', f'{key}:taken'
+    start = shared.get(start_key)
+    if start is None:
+        shared.add(start_key, now, settings.THROTTLE_KEY_TIMEOUT)
+        start = shared.get(start_key, now)
+    taken = _incr(taken_key)
+    allowance = capacity + rate * (now - start)
+    if taken > allowance:
+        try:
+            shared.decr(taken_key)
+        except ValueError:
+            pass
+        return (taken - allowance) / rate
+    if allowance - (taken - 1) > capacity:
+        # Full bucket: refill from here on, the idle time earns nothing more
+        shared.set(start_key, now - (taken - 1) / rate, settings.THROTTLE_KEY_TIMEOUT)
+    return None
+
+
+def record(scope, result):
+    if _incr(STATS_KEY.format(scope=scope, result=result)) == 1:
+        shared = caches['shared']
+        scopes = shared.get(STATS_SCOPES_KEY, set())
+        shared.set(STATS_SCOPES_KEY, scopes | {scope}, None)
+
+
+def stats():
+    """{scope: {'allowed': n, 'throttled': n}} since the cache was last cleared"""
+    shared = caches['shared']
+    keys = {
+        (scope, result): STATS_KEY.format(scope=scope, result=result)
+        for scope in shared.get(STATS_SCOPES_KEY, set()) for result in RESULTS
+    }
+    values = shared.get_many(keys.values())
+    counts = {}
+    for (scope, result), key in sorted(keys.items()):
+        counts.setdefault(scope, {})[result] = values.get(key, 0)
+    return counts
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle with one token bucket per scope and client"""
+
+    default_scope = 'api'
+
+    def get_scope(self, request, view):
+        """Bucket scope for the request, or None to leave it alone"""
+        return self.default_scope
+
+    def get_rate(self, scope):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        rate = rates.get(scope) or rates.get(self.default_scope)
+        return parse_rate(rate) if rate else None
+
+    def get_client(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = self.get_scope(request, view)
+        rate = scope and self.get_rate(scope)
+        if not rate:
+            return True
+        self.wait_seconds = take(f'throttle:{scope}:{self.get_client(request)}', *rate)
+        allowed = self.wait_seconds is None
+        record(scope, RESULTS[not allowed])
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class EndpointThrottle(TokenBucketThrottle):
+    """Every API request, in a bucket per endpoint (the view's throttle_scope)"""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None) or self.default_scope
+
+
+class SearchThrottle(TokenBucketThrottle):
+    """Requests with a search term, in one bucket across endpoints"""
+
+    default_scope = 'search'
+
+    def get_scope(self, request, view):
+        if request.query_params.get(api_settings.SEARCH_PARAM, '').strip():
+            return self.default_scope
+        return None
+
+
+class SuggestThrottle(TokenBucketThrottle):
+    """Search-as-you-type lookups: a request per keystroke, so a larger bucket of their own"""
+
+    default_scope = 'suggest'
+
+
+class DeepPageThrottle(TokenBucketThrottle):
+    """Requests past page THROTTLE_DEEP_PAGE, in one bucket across endpoints"""
+
+    default_scope = 'deep_page'
+
+    def get_scope(self, request, view):
+        try:
+            page = int(request.query_params.get('page', 1))
+        except ValueError:
+            return None
+        return self.default_scope if page > settings.THROTTLE_DEEP_PAGE else None
@@ -0,0 +1,128 @@
+"""
+Thumbnail pipeline: download the origin image once, store resized WebP/JPEG
+variants on disk under content-hash names and serve them locally.
+"""
+import hashlib
+import io
+import logging
+import urllib.request
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Stored in thumbnail_hash when the origin image cannot be fetched or decoded,
+# so background jobs do not retry the same broken URL on every run.
+FAILED = '-'
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+USER_AGENT = 'BlogHub thumbnail fetcher (+https://bloghub.local)'
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+class HTTPOnlyRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """urllib also follows redirects to ftp://; only http(s) is fetched here"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlsplit(newurl).scheme not in ('http', 'https'):
+            raise ThumbnailError(f'Unsupported redirect to {newurl}')
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+opener = urllib.request.build_opener(HTTPOnlyRedirectHandler)
+
+
+def variant_name(digest, width, ext):
+    return f'{digest}-{width}.{ext}'
+
+
+def variant_path(name):
+    return settings.THUMBNAIL_ROOT / name[:2] / name
+
+
+def variant_url(digest, width, ext='jpg'):
+    return reverse('aggregator:thumbnail', kwargs={'name': variant_name(digest, width, ext)})
+
+
+def has_variants(obj):
+    return bool(obj.thumbnail_hash) and obj.thumbnail_hash != FAILED
+
+
+def download_image(url):
+    """Download an image, refusing anything larger than THUMBNAIL_MAX_BYTES"""
+    # Feed data picks the URL: no file:// or other local schemes
+    if urlsplit(url).scheme not in ('http', 'https'):
+        raise ThumbnailError(f'Unsupported image URL: {url}')
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    max_bytes = settings.THUMBNAIL_MAX_BYTES
+    try:
+        with opener.open(request, timeout=settings.THUMBNAIL_TIMEOUT) as response:
+            data = response.read(max_bytes + 1)
+    except Exception as e:
+        raise ThumbnailError(f'Could not download {url}: {e}')
+
+    if len(data) > max_bytes:
+        raise ThumbnailError(f'Image too large: {url}')
+    return data
+
+
+def build_variants(data):
+    """Resize image bytes into every configured width/format, return the content hash"""
+    digest = hashlib.sha1(data).hexdigest()
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ThumbnailError(f'Invalid image: {e}')
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    for width in settings.THUMBNAIL_WIDTHS:
+        resized = image
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+
+        for ext, (pil_format, _) in FORMATS.items():
+            path = variant_path(variant_name(digest, width, ext))
+            if path.exists():
+                # Same content already processed (e.g. syndicated image)
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            out = resized
+            if pil_format == 'JPEG' and out.mode != 'RGB':
+                out = out.convert('RGB')
+
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            out.save(tmp_path, pil_format, quality=settings.THUMBNAIL_QUALITY)
+            tmp_path.replace(path)
+
+    return digest
+
+
+def process_thumbnail(obj):
+    """Fill obj.thumbnail_hash from obj.thumbnail_url, return True on success"""
+    if not obj.thumbnail_url:
+        return False
+
+    try:
+        obj.thumbnail_hash = build_variants(download_image(obj.thumbnail_url))
+    except ThumbnailError as e:
+        logger.warning(str(e))
+        obj.thumbnail_hash = FAILED
+
+    obj.save(update_fields=['thumbnail_hash', 'updated_at'])
+    return obj.thumbnail_hash != FAILED
@@ -0,0 +1,84 @@
+"""
+Trending posts for the homepage.
+
+Views of a MyPost and click-throughs on an external Post are counted in
+hourly ViewBucket rows (one UPDATE per hit). compute_trending scores every
+item seen inside the window with an exponential decay on the bucket age and
+stores the top N as TrendingEntry rows, so the homepage reads N rows by rank.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import TrendingEntry, ViewBucket
+
+
+def current_bucket(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_view(my_post_id=None, post_id=None, now=None):
+    """Count one view in the current hourly bucket"""
+    lookup = {'my_post_id': my_post_id} if my_post_id else {'post_id': post_id}
+    bucket = current_bucket(now)
+    if ViewBucket.objects.filter(bucket=bucket, **lookup).update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ViewBucket.objects.create(bucket=bucket, count=1, **lookup)
+    except IntegrityError:
+        # Another request created the bucket first
+        ViewBucket.objects.filter(bucket=bucket, **lookup).update(count=F('count') + 1)
+
+
+def decay(age_hours):
+    return 0.5 ** (max(age_hours, 0.0) / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def compute_trending(now=None):
+    """Rebuild TrendingEntry from the buckets inside the window; returns the entries"""
+    now = now or timezone.now()
+    cutoff = current_bucket(now) - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    ViewBucket.objects.filter(bucket__lt=cutoff).delete()
+
+    scores = defaultdict(float)
+    views = defaultdict(int)
+    buckets = ViewBucket.objects.filter(bucket__gte=cutoff).filter(
+        Q(my_post__is_published=True) |
+        Q(post__blog_source__is_active=True, post__duplicate_of__isnull=True)
+    ).values_list('my_post_id', 'post_id', 'bucket', 'count')
+    for my_post_id, post_id, bucket, count in buckets.iterator(chunk_size=2000):
+        weight = 1.0 if my_post_id else settings.TRENDING_EXTERNAL_WEIGHT
+        # Age from the middle of the hour
+        age_hours = (now - bucket).total_seconds() / 3600 - 0.5
+        key = (my_post_id, post_id)
+        scores[key] += count * weight * decay(age_hours)
+        views[key] += count
+
+    top = heapq.nlargest(settings.TRENDING_COUNT, scores.items(), key=lambda item: item[1])
+    entries = [
+        TrendingEntry(
+            my_post_id=my_post_id,
+            post_id=post_id,
+            score=score,
+            views=views[(my_post_id, post_id)],
+            rank=rank,
+            computed_at=now,
+        )
+        for rank, ((my_post_id, post_id), score) in enumerate(top)
+    ]
+    with transaction.atomic():
+        TrendingEntry.objects.all().delete()
+        TrendingEntry.objects.bulk_create(entries)
+    return entries
+
+
+def get_trending():
+    return list(TrendingEntry.objects.select_related(
+        'my_post', 'post__blog_source'
+    ).order_by('rank')[:settings.TRENDING_COUNT])
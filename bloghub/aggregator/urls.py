@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -20,8 +20,17 @@ urlpatterns = [
     path('categories/', views.categories_list, name='categories'),
     path('category/<slug:slug>/', views.category_detail, name='category_detail'),
     path('post/<slug:slug>/', views.my_post_detail, name='my_post_detail'),
+    path('go/<int:pk>/', views.post_redirect, name='post_redirect'),
+    re_path(r'^feeds/all\.(?P<fmt>xml|atom|json)$', views.feed, {'kind': 'all'}, name='feed'),
+    re_path(r'^feeds/category/(?P<key>[-\w]+)\.(?P<fmt>xml|atom|json)$', views.feed, {'kind': 'category'}, name='category_feed'),
+    re_path(r'^feeds/source/(?P<key>\d+)\.(?P<fmt>xml|atom|json)$', views.feed, {'kind': 'source'}, name='source_feed'),
+    re_path(r'^(?P<name>sitemap(?:-[a-z]+-\d+\.xml\.gz|\.xml))$', views.sitemap_file, name='sitemap_file'),
+    path('metrics', views.metrics, name='metrics'),
+    path('websub/<str:token>/', views.websub_callback, name='websub_callback'),
+    re_path(r'^thumbs/(?P<name>[0-9a-f]{40}-\d+\.(?:webp|jpg))$', views.thumbnail, name='thumbnail'),
     
     # API endpoints
     path('api/', include(router.urls)),
     path('api/stats/', views.stats_api, name='stats_api'),
+    path('api/suggest/', views.suggest_api, name='suggest_api'),
 ]
\ No newline at end of file
@@ -1,14 +1,22 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
 from django.db.models import Q, Count, F
-from django.utils import timezone
-from datetime import timedelta
 from rest_framework import viewsets, filters
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
-from .models import BlogSource, Post, Category, MyPost
+from .models import ArchivedPost, BlogSource, Post, Category, MyPost, RelatedPost, WebSubSubscription
 from .serializers import BlogSourceSerializer, PostSerializer, CategorySerializer, MyPostSerializer
+from .filters import FoldedSearchFilter
+from .normalization import search_key
+from . import crawlstats, dedup, directory, feeds, fragments, listing, suggest, throttling, thumbnails, trending, websub
 
 
 def index(request):
@@ -20,8 +28,8 @@ def index(request):
     ).select_related('category', 'author')[:3]
     
     # Latest posts from external blogs
-    latest_external = Post.objects.select_related('blog_source', 'category').filter(
-        blog_source__is_active=True
+    latest_external = dedup.one_per_story(
+        Post.objects.select_related('blog_source', 'category').filter(blog_source__is_active=True)
     )[:6]
     
     # Latest my posts
@@ -39,19 +47,15 @@ def index(request):
     # Recent blog sources
     recent_sources = BlogSource.objects.filter(
         is_active=True
-    ).order_by('-last_fetched')[:8]
+    ).annotate(post_count=Count('posts')).order_by('-last_fetched')[:8]
     
-    # Trending posts (last 7 days with most views for MyPost)
-    week_ago = timezone.now() - timedelta(days=7)
-    trending_posts = MyPost.objects.filter(
-        is_published=True,
-        published_date__gte=week_ago
-    ).order_by('-views_count')[:5]
+    # Trending posts, precomputed by compute_trending
+    trending_posts = trending.get_trending()
     
     context = {
-        'featured_posts': featured_posts,
-        'latest_external': latest_external,
-        'latest_my_posts': latest_my_posts,
+        'featured_posts': fragments.render_cards(featured_posts, 'aggregator/partials/index_featured_card.html'),
+        'latest_external': fragments.render_cards(latest_external, 'aggregator/partials/index_external_row.html'),
+        'latest_my_posts': fragments.render_cards(latest_my_posts, 'aggregator/partials/index_my_post_card.html'),
         'popular_categories': popular_categories,
         'recent_sources': recent_sources,
         'trending_posts': trending_posts,
@@ -68,8 +72,8 @@ def all_posts(request):
     search_query = request.GET.get('search', '')
     post_type = request.GET.get('type', 'all')  # all, external, my
     
-    # Combine posts from both models
-    all_posts_list = []
+    # Combine posts from both models, newest first
+    posts = listing.MergedPosts()
     
     if post_type in ['all', 'external']:
         # External posts
@@ -82,17 +86,33 @@ def all_posts(request):
         if category_id:
             external_posts = external_posts.filter(category_id=category_id)
         if search_query:
+            folded_query = search_key(search_query)
             external_posts = external_posts.filter(
-                Q(title__icontains=search_query) | 
-                Q(excerpt__icontains=search_query)
+                Q(title_folded__contains=folded_query) | 
+                Q(excerpt_folded__contains=folded_query)
             )
+        if not blog_source_id:
+            # One card per story: syndicated copies are hidden in the timeline
+            external_posts = dedup.one_per_story(external_posts)
         
-        for post in external_posts:
-            all_posts_list.append({
-                'type': 'external',
-                'object': post,
-                'published_date': post.published_date,
-            })
+        posts.add('external', external_posts)
+    
+    if post_type == 'archive':
+        # Explicit archive search: old crawled posts moved out of Post
+        archived_posts = ArchivedPost.objects.select_related('blog_source', 'category')
+        
+        if blog_source_id:
+            archived_posts = archived_posts.filter(blog_source_id=blog_source_id)
+        if category_id:
+            archived_posts = archived_posts.filter(category_id=category_id)
+        if search_query:
+            folded_query = search_key(search_query)
+            archived_posts = archived_posts.filter(
+                Q(title_folded__contains=folded_query) | 
+                Q(excerpt_folded__contains=folded_query)
+            )
+        
+        posts.add('archived', archived_posts)
     
     if post_type in ['all', 'my']:
         # My posts
@@ -101,42 +121,35 @@ def all_posts(request):
         if category_id:
             my_posts = my_posts.filter(category_id=category_id)
         if search_query:
+            folded_query = search_key(search_query)
             my_posts = my_posts.filter(
-                Q(title__icontains=search_query) | 
-                Q(excerpt__icontains=search_query) |
+                Q(title_folded__contains=folded_query) | 
+                Q(excerpt_folded__contains=folded_query) |
                 Q(content__icontains=search_query)
             )
         
-        for post in my_posts:
-            all_posts_list.append({
-                'type': 'my',
-                'object': post,
-                'published_date': post.published_date or post.created_at,
-            })
-    
-    # Sort by published date
-    all_posts_list.sort(key=lambda x: x['published_date'], reverse=True)
-    
-    # Pagination for masonry layout
-    paginator = Paginator(all_posts_list, 30)
+        posts.add('my', my_posts, 'published_date', 'created_at')
+    
+    # Pagination for masonry layout (queried after the page head is sent)
+    paginator = listing.ScrollPaginator(posts, 30)
     page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
     
-    # Get filter options
-    blog_sources = BlogSource.objects.filter(is_active=True).order_by('name')
-    categories = Category.objects.filter(is_active=True).order_by('name')
+    # Get filter options (ids and names only: one <option> per active source)
+    blog_sources = BlogSource.objects.filter(is_active=True).order_by('name').values_list('id', 'name')
+    categories = Category.objects.filter(is_active=True).order_by('name').values_list('id', 'name')
     
     context = {
-        'page_obj': page_obj,
         'blog_sources': blog_sources,
         'categories': categories,
-        'current_blog_source': blog_source_id,
-        'current_category': category_id,
+        'current_blog_source_id': int(blog_source_id) if (blog_source_id or '').isdigit() else None,
+        'current_category_id': int(category_id) if (category_id or '').isdigit() else None,
         'current_type': post_type,
         'search_query': search_query,
     }
     
-    return render(request, 'aggregator/all_posts.html', context)
+    return listing.render_listing(
+        request, 'aggregator/all_posts.html', context, lambda: paginator.get_page(page_number)
+    )
 
 
 def load_more_posts(request):
@@ -149,37 +162,28 @@ def blog_sources_list(request):
     """Trang danh sách blog sources theo alphabet như từ điển"""
     search = request.GET.get('search', '')
     letter = request.GET.get('letter', '')
-    
-    sources = BlogSource.objects.filter(is_active=True)
-    
-    if search:
-        sources = sources.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(author__icontains=search)
-        )
-    
-    if letter:
-        sources = sources.filter(name__istartswith=letter)
-    
-    sources = sources.order_by('name')
-    
-    # Group by first letter
-    grouped_sources = {}
-    for source in sources:
-        first_letter = source.name[0].upper()
-        if first_letter not in grouped_sources:
-            grouped_sources[first_letter] = []
-        grouped_sources[first_letter].append(source)
-    
-    # Get alphabet letters that have sources
-    available_letters = sorted(grouped_sources.keys())
-    
+
+    source_directory = directory.get_directory(search, letter)
+    grouped_sources = source_directory['grouped_sources']
+
+    # Render source cards with a single cache lookup
+    cards = iter(fragments.render_cards(
+        [source for letter_sources in grouped_sources.values() for source in letter_sources],
+        'aggregator/partials/source_card.html',
+        context_name='source',
+    ))
+    grouped_sources = {
+        letter_key: [next(cards) for _ in letter_sources]
+        for letter_key, letter_sources in grouped_sources.items()
+    }
+
     context = {
         'grouped_sources': grouped_sources,
-        'available_letters': available_letters,
+        'available_letters': directory.available_letters(),
+        'total_sources': source_directory['total_sources'],
+        'total_posts': source_directory['total_posts'],
         'search_query': search,
-        'current_letter': letter,
+        'current_letter': letter.upper()[:1],
     }
     
     return render(request, 'aggregator/blog_sources.html', context)
@@ -189,41 +193,30 @@ def category_detail(request, slug):
     """Chi tiết category với posts thuộc category đó"""
     category = get_object_or_404(Category, slug=slug, is_active=True)
     
-    # Get all posts in this category
-    all_posts_list = []
+    # Posts in this category, newest first
+    posts = listing.MergedPosts()
     
     # External posts
-    external_posts = category.posts.filter(blog_source__is_active=True)
-    for post in external_posts:
-        all_posts_list.append({
-            'type': 'external',
-            'object': post,
-            'published_date': post.published_date,
-        })
+    external_posts = category.posts.select_related('blog_source', 'category').filter(
+        blog_source__is_active=True
+    )
+    posts.add('external', dedup.one_per_story(external_posts))
     
     # My posts
-    my_posts = category.my_posts.filter(is_published=True)
-    for post in my_posts:
-        all_posts_list.append({
-            'type': 'my',
-            'object': post,
-            'published_date': post.published_date or post.created_at,
-        })
-    
-    # Sort by published date
-    all_posts_list.sort(key=lambda x: x['published_date'], reverse=True)
+    my_posts = category.my_posts.select_related('category', 'author').filter(is_published=True)
+    posts.add('my', my_posts, 'published_date', 'created_at')
     
     # Pagination
-    paginator = Paginator(all_posts_list, 20)
+    paginator = Paginator(posts, 20)
     page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
     
     context = {
         'category': category,
-        'page_obj': page_obj,
     }
     
-    return render(request, 'aggregator/category_detail.html', context)
+    return listing.render_listing(
+        request, 'aggregator/category_detail.html', context, lambda: paginator.get_page(page_number)
+    )
 
 
 def my_post_detail(request, slug):
@@ -232,13 +225,22 @@ def my_post_detail(request, slug):
     
     # Increase view count
     MyPost.objects.filter(id=post.id).update(views_count=F('views_count') + 1)
+    trending.record_view(my_post_id=post.id)
     post.refresh_from_db()
     
-    # Related posts (same category)
-    related_posts = MyPost.objects.filter(
-        category=post.category,
-        is_published=True
-    ).exclude(id=post.id)[:4]
+    # Related posts, precomputed by aggregator.related
+    related_posts = list(RelatedPost.objects.filter(post=post).select_related(
+        'related_my_post__author', 'related_post__blog_source'
+    ).order_by('rank')[:4])
+    if not related_posts:
+        # Not indexed yet: same category
+        related_posts = [
+            RelatedPost(post=post, related_my_post=related, score=0, rank=rank)
+            for rank, related in enumerate(MyPost.objects.filter(
+                category=post.category,
+                is_published=True
+            ).exclude(id=post.id).select_related('author')[:4])
+        ]
     
     context = {
         'post': post,
@@ -248,6 +250,55 @@ def my_post_detail(request, slug):
     return render(request, 'aggregator/my_post_detail.html', context)
 
 
+@require_GET
+def post_redirect(request, pk):
+    """Chuyển hướng sang bài viết gốc và đếm lượt click cho trending"""
+    link = Post.objects.filter(pk=pk).values_list('link', flat=True).first()
+    if link:
+        trending.record_view(post_id=pk)
+        return HttpResponseRedirect(link)
+    link = ArchivedPost.objects.filter(pk=pk).values_list('link', flat=True).first()
+    if not link:
+        raise Http404
+    return HttpResponseRedirect(link)
+
+
+@require_GET
+def feed(request, kind, fmt, key=None):
+    """Feed RSS/Atom/JSON của bài viết tổng hợp (tất cả, theo danh mục hoặc theo nguồn)"""
+    scope = feeds.get_scope(kind, key)
+    cursor_value = request.GET.get('before', '')
+    cursor = None
+    if cursor_value:
+        cursor = feeds.decode_cursor(cursor_value)
+        if cursor is None:
+            raise Http404
+    
+    version, updated = scope.version()
+    key = feeds.cache_key(request, fmt, scope, version, cursor_value)
+    body = cache.get(key)
+    if body is not None:
+        response = HttpResponse(body, content_type=feeds.CONTENT_TYPES[fmt])
+    else:
+        items, next_cursor = scope.page(cursor)
+        document = feeds.WRITERS[fmt](scope, items, feeds.FeedURLs(request, scope, fmt, cursor_value, next_cursor), updated)
+        response = StreamingHttpResponse(
+            feeds.stream_and_cache(document, key), content_type=feeds.CONTENT_TYPES[fmt]
+        )
+    
+    response['ETag'] = quote_etag(f'{fmt}-{scope.key}-{version}-{cursor_value}')
+    if updated:
+        response['Last-Modified'] = http_date(updated.timestamp())
+    patch_cache_control(response, public=True, max_age=settings.FEED_MAX_AGE)
+    # 304 before the streaming body is ever generated
+    return get_conditional_response(
+        request,
+        etag=response['ETag'],
+        last_modified=int(updated.timestamp()) if updated else None,
+        response=response,
+    )
+
+
 def categories_list(request):
     """Danh sách tất cả categories"""
     categories = Category.objects.filter(is_active=True).annotate(
@@ -261,10 +312,65 @@ def categories_list(request):
     return render(request, 'aggregator/categories.html', context)
 
 
+@require_GET
+@cache_control(public=True, max_age=31536000, immutable=True)
+def thumbnail(request, name):
+    """Phục vụ ảnh thumbnail đã resize (tên file theo content hash nên cache vĩnh viễn)"""
+    ext = name.rsplit('.', 1)[-1]
+    if ext not in thumbnails.FORMATS:
+        raise Http404
+    path = thumbnails.variant_path(name)
+    if not path.is_file():
+        raise Http404
+    return FileResponse(open(path, 'rb'), content_type=thumbnails.FORMATS[ext][1])
+
+
+def sitemap_file(request, name):
+    """Phục vụ sitemap tĩnh đã tạo sẵn (production nên để web server phục vụ SITEMAP_ROOT)"""
+    path = settings.SITEMAP_ROOT / name
+    if not path.is_file():
+        raise Http404
+    content_type = 'application/gzip' if name.endswith('.gz') else 'application/xml'
+    return FileResponse(open(path, 'rb'), content_type=content_type)
+
+
+@require_GET
+def metrics(request):
+    """Chỉ số crawl theo định dạng Prometheus (bật bằng METRICS_ENABLED)"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(crawlstats.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def websub_callback(request, token):
+    """Callback WebSub: xác nhận đăng ký (GET) và nhận nội dung feed do hub đẩy về (POST)"""
+    if not settings.WEBSUB_ENABLED:
+        raise Http404
+    subscription = get_object_or_404(WebSubSubscription.objects.select_related('blog_source'), callback_token=token)
+
+    if request.method == 'GET':
+        challenge = websub.verify_intent(subscription, request.GET)
+        if challenge is None:
+            raise Http404
+        return HttpResponse(challenge, content_type='text/plain; charset=utf-8')
+
+    if subscription.state != WebSubSubscription.ACTIVE:
+        # Tells the hub to drop the subscription
+        return HttpResponse(status=410)
+    body = request.body
+    # Unsigned or forged deliveries are acknowledged but ignored, as the spec requires
+    if websub.verify_signature(subscription, body, request.headers.get('X-Hub-Signature')):
+        websub.deliver(subscription, body, request.headers.get('Content-Type'))
+    return HttpResponse(status=202)
+
+
 # REST API ViewSets
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
+    throttle_scope = 'categories'
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
 
@@ -272,6 +378,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 class BlogSourceViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = BlogSource.objects.filter(is_active=True)
     serializer_class = BlogSourceSerializer
+    throttle_scope = 'sources'
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description', 'author']
 
@@ -279,8 +386,9 @@ class BlogSourceViewSet(viewsets.ReadOnlyModelViewSet):
 class PostViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Post.objects.select_related('blog_source', 'category').filter(blog_source__is_active=True)
     serializer_class = PostSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'excerpt']
+    throttle_scope = 'posts'
+    filter_backends = [FoldedSearchFilter, filters.OrderingFilter]
+    search_fields = ['title_folded', 'excerpt_folded']
     ordering_fields = ['published_date', 'created_at']
     ordering = ['-published_date']
     
@@ -293,6 +401,8 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(blog_source_id=blog_source_id)
         if category_id:
             queryset = queryset.filter(category_id=category_id)
+        if not blog_source_id:
+            queryset = dedup.one_per_story(queryset)
             
         return queryset
 
@@ -300,8 +410,9 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
 class MyPostViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = MyPost.objects.filter(is_published=True).select_related('category', 'author')
     serializer_class = MyPostSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'content', 'excerpt']
+    throttle_scope = 'my_posts'
+    filter_backends = [FoldedSearchFilter, filters.OrderingFilter]
+    search_fields = ['title_folded', 'excerpt_folded', 'content']
     ordering_fields = ['published_date', 'created_at', 'views_count']
     ordering = ['-published_date']
 
@@ -323,3 +434,15 @@ def stats_api(request):
     }
     
     return Response(stats)
+
+
+@cache_control(public=True, max_age=60)
+@api_view(['GET'])
+@throttle_classes([throttling.SuggestThrottle])
+def suggest_api(request):
+    """Gợi ý khi gõ tìm kiếm: tiêu đề bài viết, blog và danh mục, từ index trong bộ nhớ (không truy vấn DB)"""
+    if not settings.SUGGEST_ENABLED:
+        raise Http404
+    query = request.query_params.get('q', '')[:100]
+    kinds = set(request.query_params.get('type', '').split(',')) & set(suggest.KIND_ORDER)
+    return Response({'query': query, 'results': suggest.suggest(query, kinds=kinds)})
@@ -0,0 +1,229 @@
+"""
+WebSub (PubSubHubbub) push ingestion.
+
+fetch_feeds calls discover() with every parsed feed: a feed that announces a
+rel="hub" link gets a WebSubSubscription and a subscribe request to the hub,
+renewed before its lease runs out. The hub verifies the intent with a GET to
+the callback view and then POSTs the feed whenever it changes; deliveries
+signed with the subscription secret (X-Hub-Signature) go through
+FeedCrawler.ingest_feed(). Sources with a live subscription are polled only
+every WEBSUB_FALLBACK_POLL_MINUTES. The websub_hub command is a stand-in hub
+for local testing.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+
+import feedparser
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import WebSubSubscription
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_METHODS = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512,
+}
+# A pending subscription is re-requested after this long without verification
+PENDING_RETRY = timedelta(hours=1)
+
+_crawler = None
+_crawler_lock = threading.Lock()
+
+
+def feed_links(feed):
+    """(hub URL, self URL) announced by a parsed feed"""
+    hub = topic = ''
+    for link in feed.feed.get('links', []):
+        rel, href = link.get('rel'), link.get('href', '')
+        if rel == 'hub' and not hub:
+            hub = href
+        elif rel == 'self' and not topic:
+            topic = href
+    return hub, topic
+
+
+def callback_url(subscription):
+    path = reverse('aggregator:websub_callback', args=[subscription.callback_token])
+    return settings.WEBSUB_CALLBACK_BASE_URL.rstrip('/') + path
+
+
+def fallback_interval():
+    return timedelta(minutes=settings.WEBSUB_FALLBACK_POLL_MINUTES)
+
+
+def needs_request(subscription, hub, topic, now):
+    if (subscription.hub_url, subscription.topic_url) != (hub, topic):
+        return True
+    if subscription.state == WebSubSubscription.PENDING:
+        return subscription.updated_at < now - PENDING_RETRY
+    if subscription.state == WebSubSubscription.ACTIVE:
+        # Renew while at least one fallback poll is left before expiry
+        renew_at = now + fallback_interval() + timedelta(hours=1)
+        return not subscription.lease_expires or subscription.lease_expires < renew_at
+    # Denied or unsubscribed: only a changed hub or topic asks again
+    return False
+
+
+def discover(source, feed):
+    """Subscribe source to the hub its feed announces, or renew its subscription"""
+    hub, topic = feed_links(feed)
+    if not hub:
+        return None
+    topic = topic or source.rss_url
+    now = timezone.now()
+
+    subscription = WebSubSubscription.objects.filter(blog_source=source).first()
+    if subscription and not needs_request(subscription, hub, topic, now):
+        return subscription
+    if subscription is None:
+        subscription = WebSubSubscription(
+            blog_source=source,
+            callback_token=secrets.token_hex(16),
+            secret=secrets.token_hex(32),
+        )
+    if (subscription.hub_url, subscription.topic_url) != (hub, topic):
+        subscription.hub_url, subscription.topic_url = hub, topic
+        subscription.state = WebSubSubscription.PENDING
+    subscription.save()
+    subscribe(subscription)
+    return subscription
+
+
+def hub_request(subscription, mode):
+    """POST a (un)subscribe request; the hub answers 202 and verifies later"""
+    params = {
+        'hub.mode': mode,
+        'hub.topic': subscription.topic_url,
+        'hub.callback': callback_url(subscription),
+    }
+    if mode == 'subscribe':
+        params['hub.secret'] = subscription.secret
+        params['hub.lease_seconds'] = settings.WEBSUB_LEASE_SECONDS
+    request = urllib.request.Request(
+        subscription.hub_url,
+        data=urllib.parse.urlencode(params).encode('ascii'),
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=settings.FEED_FETCH_TIMEOUT) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        status, error = None, str(getattr(e, 'reason', e))
+    else:
+        error = ''
+    if status is not None:
+        error = '' if 200 <= status < 300 else f"Hub answered HTTP {status} to {mode}"
+
+    subscription.last_error = error
+    subscription.save(update_fields=['last_error', 'updated_at'])
+    if error:
+        logger.warning(f"WebSub {mode} for {subscription.blog_source} failed: {error}")
+    return not error
+
+
+def subscribe(subscription):
+    return hub_request(subscription, 'subscribe')
+
+
+def unsubscribe(subscription):
+    subscription.state = WebSubSubscription.UNSUBSCRIBED
+    subscription.save(update_fields=['state', 'updated_at'])
+    return hub_request(subscription, 'unsubscribe')
+
+
+def verify_intent(subscription, params):
+    """Answer a hub's verification GET: the challenge to echo, or None to refuse"""
+    mode = params.get('hub.mode')
+    if mode == 'denied':
+        subscription.state = WebSubSubscription.DENIED
+        subscription.last_error = params.get('hub.reason', '')[:2000]
+        subscription.save(update_fields=['state', 'last_error', 'updated_at'])
+        return ''
+    if params.get('hub.topic') != subscription.topic_url or 'hub.challenge' not in params:
+        return None
+
+    if mode == 'subscribe' and subscription.state in (WebSubSubscription.PENDING, WebSubSubscription.ACTIVE):
+        try:
+            lease_seconds = int(params.get('hub.lease_seconds', settings.WEBSUB_LEASE_SECONDS))
+        except ValueError:
+            lease_seconds = settings.WEBSUB_LEASE_SECONDS
+        subscription.state = WebSubSubscription.ACTIVE
+        subscription.lease_expires = timezone.now() + timedelta(seconds=lease_seconds)
+        subscription.last_error = ''
+        subscription.save(update_fields=['state', 'lease_expires', 'last_error', 'updated_at'])
+        return params['hub.challenge']
+    if mode == 'unsubscribe' and subscription.state == WebSubSubscription.UNSUBSCRIBED:
+        subscription.lease_expires = None
+        subscription.save(update_fields=['lease_expires', 'updated_at'])
+        return params['hub.challenge']
+    return None
+
+
+def verify_signature(subscription, body, header):
+    """Check X-Hub-Signature (method=hexdigest) against the HMAC of the raw body"""
+    method, _, signature = (header or '').partition('=')
+    digestmod = SIGNATURE_METHODS.get(method.lower())
+    if not digestmod or not signature:
+        return False
+    expected = hmac.new(subscription.secret.encode('utf-8'), body, digestmod).hexdigest()
+    return hmac.compare_digest(expected, signature.lower())
+
+
+def crawler():
+    """FeedCrawler created once per process to ingest deliveries"""
+    global _crawler
+    if _crawler is None:
+        from .crawler import FeedCrawler  # crawler imports this module
+
+        # The web process checks links in the database instead of loading the filter
+        _crawler = FeedCrawler(classify=True, load_link_filter=False)
+    return _crawler
+
+
+def deliver(subscription, body, content_type=None):
+    """Ingest a pushed feed document; returns the number of new posts"""
+    headers = {'content-location': subscription.topic_url}
+    if content_type:
+        headers['content-type'] = content_type
+    feed = feedparser.parse(body, sanitize_html=False, response_headers=headers)
+    with _crawler_lock:
+        new_posts = crawler().ingest_feed(subscription.blog_source, feed, settings.WEBSUB_DELIVERY_LIMIT)
+    WebSubSubscription.objects.filter(pk=subscription.pk).update(
+        last_delivery=timezone.now(), deliveries=F('deliveries') + 1
+    )
+    return new_posts
+
+
+def live_subscriptions():
+    return WebSubSubscription.objects.filter(
+        state=WebSubSubscription.ACTIVE, lease_expires__gt=timezone.now()
+    )
+
+
+def is_pushed(source_id):
+    """True when the hub pushes the source, so polling falls back to the long interval"""
+    return settings.WEBSUB_ENABLED and live_subscriptions().filter(blog_source_id=source_id).exists()
+
+
+def recently_polled_pushed_ids():
+    """Pushed sources polled within the fallback interval, skipped by fetch_feeds"""
+    if not settings.WEBSUB_ENABLED:
+        return []
+    return live_subscriptions().filter(
+        blog_source__last_fetched__gte=timezone.now() - fallback_interval()
+    ).values_list('blog_source_id', flat=True)
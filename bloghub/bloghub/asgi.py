@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bloghub.settings')
 
 application = get_asgi_application()
+
+# Build the search suggestion index in the background before the first keystroke
+from aggregator import suggest  # noqa: E402
+
+suggest.warm_up()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'aggregator.staticfiles.StaticFilesMiddleware',
+    'aggregator.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -53,12 +56,19 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'bloghub.urls'
 
+# Templates are compiled once per process by the cached loader (runserver's
+# autoreloader resets it when a template file changes)
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -69,6 +79,19 @@ TEMPLATES = [
     },
 ]
 
+# Optional Jinja2 engine (pip install Jinja2) for the card partials that have
+# a copy in aggregator/jinja2/; select it with CARD_TEMPLATE_ENGINE = "jinja2"
+if importlib.util.find_spec('jinja2'):
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'aggregator.jinja_env.environment',
+            'auto_reload': DEBUG,
+        },
+    })
+
 WSGI_APPLICATION = 'bloghub.wsgi.application'
 
 
@@ -83,6 +106,121 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# 'default' holds rendered output per process. 'shared' holds the small
+# version/generation counters that fetch_feeds and crawl_worker bump for the
+# web processes and the API throttle buckets; point it at Redis or Memcached
+# when they run on other hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bloghub',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'media' / 'cache',
+    },
+}
+
+# Automatic post categorization (aggregator.classification)
+CLASSIFIER_MODEL_PATH = BASE_DIR / "media" / "classifier.json"
+CLASSIFIER_MIN_PROBABILITY = 0.6
+CLASSIFIER_TRAINING_LIMIT = 20000
+CLASSIFIER_MAX_TOKENS_PER_CLASS = 3000
+
+# Near-duplicate detection (aggregator.dedup)
+DUPLICATE_MAX_DISTANCE = 3
+DUPLICATE_MIN_TOKENS = 6
+
+# Related posts for my_post_detail (aggregator.related)
+RELATED_POSTS_COUNT = 4
+RELATED_EXTERNAL_POOL = 5000
+RELATED_MIN_SCORE = 0.05
+
+# Trending block on the homepage (aggregator.trending)
+TRENDING_COUNT = 5
+TRENDING_WINDOW_HOURS = 72
+TRENDING_HALF_LIFE_HOURS = 12
+# Click-throughs weigh less than reading a post on the site
+TRENDING_EXTERNAL_WEIGHT = 0.5
+
+# Outbound RSS/Atom/JSON feeds (aggregator.feeds)
+FEED_ITEMS = 50
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_MAX_AGE = 60 * 5
+
+# Static sitemaps (aggregator.sitemaps), written by build_sitemaps and on publish
+SITEMAP_ROOT = BASE_DIR / "media" / "sitemaps"
+SITEMAP_BASE_URL = 'http://localhost:8000'
+SITEMAP_SHARD_SIZE = 10000
+
+# Post retention (aggregator.archive); BlogSource.retention_months overrides it
+ARCHIVE_AFTER_MONTHS = 24
+
+# Known-link Bloom filter for fetch_feeds (aggregator.linkfilter)
+LINK_FILTER_PATH = BASE_DIR / "media" / "link_filter.bin"
+LINK_FILTER_CAPACITY = 200000
+LINK_FILTER_ERROR_RATE = 1e-6
+
+# Crawl history and metrics (aggregator.crawlstats)
+FEED_FETCH_TIMEOUT = 20
+# Largest feed read, before and after gzip decompression
+FEED_MAX_BYTES = 10 * 1024 * 1024
+CRAWL_LOG_BATCH_SIZE = 50
+CRAWL_LOG_RETENTION_DAYS = 30
+# Serve /metrics in Prometheus text format (restrict it at the proxy)
+METRICS_ENABLED = False
+
+# Database crawl queue for crawl_worker (aggregator.jobs)
+CRAWL_INTERVAL_MINUTES = 30
+CRAWL_MAX_BACKOFF_MINUTES = 60 * 24
+CRAWL_LEASE_SECONDS = 300
+CRAWL_POLL_SECONDS = 10
+
+# WebSub push ingestion (aggregator.websub); the callback base must be
+# reachable by the hubs
+WEBSUB_ENABLED = False
+WEBSUB_CALLBACK_BASE_URL = SITEMAP_BASE_URL
+WEBSUB_LEASE_SECONDS = 60 * 60 * 24 * 7
+WEBSUB_FALLBACK_POLL_MINUTES = 60 * 24
+WEBSUB_DELIVERY_LIMIT = 50
+
+# repair_posts checkpoint, removed once a run completes
+REPAIR_CHECKPOINT_PATH = BASE_DIR / "media" / "repair_posts.json"
+
+# Admin changelists (aggregator.changelists): unfiltered lists of larger
+# tables show the planner's row estimate instead of COUNT(*)
+ADMIN_ESTIMATED_COUNT_MIN = 50000
+
+# Response compression (aggregator.compression): brotli needs the brotli package.
+# Listing pages stream head first, then cards in batches (aggregator.listing)
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+STREAM_LISTING_PAGES = True
+LISTING_STREAM_BATCH = 10
+
+# Search-as-you-type suggestions (aggregator.suggest): in-memory prefix index
+# of titles, source and category names, built when the application starts
+SUGGEST_ENABLED = True
+SUGGEST_MAX_POSTS = 50000  # newest crawled posts indexed at each full build
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_LIMIT = 8
+SUGGEST_SCAN_LIMIT = 1000  # crawled post postings examined per lookup
+SUGGEST_DELTA_MAX = 20000  # words added since the build before a merge
+SUGGEST_CHECK_SECONDS = 5
+SUGGEST_REFRESH_SECONDS = 5 * 60
+SUGGEST_REBUILD_SECONDS = 6 * 60 * 60
+
+# Rendered post/source cards (aggregator.fragments); "django" or "jinja2"
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+CARD_TEMPLATE_ENGINE = "django"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -121,6 +259,22 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+# collectstatic minifies, fingerprints and precompresses (.gz, .br with the
+# brotli package) into STATIC_ROOT; aggregator.staticfiles.StaticFilesMiddleware
+# serves it, hashed names with a year-long immutable Cache-Control
+STATIC_ROOT = BASE_DIR / "staticfiles"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "aggregator.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+STATIC_MAX_AGE = 60  # seconds, for names without a content hash
+
+# Thumbnails (resized copies of post images, served by aggregator.views.thumbnail)
+THUMBNAIL_ROOT = BASE_DIR / "media" / "thumbs"
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_MAX_BYTES = 10 * 1024 * 1024
+THUMBNAIL_TIMEOUT = 10
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -130,5 +284,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # Token buckets in the cache (aggregator.throttling): N tokens, refilled at N per period
+    'DEFAULT_THROTTLE_CLASSES': [
+        'aggregator.throttling.EndpointThrottle',
+        'aggregator.throttling.SearchThrottle',
+        'aggregator.throttling.DeepPageThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'api': '120/min',  # endpoints without a rate of their own
+        'posts': '120/min',
+        'my_posts': '120/min',
+        'sources': '60/min',
+        'categories': '60/min',
+        'search': '20/min',
+        'deep_page': '10/min',
+        'suggest': '300/min',
+    },
+    # Proxies in front of the app (Nginx, see README): anonymous buckets are
+    # keyed by the X-Forwarded-For entry this many hops back, which clients
+    # cannot forge. 0 when Gunicorn is exposed directly (REMOTE_ADDR)
+    'NUM_PROXIES': 1,
 }
+# Pages after this one count against the deep_page bucket too
+THROTTLE_DEEP_PAGE = 10
+# Idle buckets are dropped after this many seconds (they restart full)
+THROTTLE_KEY_TIMEOUT = 60 * 60
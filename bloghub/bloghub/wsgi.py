@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bloghub.settings')
 
 application = get_wsgi_application()
+
+# Build the search suggestion index in the background before the first keystroke
+from aggregator import suggest  # noqa: E402
+
+suggest.warm_up()
@@ -0,0 +1,79 @@
+// Site-wide behaviour, loaded with defer from base.html
+
+// Mobile menu toggle
+document.getElementById('mobile-menu-button').addEventListener('click', function() {
+    const menu = document.getElementById('mobile-menu');
+    menu.classList.toggle('hidden');
+});
+
+// Search-as-you-type suggestions for inputs with data-suggest="<endpoint>"
+document.querySelectorAll('input[data-suggest]').forEach(function(input) {
+    const list = document.createElement('ul');
+    list.className = 'suggest-list hidden';
+    input.after(list);
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function close() {
+        list.classList.add('hidden');
+        active = -1;
+    }
+
+    function highlight(index) {
+        const items = list.querySelectorAll('a');
+        if (!items.length) return;
+        active = (index + items.length) % items.length;
+        items.forEach(function(item, i) { item.classList.toggle('active', i === active); });
+    }
+
+    function show(results) {
+        list.replaceChildren();
+        results.forEach(function(result) {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            link.href = result.url;
+            link.textContent = result.label;
+            link.dataset.type = result.type;
+            item.appendChild(link);
+            list.appendChild(item);
+        });
+        active = -1;
+        list.classList.toggle('hidden', !results.length);
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (query.length < 2) {
+            close();
+            return;
+        }
+        timer = setTimeout(function() {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const params = new URLSearchParams({q: query, format: 'json'});
+            if (input.dataset.suggestType) params.append('type', input.dataset.suggestType);
+            fetch(input.dataset.suggest + '?' + params.toString(), {signal: controller.signal})
+                .then(function(response) { return response.ok ? response.json() : {results: []}; })
+                .then(function(data) { show(data.results); })
+                .catch(function() {});
+        }, 120);
+    });
+
+    input.addEventListener('keydown', function(event) {
+        if (list.classList.contains('hidden')) return;
+        if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+            event.preventDefault();
+            highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+        } else if (event.key === 'Enter' && active >= 0) {
+            event.preventDefault();
+            window.location = list.querySelectorAll('a')[active].href;
+        } else if (event.key === 'Escape') {
+            close();
+        }
+    });
+
+    // Let a click on a suggestion land before the list goes away
+    input.addEventListener('blur', function() { setTimeout(close, 150); });
+});